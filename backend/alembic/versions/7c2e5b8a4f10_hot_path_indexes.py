@@ -0,0 +1,36 @@
+"""Hot path indexes
+
+Revision ID: 7c2e5b8a4f10
+Revises: 3f6a2c9d1e47
+Create Date: 2026-10-19 14:03:27.910442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2e5b8a4f10'
+down_revision = '3f6a2c9d1e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Indexes are built concurrently so that writes to the tables are not blocked
+    with op.get_context().autocommit_block():
+        op.create_index('ix_eventsubscription_user_uuid_event', 'eventsubscription', ['user_uuid', 'event'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_membership_user_uuid'), 'membership', ['user_uuid'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_oauth2token_user_id_name', 'oauth2token', ['user_id', 'name'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_teaminvite_team_uuid'), 'teaminvite', ['team_uuid'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.create_index(op.f('ix_teaminvite_user_twitch_id'), 'teaminvite', ['user_twitch_id'], unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_teaminvite_user_twitch_id'), table_name='teaminvite', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_teaminvite_team_uuid'), table_name='teaminvite', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_oauth2token_user_id_name', table_name='oauth2token', postgresql_concurrently=True, if_exists=True)
+        op.drop_index(op.f('ix_membership_user_uuid'), table_name='membership', postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_eventsubscription_user_uuid_event', table_name='eventsubscription', postgresql_concurrently=True, if_exists=True)
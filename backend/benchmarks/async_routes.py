@@ -0,0 +1,187 @@
+"""
+Compare throughput of API routes on the async database layer with the sync
+sessions and CRUD classes they used before.
+
+Teams, users and memberships are written to the configured database and
+removed afterwards. Both variants serve the same queries, the async one
+through the routers of the API with get_async_db and acrud, the sync one
+through equivalent def routes with get_db and crud, which FastAPI runs in its
+threadpool. Run from the backend directory:
+
+    python -m benchmarks.async_routes --requests 2000 --concurrency 50
+"""
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+
+import httpx
+from fastapi import APIRouter, Depends, FastAPI, Request
+from sqlmodel import Session
+
+from core.database import engine, AsyncSessionLocal
+from core.database.crud import teams, users
+from core.database.loading import TEAM_READ, USER_READ
+from core.database.models.all import Membership, Team, User
+from core.database.models.readonly import MembershipRead, TeamRead, UserRead
+from core.deps import get_db, get_read_db, get_current_user
+from core.routes import teams as team_routes, users as user_routes
+
+# UUID of current user of a request
+USER_HEADER = "X-Benchmark-User"
+
+PATHS = ["/teams/", "/users/", "/users/teams"]
+
+
+def seed(team_count: int, user_count: int, teams_per_user: int) -> dict:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    team_list = [
+        Team(name=f"{prefix}-{i}", description="") for i in range(team_count)
+    ]
+    user_list = [
+        User(twitch_id=f"{prefix}-{i}", name=f"{prefix}-{i}", is_superadmin=i == 0)
+        for i in range(user_count)
+    ]
+
+    with Session(engine, expire_on_commit=False) as db:
+        db.add_all(team_list + user_list)
+        db.flush()
+        db.add_all(
+            Membership(
+                team_uuid=team_list[(i + j) % team_count].uuid,
+                user_uuid=user.uuid,
+                is_admin=j == 0,
+            )
+            for i, user in enumerate(user_list)
+            for j in range(min(teams_per_user, team_count))
+        )
+        db.commit()
+
+    return {"teams": team_list, "users": user_list}
+
+
+def unseed(data: dict) -> None:
+    # Memberships are removed with their teams and users
+    with Session(engine) as db:
+        teams.crud.remove_many(db, uuids=[x.uuid for x in data["teams"]])
+        users.crud.remove_many(db, uuids=[x.uuid for x in data["users"]])
+
+
+def make_sync_router() -> APIRouter:
+    router = APIRouter()
+
+    @router.get("/teams/", response_model=list[str | TeamRead | MembershipRead])
+    def get_teams(
+        db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    ):
+        if not current_user.is_superadmin:
+            return users.crud.get(db, current_user.uuid, options=USER_READ).teams
+        return teams.crud.get_multi(db, options=TEAM_READ)
+
+    @router.get("/users/", response_model=UserRead)
+    def users_root(
+        db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    ):
+        return users.crud.get(db, current_user.uuid, options=USER_READ)
+
+    @router.get("/users/teams", response_model=list[TeamRead])
+    def get_user_teams(
+        db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+    ):
+        return teams.crud.get_multi(
+            db,
+            limit=None,
+            filters={"members": {"user_uuid": current_user.uuid}},
+            options=TEAM_READ,
+        )
+
+    return router
+
+
+def make_app(data: dict, sync: bool) -> FastAPI:
+    app = FastAPI()
+    if sync:
+        app.include_router(make_sync_router())
+    else:
+        app.include_router(user_routes.router, prefix="/users")
+        app.include_router(team_routes.router, prefix="/teams")
+
+    users_by_uuid = {str(x.uuid): x for x in data["users"]}
+
+    async def get_user(request: Request):
+        return users_by_uuid[request.headers[USER_HEADER]]
+
+    async def get_primary_db():
+        # Replica routing needs the session middleware
+        async with AsyncSessionLocal() as session:
+            yield session
+
+    app.dependency_overrides[get_current_user] = get_user
+    app.dependency_overrides[get_read_db] = get_primary_db
+    return app
+
+
+async def run(app: FastAPI, data: dict, requests: int, concurrency: int) -> tuple:
+    """
+    :return: Elapsed seconds and sorted latencies of requests
+    """
+    user_list = data["users"]
+    latencies = []
+
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app), base_url="http://bench"
+    ) as client:
+
+        async def worker(offset: int) -> None:
+            for i in range(offset, requests, concurrency):
+                path = PATHS[i % len(PATHS)]
+                headers = {USER_HEADER: str(user_list[i % len(user_list)].uuid)}
+
+                start = time.perf_counter()
+                response = await client.get(path, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return elapsed, sorted(latencies)
+
+
+async def main(args) -> None:
+    data = seed(args.teams, args.users, args.teams_per_user)
+    try:
+        print(
+            f"{'variant':<8} {'requests':>8} {'elapsed':>9} {'req/s':>9} "
+            f"{'p50 ms':>9} {'p95 ms':>9}"
+        )
+        for name, sync in [("sync", True), ("async", False)]:
+            app = make_app(data, sync)
+            # Warm up connection pools before measuring
+            await run(app, data, args.concurrency, args.concurrency)
+            elapsed, latencies = await run(app, data, args.requests, args.concurrency)
+
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+            print(
+                f"{name:<8} {args.requests:>8} {elapsed:>9.2f} "
+                f"{args.requests / elapsed:>9.0f} {p50:>9.1f} {p95:>9.1f}"
+            )
+    finally:
+        unseed(data)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per variant")
+    parser.add_argument("--concurrency", type=int, default=50, help="Concurrent clients")
+    parser.add_argument("--teams", type=int, default=20, help="Number of teams")
+    parser.add_argument("--users", type=int, default=200, help="Number of users")
+    parser.add_argument(
+        "--teams-per-user", type=int, default=3, help="Memberships of each user"
+    )
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
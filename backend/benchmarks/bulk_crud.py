@@ -0,0 +1,114 @@
+"""
+Compare single-row CRUD operations with their bulk counterparts.
+
+Rows are written to the server table of the configured database and
+removed afterwards. Run from the backend directory:
+
+    python -m benchmarks.bulk_crud --rows 10000 --chunk-size 1000
+"""
+import time
+import uuid
+import argparse
+
+from sqlmodel import Session
+
+from core.database import engine
+from core.database.crud.server import crud
+from core.database.models.server import ServerCreate, ServerUpdate
+
+
+def timed(name: str, rows: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24} {rows:>8} {elapsed:>9.2f} {rows / elapsed:>11.0f}")
+
+
+def run(rows: int, chunk_size: int | None, single: bool) -> None:
+    prefix = f"bench-{uuid.uuid4().hex[:8]}"
+    objs_in = [ServerCreate(discord_id=f"{prefix}-{i}") for i in range(rows)]
+
+    print(f"{'operation':<24} {'rows':>8} {'elapsed':>9} {'rows/s':>11}")
+
+    with Session(engine) as db:
+        if single:
+            db_objs = []
+            timed(
+                "create (single)",
+                rows,
+                lambda: db_objs.extend(crud.create(db, obj_in=x) for x in objs_in),
+            )
+            timed(
+                "update (single)",
+                rows,
+                lambda: [
+                    crud.update(db, db_obj=x, obj_in=ServerUpdate(discord_channel_id="1"))
+                    for x in db_objs
+                ],
+            )
+            timed(
+                "remove (single)",
+                rows,
+                lambda: [crud.remove(db, uuid=x.uuid) for x in db_objs],
+            )
+
+        db_objs = []
+        timed(
+            "create_many",
+            rows,
+            lambda: db_objs.extend(
+                crud.create_many(db, objs_in=objs_in, chunk_size=chunk_size)
+            ),
+        )
+        timed(
+            "update_many",
+            rows,
+            lambda: crud.update_many(
+                db,
+                db_objs=db_objs,
+                objs_in=[{"discord_channel_id": "2"}] * rows,
+                chunk_size=chunk_size,
+            ),
+        )
+        timed(
+            "upsert_many (existing)",
+            rows,
+            lambda: crud.upsert_many(
+                db,
+                objs_in=[
+                    {"discord_id": x.discord_id, "discord_channel_id": "3"}
+                    for x in db_objs
+                ],
+                chunk_size=chunk_size,
+            ),
+        )
+        timed(
+            "remove_many",
+            rows,
+            lambda: crud.remove_many(
+                db, uuids=[x.uuid for x in db_objs], chunk_size=chunk_size
+            ),
+        )
+        timed(
+            "upsert_many (new)",
+            rows,
+            lambda: db_objs.extend(
+                crud.upsert_many(db, objs_in=objs_in, chunk_size=chunk_size)
+            ),
+        )
+
+        crud.remove_many(db, uuids=[x.uuid for x in db_objs[rows:]])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=10000, help="Number of rows")
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000, help="Rows per statement, 0 for all"
+    )
+    parser.add_argument(
+        "--skip-single", action="store_true", help="Only run bulk operations"
+    )
+    args = parser.parse_args()
+
+    run(args.rows, args.chunk_size or None, not args.skip_single)
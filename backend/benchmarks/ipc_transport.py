@@ -0,0 +1,144 @@
+"""
+Compare request cost of the IPC and RPC transports to the bot.
+
+Both are served by stubs of the bot in this process, so only transport and
+encoding are measured. Notification routes wait for --latency like the bot
+waits for Discord. Run from the backend directory:
+
+    python -m benchmarks.ipc_transport --requests 2000 --servers 50
+    python -m benchmarks.ipc_transport --route send_live_notification --latency 0.05
+"""
+import time
+import asyncio
+import argparse
+
+from config import settings
+from core.ipc.client import Client
+from core.ipc.rpc import RpcClient
+from core.ipc.stub import StubIpcServer, StubRpcServer
+
+
+def make_servers(count: int) -> list[dict]:
+    # Roughly what serialize_guild produces for a small guild
+    return [
+        {
+            "discord_id": str(10**17 + i),
+            "name": f"Server {i}",
+            "icon_url": f"https://cdn.discordapp.com/icons/{10**17 + i}/{'a' * 32}.png",
+            "description": None,
+            "owner": {
+                "discord_id": str(10**17 + i),
+                "name": "owner",
+                "mention": f"<@{10**17 + i}>",
+                "avatar_url": None,
+                "is_admin": True,
+            },
+            "channels": [
+                {
+                    "discord_id": str(10**17 + j),
+                    "name": f"channel-{j}",
+                    "jump_url": f"https://discord.com/channels/{10**17 + i}/{10**17 + j}",
+                }
+                for j in range(10)
+            ],
+            "roles": [
+                {
+                    "discord_id": str(10**17 + j),
+                    "name": f"role-{j}",
+                    "color": (j, j, j),
+                    "mention": f"<@&{10**17 + j}>",
+                }
+                for j in range(10)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+async def ipc_per_request(args: argparse.Namespace) -> None:
+    # What get_ipc did for every API request
+    for _ in range(args.requests):
+        client = Client(host=args.host, port=args.ipc_port, secret_key="benchmark")
+        await client.request(args.route)
+        await client.close()
+
+
+async def ipc_shared(args: argparse.Namespace) -> None:
+    client = Client(host=args.host, port=args.ipc_port, secret_key="benchmark")
+    for _ in range(args.requests):
+        await client.request(args.route)
+    await client.close()
+
+
+async def rpc_sequential(args: argparse.Namespace) -> None:
+    client = RpcClient(args.host, args.rpc_port, secret_key="benchmark")
+    for _ in range(args.requests):
+        await client.request(args.route)
+    await client.close()
+
+
+async def rpc_concurrent(args: argparse.Namespace) -> None:
+    client = RpcClient(
+        args.host, args.rpc_port, secret_key="benchmark", max_in_flight=args.concurrency
+    )
+    await asyncio.gather(
+        *[client.request(args.route) for _ in range(args.requests)]
+    )
+    await client.close()
+
+
+async def main(args: argparse.Namespace) -> None:
+    responses = {"get_all_servers": make_servers(args.servers)}
+    ipc_server = StubIpcServer(
+        host=args.host, port=args.ipc_port, latency=args.latency, responses=responses
+    )
+    rpc_server = StubRpcServer(
+        host=args.host,
+        port=args.rpc_port,
+        secret_key="benchmark",
+        latency=args.latency,
+        responses=responses,
+    )
+    await ipc_server.start()
+    await rpc_server.start()
+
+    print(f"{'mode':<18} {'requests':>9} {'us/request':>11} {'req/s':>9}")
+
+    try:
+        for name, func in (
+            ("ipc (per request)", ipc_per_request),
+            ("ipc (shared)", ipc_shared),
+            ("rpc (sequential)", rpc_sequential),
+            (f"rpc ({args.concurrency} in flight)", rpc_concurrent),
+        ):
+            start = time.perf_counter()
+            await func(args)
+            elapsed = time.perf_counter() - start
+
+            print(
+                f"{name:<18} {args.requests:>9} "
+                f"{elapsed / args.requests * 1e6:>11.1f} {args.requests / elapsed:>9.0f}"
+            )
+    finally:
+        await ipc_server.stop()
+        await rpc_server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--route", default="get_all_servers", help="Route requested")
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Latency of notification routes (s)"
+    )
+    parser.add_argument(
+        "--servers", type=int, default=50, help="Servers in each response"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=64, help="Requests in flight over RPC"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="Host of stubs")
+    parser.add_argument("--ipc-port", type=int, default=19999, help="Port of IPC stub")
+    parser.add_argument("--rpc-port", type=int, default=19998, help="Port of RPC stub")
+
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,121 @@
+"""
+Compare per-request cost of cookie and Redis session middlewares.
+
+The middlewares are called directly with a minimal ASGI app, so only the
+session handling is measured. Redis mode uses REDIS_URL. Run from the
+backend directory:
+
+    python -m benchmarks.session_middleware --requests 10000
+"""
+import time
+import uuid
+import asyncio
+import argparse
+from http.cookies import SimpleCookie
+
+from redis.asyncio import Redis
+
+from config import settings
+from config.overrides import SessionMiddleware, RedisSessionMiddleware
+
+# Roughly what a logged in user carries around
+SAMPLE_SESSION = {
+    "user": {
+        "uuid": str(uuid.uuid4()),
+        "created_on": "2024-01-01T00:00:00+0000",
+        "updated_on": None,
+        "discord_id": "123456789012345678",
+        "twitch_id": "123456789",
+        "name": "SampleStreamer",
+        "login_name": "samplestreamer",
+        "icon_url": "https://static-cdn.jtvnw.net/jtv_user_pictures/" + "x" * 64,
+        "offline_image_url": "https://static-cdn.jtvnw.net/jtv_user_pictures/" + "y" * 64,
+        "description": "A description of the channel " * 4,
+        "is_superadmin": False,
+    },
+}
+
+
+def make_app(write: bool):
+    async def app(scope, receive, send):
+        session = scope["session"]
+        if not session:
+            session.update(SAMPLE_SESSION)
+        elif write:
+            session["db_primary_until"] = time.time()
+        else:
+            session.get("user")
+
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return app
+
+
+def make_scope(cookie: str | None) -> dict:
+    headers = [(b"cookie", cookie.encode("latin-1"))] if cookie else []
+    return {"type": "http", "method": "GET", "path": "/", "headers": headers}
+
+
+async def request(middleware, cookie: str | None) -> str | None:
+    set_cookie = None
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        nonlocal set_cookie
+        if message["type"] == "http.response.start":
+            for key, value in message["headers"]:
+                if key == b"set-cookie":
+                    set_cookie = value.decode("latin-1")
+
+    await middleware(make_scope(cookie), receive, send)
+    return set_cookie
+
+
+async def run(name: str, middleware, requests: int) -> None:
+    set_cookie = await request(middleware, None)
+    morsel = next(iter(SimpleCookie(set_cookie).values()))
+    cookie = f"{morsel.key}={morsel.value}"
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request(middleware, cookie)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{name:<16} {len(morsel.value):>7} {requests:>9} "
+        f"{elapsed / requests * 1e6:>11.1f}"
+    )
+
+
+async def main(args: argparse.Namespace) -> None:
+    redis = Redis.from_url(args.redis_url)
+
+    print(f"{'mode':<16} {'cookie':>7} {'requests':>9} {'us/request':>11}")
+
+    for write in (False, True):
+        suffix = "write" if write else "read"
+        await run(
+            f"cookie ({suffix})",
+            SessionMiddleware(make_app(write), secret_key="benchmark"),
+            args.requests,
+        )
+        await run(
+            f"redis ({suffix})",
+            RedisSessionMiddleware(make_app(write), redis=redis, secret_key="benchmark"),
+            args.requests,
+        )
+
+    await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument(
+        "--requests", type=int, default=10000, help="Requests per mode"
+    )
+    parser.add_argument("--redis-url", default=settings.REDIS_URL, help="Redis URL")
+
+    asyncio.run(main(parser.parse_args()))
@@ -1,50 +1,140 @@
-import json
+import time
+import logging
+import secrets
 from base64 import b64encode, b64decode
+from typing import Iterable
 
+import orjson
 import starlette.middleware.sessions
 from pydantic import AnyHttpUrl
 
 from pydantic_core import Url
 from starlette.datastructures import MutableHeaders
 from starlette.requests import HTTPConnection
-from starlette.types import Message, Scope, Receive, Send
+from starlette.types import ASGIApp, Message, Scope, Receive, Send
 from itsdangerous.exc import BadSignature
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
+logger = logging.getLogger(__name__)
 
-class CustomEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, Url) or isinstance(obj, AnyHttpUrl):
-            return str(obj)
-        # Let the base class default method raise the TypeError
-        return json.JSONEncoder.default(self, obj)
 
+def orjson_default(obj):
+    if isinstance(obj, Url) or isinstance(obj, AnyHttpUrl):
+        return str(obj)
+    raise TypeError
 
-class SessionMiddleware(starlette.middleware.sessions.SessionMiddleware):
-    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+
+def dumps_session(session: dict) -> bytes:
+    return orjson.dumps(session, default=orjson_default)
+
+
+def loads_session(data: bytes | str) -> dict:
+    return orjson.loads(data)
+
+
+class SessionDict(dict):
+    """
+    Session that remembers if it was changed. Only assignments to top level
+    keys are noticed, nested values must be assigned again after changing.
+    """
+
+    modified = False
+
+    def __setitem__(self, key, value):
+        self.modified = True
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.modified = True
+        super().__delitem__(key)
+
+    def pop(self, key, *args):
+        self.modified = self.modified or key in self
+        return super().pop(key, *args)
+
+    def popitem(self):
+        self.modified = True
+        return super().popitem()
+
+    def setdefault(self, key, default=None):
+        self.modified = self.modified or key not in self
+        return super().setdefault(key, default)
+
+    def update(self, *args, **kwargs):
+        self.modified = True
+        super().update(*args, **kwargs)
+
+    def clear(self):
+        self.modified = self.modified or len(self) > 0
+        super().clear()
+
+
+class BaseSessionMiddleware(starlette.middleware.sessions.SessionMiddleware):
+    """
+    Session middleware that leaves requests to exclude_paths alone, and to
+    paths below them. Routes under those paths can't use request.session.
+    """
+
+    def __init__(self, app: ASGIApp, *, exclude_paths: Iterable[str] = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = tuple(exclude_paths)
+
+    def is_excluded(self, scope: Scope) -> bool:
         if scope["type"] not in ("http", "websocket"):  # pragma: no cover
+            return True
+
+        path = scope["path"]
+        root_path = scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        return any(path == p or path.startswith(p + "/") for p in self.exclude_paths)
+
+
+class SessionMiddleware(BaseSessionMiddleware):
+    """
+    Signed cookie session. The cookie is only signed and sent again when the
+    session was changed, or when less than reissue_before seconds of its
+    max_age are left.
+    """
+
+    def __init__(self, app: ASGIApp, *, reissue_before: int = 24 * 60 * 60, **kwargs):
+        super().__init__(app, **kwargs)
+        self.reissue_before = reissue_before
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.is_excluded(scope):
             await self.app(scope, receive, send)
             return
 
         connection = HTTPConnection(scope)
         initial_session_was_empty = True
+        reissue = False
 
         if self.session_cookie in connection.cookies:
             data = connection.cookies[self.session_cookie].encode("utf-8")
             try:
-                data = self.signer.unsign(data, max_age=self.max_age)
-                scope["session"] = json.loads(b64decode(data))
+                data, signed_at = self.signer.unsign(
+                    data, max_age=self.max_age, return_timestamp=True
+                )
+                scope["session"] = SessionDict(loads_session(b64decode(data)))
                 initial_session_was_empty = False
+
+                if self.max_age:
+                    age = time.time() - signed_at.timestamp()
+                    reissue = age > self.max_age - self.reissue_before
             except BadSignature:
-                scope["session"] = {}
+                scope["session"] = SessionDict()
         else:
-            scope["session"] = {}
+            scope["session"] = SessionDict()
 
         async def send_wrapper(message: Message) -> None:
             if message["type"] == "http.response.start":
-                if scope["session"]:
+                session = scope["session"]
+
+                if session and (session.modified or reissue):
                     # We have session data to persist.
-                    data = b64encode(json.dumps(scope["session"], cls=CustomEncoder).encode("utf-8"))
-                    data = self.signer.sign(data)
+                    data = self.signer.sign(b64encode(dumps_session(session)))
                     headers = MutableHeaders(scope=message)
                     header_value = "{session_cookie}={data}; path={path}; {max_age}{security_flags}".format(  # noqa E501
                         session_cookie=self.session_cookie,
@@ -54,7 +144,7 @@ class SessionMiddleware(starlette.middleware.sessions.SessionMiddleware):
                         security_flags=self.security_flags,
                     )
                     headers.append("Set-Cookie", header_value)
-                elif not initial_session_was_empty:
+                elif not session and not initial_session_was_empty:
                     # The session has been cleared.
                     headers = MutableHeaders(scope=message)
                     header_value = "{session_cookie}={data}; path={path}; {expires}{security_flags}".format(  # noqa E501
@@ -68,3 +158,101 @@ class SessionMiddleware(starlette.middleware.sessions.SessionMiddleware):
             await send(message)
 
         await self.app(scope, receive, send_wrapper)
+
+
+class RedisSessionMiddleware(BaseSessionMiddleware):
+    """
+    Keeps session data in Redis and only a random session ID in the cookie.
+    Data expires max_age after the last request, and is only written back
+    when the session was changed.
+
+    IDs are only ever generated by the server: an ID without stored session
+    is dropped, and the session gets a new ID when its user is set, changed
+    or removed, so an ID planted before login doesn't carry over.
+    """
+
+    key_prefix = "session:"
+
+    def __init__(self, app: ASGIApp, *, redis: Redis, **kwargs) -> None:
+        super().__init__(app, **kwargs)
+        self.redis = redis
+
+    async def load(self, session_id: str) -> SessionDict:
+        try:
+            data = await self.redis.getex(self.key_prefix + session_id, ex=self.max_age)
+        except RedisError as e:
+            logger.warning(f"Loading session failed: {e}")
+            return SessionDict()
+
+        return SessionDict(loads_session(data)) if data else SessionDict()
+
+    async def save(self, session_id: str, session: SessionDict) -> None:
+        try:
+            if session:
+                await self.redis.set(
+                    self.key_prefix + session_id,
+                    dumps_session(session),
+                    ex=self.max_age,
+                )
+            else:
+                await self.redis.delete(self.key_prefix + session_id)
+        except RedisError as e:
+            logger.warning(f"Saving session failed: {e}")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.is_excluded(scope):
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        cookie_id = connection.cookies.get(self.session_cookie)
+        session_id = None
+        scope["session"] = SessionDict()
+
+        if cookie_id:
+            session = await self.load(cookie_id)
+            if session:
+                session_id = cookie_id
+                scope["session"] = session
+
+        initial_user = scope["session"].get("user")
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal session_id
+
+            if message["type"] == "http.response.start":
+                session = scope["session"]
+
+                if session.modified:
+                    if session_id and session.get("user") is not initial_user:
+                        await self.save(session_id, SessionDict())
+                        session_id = None
+                    if session and not session_id:
+                        session_id = secrets.token_urlsafe(32)
+                    if session_id:
+                        await self.save(session_id, session)
+
+                headers = MutableHeaders(scope=message)
+                if session and session_id:
+                    # Cookie is sent again to slide its expiry along with Redis
+                    header_value = "{session_cookie}={data}; path={path}; {max_age}{security_flags}".format(  # noqa E501
+                        session_cookie=self.session_cookie,
+                        data=session_id,
+                        path=self.path,
+                        max_age=f"Max-Age={self.max_age}; " if self.max_age else "",
+                        security_flags=self.security_flags,
+                    )
+                    headers.append("Set-Cookie", header_value)
+                elif cookie_id:
+                    # The session has been cleared or has expired.
+                    header_value = "{session_cookie}={data}; path={path}; {expires}{security_flags}".format(  # noqa E501
+                        session_cookie=self.session_cookie,
+                        data="null",
+                        path=self.path,
+                        expires="expires=Thu, 01 Jan 1970 00:00:00 GMT; ",
+                        security_flags=self.security_flags,
+                    )
+                    headers.append("Set-Cookie", header_value)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
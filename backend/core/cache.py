@@ -0,0 +1,159 @@
+import uuid
+import logging
+
+import redis
+import redis.asyncio
+from typing import Iterable
+
+from sqlalchemy.orm import make_transient_to_detached
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from core.database import PENDING_INVALIDATION, COMMITTED_INVALIDATION
+from core.database.models.users import User
+from core.database.models.readonly import UserRead
+from core.database.models.permissions import TeamPermissions, TeamPermissionsMap
+
+logger = logging.getLogger(__name__)
+
+# Clients connect lazily, so importing this module doesn't need Redis
+redis_client = redis.Redis.from_url(settings.REDIS_URL)
+async_redis_client = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+
+
+async def cache_get(key: str) -> bytes | None:
+    try:
+        return await async_redis_client.get(key)
+    except redis.RedisError as e:
+        logger.warning(f"Reading cache failed: {e}")
+        return None
+
+
+async def cache_set(key: str, value: str | bytes, ttl: int) -> None:
+    try:
+        await async_redis_client.set(key, value, ex=ttl)
+    except redis.RedisError as e:
+        logger.warning(f"Writing cache failed: {e}")
+
+
+async def cache_delete(keys: list[str]) -> None:
+    if len(keys) == 0:
+        return
+
+    try:
+        await async_redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Invalidating cache failed: {e}")
+
+
+def cache_delete_sync(keys: list[str]) -> None:
+    if len(keys) == 0:
+        return
+
+    try:
+        redis_client.delete(*keys)
+    except redis.RedisError as e:
+        logger.warning(f"Invalidating cache failed: {e}")
+
+
+def invalidate_on_commit(db: Session | AsyncSession, keys: Iterable[str]) -> None:
+    """
+    Delete cache keys once the transaction of db has committed, by
+    flush_invalidations. Changes that are rolled back keep their keys.
+    """
+    db.info.setdefault(PENDING_INVALIDATION, set()).update(keys)
+
+
+async def flush_invalidations(db: AsyncSession) -> None:
+    """
+    Delete cache keys of changes db has committed.
+    """
+    keys = db.info.pop(COMMITTED_INVALIDATION, None)
+    if keys:
+        await cache_delete(list(keys))
+
+
+def flush_invalidations_sync(db: Session) -> None:
+    keys = db.info.pop(COMMITTED_INVALIDATION, None)
+    if keys:
+        cache_delete_sync(list(keys))
+
+
+def user_cache_key(user_uuid: uuid.UUID | str) -> str:
+    return f"cache:user:{user_uuid}"
+
+
+async def get_cached_user(db: AsyncSession, user_uuid: uuid.UUID | str) -> User | None:
+    """
+    Get user from shared cache. The user is attached to the session without
+    querying the database, so it can be updated like a loaded one.
+
+    :param db: Database Session the user is attached to
+    :param user_uuid: UUID of user
+    :return: User or None if not cached
+    """
+    if not int(settings.USER_CACHE_TTL):
+        return None
+
+    data = await cache_get(user_cache_key(user_uuid))
+    if data is None:
+        return None
+
+    user = User(**UserRead.model_validate_json(data).model_dump(exclude={"teams"}))
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+async def cache_user(user: User) -> None:
+    if int(settings.USER_CACHE_TTL):
+        await cache_set(
+            user_cache_key(user.uuid), user.model_dump_json(), int(settings.USER_CACHE_TTL)
+        )
+
+
+async def invalidate_users(user_uuids: list[uuid.UUID | str]) -> None:
+    if int(settings.USER_CACHE_TTL):
+        await cache_delete([user_cache_key(x) for x in user_uuids])
+
+
+def invalidate_users_on_commit(
+    db: Session | AsyncSession, user_uuids: Iterable[uuid.UUID | str]
+) -> None:
+    if int(settings.USER_CACHE_TTL):
+        invalidate_on_commit(db, [user_cache_key(x) for x in user_uuids])
+
+
+def permissions_cache_key(user_uuid: uuid.UUID | str) -> str:
+    return f"cache:permissions:{user_uuid}"
+
+
+async def get_cached_permissions(
+    user_uuid: uuid.UUID | str,
+) -> dict[uuid.UUID, TeamPermissions] | None:
+    if not int(settings.PERMISSION_CACHE_TTL):
+        return None
+
+    data = await cache_get(permissions_cache_key(user_uuid))
+    if data is None:
+        return None
+
+    return TeamPermissionsMap.validate_json(data)
+
+
+async def cache_permissions(
+    user_uuid: uuid.UUID | str, teams: dict[uuid.UUID, TeamPermissions]
+) -> None:
+    if int(settings.PERMISSION_CACHE_TTL):
+        await cache_set(
+            permissions_cache_key(user_uuid),
+            TeamPermissionsMap.dump_json(teams),
+            int(settings.PERMISSION_CACHE_TTL),
+        )
+
+
+def invalidate_permissions_on_commit(
+    db: Session | AsyncSession, user_uuids: Iterable[uuid.UUID | str]
+) -> None:
+    if int(settings.PERMISSION_CACHE_TTL):
+        invalidate_on_commit(db, [permissions_cache_key(x) for x in user_uuids])
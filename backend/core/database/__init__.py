@@ -1,7 +1,20 @@
+import uuid
+
 from sqlmodel import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 
 from config import settings
+from core.database.pool import (
+    TimedQueuePool,
+    TimedAsyncAdaptedQueuePool,
+    TimedNullPool,
+    instrument_pool,
+)
+from core.database.replicas import ReplicaRouter
+from core.database.instrumentation import instrument_queries
 from core.database.models.all import (
     OAuth2Token,
     EventSubscription,
@@ -9,7 +22,8 @@ from core.database.models.all import (
     Team,
     User,
     Membership,
-    TeamInvite
+    TeamInvite,
+    NotificationOutbox
 )
 
 SQLALCHEMY_DATABASE_URL = "postgresql://{username}:{password}@{server}/{db}" \
@@ -20,5 +34,124 @@ SQLALCHEMY_DATABASE_URL = "postgresql://{username}:{password}@{server}/{db}" \
     db=settings.DATABASE_NAME
 )
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+ASYNC_SQLALCHEMY_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace(
+    "postgresql://", "postgresql+asyncpg://", 1
+)
+
+# Session.info keys of cache keys to be deleted once their changes were
+# committed. Deleting them before lets concurrent requests cache old rows.
+PENDING_INVALIDATION = "pending_invalidation"
+COMMITTED_INVALIDATION = "committed_invalidation"
+
+POOL_ARGS = {
+    "pool_size": int(settings.DATABASE_POOL_SIZE),
+    "max_overflow": int(settings.DATABASE_MAX_OVERFLOW),
+    "pool_timeout": int(settings.DATABASE_POOL_TIMEOUT),
+    "pool_recycle": int(settings.DATABASE_POOL_RECYCLE),
+}
+
+
+def get_sync_engine_args() -> dict:
+    """
+    Behind an external pooler the pooler owns the connections, so every
+    Celery child connects on demand instead of keeping a pool of its own.
+    """
+    if settings.DATABASE_EXTERNAL_POOLER:
+        return {"poolclass": TimedNullPool}
+    return {"poolclass": TimedQueuePool, **POOL_ARGS}
+
+
+def get_async_engine_args() -> dict:
+    """
+    Transaction poolers hand each transaction to any server connection, so
+    asyncpg must not rely on server-side prepared statements. Statements
+    that still get prepared are named uniquely to avoid collisions.
+    """
+    args = {"poolclass": TimedAsyncAdaptedQueuePool, **POOL_ARGS}
+    if settings.DATABASE_EXTERNAL_POOLER:
+        args["connect_args"] = {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return args
+
+
+# Used by Celery and scripts
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    pool_logging_name="sync",
+    **get_sync_engine_args()
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+instrument_pool(engine, "sync")
+instrument_queries(engine)
+
+# Used by API routes
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+    pool_logging_name="async",
+    **get_async_engine_args()
+)
+instrument_pool(async_engine.sync_engine, "async")
+instrument_queries(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+# Used by read-only API routes when replicas are configured
+replica_engines = [
+    create_async_engine(
+        url.strip().replace("postgresql://", "postgresql+asyncpg://", 1),
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        pool_logging_name=f"replica{i}",
+        **get_async_engine_args()
+    )
+    for i, url in enumerate(settings.DATABASE_REPLICA_URLS.split(","))
+    if url.strip()
+]
+for i, replica_engine in enumerate(replica_engines):
+    instrument_pool(replica_engine.sync_engine, f"replica{i}")
+    instrument_queries(replica_engine.sync_engine)
+
+ReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+replica_router = ReplicaRouter(
+    replica_engines,
+    max_lag=float(settings.DATABASE_REPLICA_MAX_LAG),
+    check_interval=float(settings.DATABASE_REPLICA_CHECK_INTERVAL),
+)
+
+
+@event.listens_for(Session, "after_flush")
+def mark_flush_write(session, flush_context):
+    session.info["has_writes"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def count_commit(session):
+    session.info["commits"] = session.info.get("commits", 0) + 1
+
+
+@event.listens_for(Session, "after_commit")
+def commit_invalidation(session):
+    # Cache keys of committed changes may be deleted from now on
+    pending = session.info.pop(PENDING_INVALIDATION, None)
+    if pending:
+        session.info.setdefault(COMMITTED_INVALIDATION, set()).update(pending)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_invalidation(session, previous_transaction):
+    if previous_transaction.nested:
+        return
+    session.info.pop(PENDING_INVALIDATION, None)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def mark_statement_write(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["has_writes"] = True
@@ -1,13 +1,26 @@
 import json
-from sqlmodel import SQLModel, Session, asc, desc, col, select, func, update, delete
-
-from typing import Any, Generic, Optional, Type, TypeVar
+import base64
+import binascii
+import datetime
+import operator
+import uuid as uuid_pkg
+from functools import lru_cache, wraps
+from sqlmodel import SQLModel, Session, asc, desc, col, select, func, update, delete, insert
+from sqlmodel import and_, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import inspect
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from typing import Any, Generic, Iterable, Iterator, Optional, Sequence, Type, TypeVar
 from fastapi import HTTPException
 from fastapi.encoders import jsonable_encoder
 
+from core.cache import flush_invalidations
+
 ModelType = TypeVar("ModelType", bound=SQLModel)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=SQLModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=SQLModel)
+CRUDType = TypeVar("CRUDType", bound="CRUDBase")
 
 FilterParseException = HTTPException(
     status_code=400, detail="Filter parsing failed. Invalid attributes present."
@@ -17,55 +30,208 @@ OrderParseException = HTTPException(
     status_code=400, detail="Order parsing failed. Invalid attributes present."
 )
 
+GroupParseException = HTTPException(
+    status_code=400, detail="Group parsing failed. Invalid attributes present."
+)
+
+ColumnParseException = HTTPException(
+    status_code=400, detail="Column parsing failed. Invalid attributes present."
+)
+
 JSONParseError = HTTPException(status_code=400, detail="Invalid JSON string")
 
+CursorParseException = HTTPException(status_code=400, detail="Invalid cursor")
+
+# Session.info key marking sessions whose CRUD calls flush instead of commit
+UNIT_OF_WORK = "unit_of_work"
+
+# Order of keyset pages when none is given
+DEFAULT_PAGE_ORDER = ["created_on"]
+
+
+def filter_in(column: Any, value: Any) -> Any:
+    if not isinstance(value, list):
+        raise FilterParseException
+    return column.in_(value)
+
+
+def filter_isnull(column: Any, value: Any) -> Any:
+    if not isinstance(value, bool):
+        raise FilterParseException
+    return column.is_(None) if value else column.is_not(None)
+
+
+def filter_startswith(column: Any, value: Any) -> Any:
+    if not isinstance(value, str):
+        raise FilterParseException
+    return column.startswith(value, autoescape=True)
+
+
+# Filter operators by key suffix, e.g. {"twitch_id__in": ["1", "2"]}
+FILTER_OPERATORS = {
+    "eq": operator.eq,
+    "gt": operator.gt,
+    "ge": operator.ge,
+    "lt": operator.lt,
+    "le": operator.le,
+    "in": filter_in,
+    "isnull": filter_isnull,
+    "startswith": filter_startswith,
+}
+
+
+def split_suffix(key: str, suffixes: Iterable[str]) -> tuple[str, Optional[str]]:
+    """
+    Split operator suffix from key, e.g. "name__in" into ("name", "in").
+    Only a known suffix at the end of the key is treated as an operator.
+    """
+    name, sep, suffix = key.rpartition("__")
+    if sep and name and suffix in suffixes:
+        return name, suffix
+    return key, None
+
+
+@lru_cache(maxsize=None)
+def get_columns(model: Any) -> dict[str, Any]:
+    """
+    Columns that may be used for filtering, ordering and grouping
+    """
+    return {c.key: getattr(model, c.key) for c in inspect(model).column_attrs}
+
+
+@lru_cache(maxsize=None)
+def get_primary_key(model: Any) -> tuple[str, ...]:
+    return tuple(c.key for c in inspect(model).primary_key)
+
+
+def get_primary_key_values(model: Any, obj: Any) -> dict[str, Any]:
+    return {k: getattr(obj, k) for k in get_primary_key(model)}
+
+
+def primary_key_filter(model: Any, obj: Any) -> list[Any]:
+    """
+    Filter matching obj by primary key, which may consist of several columns
+    """
+    return [getattr(model, k) == v for k, v in get_primary_key_values(model, obj).items()]
+
+
+@lru_cache(maxsize=None)
+def get_relationships(model: Any) -> dict[str, tuple[Any, Any, bool]]:
+    """
+    Relationships that may be filtered through
+
+    :return: Dict of name: (attribute, related model, is collection)
+    """
+    return {
+        r.key: (getattr(model, r.key), r.mapper.class_, r.uselist)
+        for r in inspect(model).relationships
+    }
+
+
+def filter_signature(filters: dict) -> tuple:
+    """
+    Shape of filter dict without values, used as key of filter plan cache
+    """
+    return tuple(
+        sorted(
+            (k, filter_signature(v)) if isinstance(v, dict) else (k, None)
+            for k, v in filters.items()
+        )
+    )
+
+
+@lru_cache(maxsize=1024)
+def compile_filter_plan(model: Any, signature: tuple) -> tuple:
+    """
+    Validate filter keys and resolve their columns and operators
+
+    :param model: Model to be filtered
+    :param signature: Signature of filter dict
+    :return: Plan to be applied with apply_filter_plan
+    """
+    plan = []
+
+    for key, nested in signature:
+        if nested is not None:
+            if key not in get_relationships(model):
+                raise FilterParseException
+
+            attr, related, uselist = get_relationships(model)[key]
+            plan.append(
+                (key, None, attr, uselist, compile_filter_plan(related, nested))
+            )
+        else:
+            name, op = split_suffix(key, FILTER_OPERATORS)
+
+            if name not in get_columns(model):
+                raise FilterParseException
+
+            plan.append(
+                (key, FILTER_OPERATORS[op or "eq"], get_columns(model)[name], None, None)
+            )
+
+    return tuple(plan)
+
+
+def apply_filter_plan(plan: tuple, filters: dict) -> list:
+    new_filters = []
+
+    for key, op, attr, uselist, nested in plan:
+        value = filters[key]
+
+        if nested is not None:
+            conditions = and_(*apply_filter_plan(nested, value))
+            new_filters.append(attr.any(conditions) if uselist else attr.has(conditions))
+        elif isinstance(value, dict):
+            raise FilterParseException
+        else:
+            new_filters.append(op(col(attr), value))
+
+    return new_filters
+
 
 def parse_filter(filters: dict, parent: Any) -> list:
     """
-    Convert filter dict into filter list
+    Convert filter dict into filter list. Keys are column names with an
+    optional operator suffix, or relationship names with a nested filter dict.
 
     :param filters: Dict to be converted
     :param parent: Parent object / model
     :return: Filter list
     """
-    new_filters = []
+    return apply_filter_plan(
+        compile_filter_plan(parent, filter_signature(filters)), filters
+    )
 
-    for k, v in filters.items():
 
-        # Detect comparison
-        gt = "__gt" in k
-        ge = "__ge" in k
-        lt = "__lt" in k
-        le = "__le" in k
+@lru_cache(maxsize=1024)
+def compile_order_plan(model: Any, order: tuple[str, ...]) -> tuple:
+    """
+    Validate order keys and resolve them into (column, direction) pairs.
+    Direction is True for ascending, False for descending and None if not given.
+    """
+    plan = []
 
-        # Remove suffixes
-        if gt or ge or lt or le:
-            k = k[:-4]
+    for v in order:
+        name, direction = split_suffix(v, ("a", "d"))
 
-        try:
-            attr = getattr(parent, k)
-
-            # Construct filter expressions
-            if isinstance(v, dict):
-                new_filters += parse_filter(v, attr.property.mapper.class_)
-            else:
-                if gt:
-                    new_filters.append(col(attr) > v)
-                elif ge:
-                    new_filters.append(col(attr) >= v)
-                elif lt:
-                    new_filters.append(col(attr) < v)
-                elif le:
-                    new_filters.append(col(attr) <= v)
-                else:
-                    new_filters.append(col(attr) == v)
-        except AttributeError:
-            raise FilterParseException
+        if name not in get_columns(model):
+            raise OrderParseException
 
-    return new_filters
+        plan.append(
+            (get_columns(model)[name], None if direction is None else direction == "a")
+        )
+
+    return tuple(plan)
+
+
+def get_order_plan(order: list[str], parent: Any) -> tuple:
+    if not all(isinstance(v, str) for v in order):
+        raise OrderParseException
+    return compile_order_plan(parent, tuple(order))
 
 
-def parse_order(order: list[str], parent) -> list[str]:
+def parse_order(order: list[str], parent) -> list:
     """
     Convert order list into usable version in SQLAlchemy
 
@@ -73,41 +239,349 @@ def parse_order(order: list[str], parent) -> list[str]:
     :param parent: Parent object
     :return: New order list
     """
-    for i, v in enumerate(order):
-        a = "__a" in v
-        d = "__d" in v
+    return [
+        col(column)
+        if ascending is None
+        else asc(col(column))
+        if ascending
+        else desc(col(column))
+        for column, ascending in get_order_plan(order, parent)
+    ]
+
+
+def parse_group(group: list[str], parent: Any) -> list:
+    """
+    Convert grouping list into columns
+
+    :param group: Grouping list
+    :param parent: Parent object
+    :return: Column list
+    """
+    if not all(isinstance(v, str) and v in get_columns(parent) for v in group):
+        raise GroupParseException
+    return [get_columns(parent)[v] for v in group]
+
+
+def parse_columns(columns: list[str], parent: Any) -> list:
+    model_columns = get_columns(parent)
+
+    try:
+        return [model_columns[x] for x in columns]
+    except (KeyError, TypeError):
+        raise ColumnParseException
+
+
+def parse_keyset_order(order: list[str], parent: Any) -> list[tuple[Any, bool]]:
+    """
+    Convert order list into keyset columns. uuid is appended to make the key
+    unique. Nullable columns can't be compared row by row, so they are refused.
 
-        if a or d:
-            v = v[:-3]
+    :param order: Order list
+    :param parent: Parent model
+    :return: List of (column, is descending)
+    """
+    keys = []
 
-        if not hasattr(parent, v):
+    for column, ascending in get_order_plan(order, parent):
+        if any(c.nullable for c in column.property.columns):
             raise OrderParseException
 
-        order[i] = (
-            asc(col(getattr(parent, v)))
-            if a and not d
-            else desc(col(getattr(parent, v)))
-            if not a and d
-            else col(getattr(parent, v))
+        keys.append((column, ascending is False))
+
+    if "uuid" not in [column.key for column, _ in keys]:
+        keys.append((parent.uuid, keys[0][1] if keys else False))
+
+    return keys
+
+
+def encode_cursor(order: list[str], keys: list[tuple[Any, bool]], obj: Any) -> str:
+    """
+    Create opaque cursor pointing after given object
+
+    :param order: Order list the page was requested with
+    :param keys: Keyset columns
+    :param obj: Last object of page
+    :return: Cursor
+    """
+    values = [getattr(obj, column.key) for column, _ in keys]
+    data = json.dumps({"o": order, "k": jsonable_encoder(values)})
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, order: list[str], keys: list[tuple[Any, bool]]) -> list:
+    """
+    Read key values from cursor. Cursor must be used with the same order it
+    was created with.
+
+    :param cursor: Cursor from previous page
+    :param order: Order list of current request
+    :param keys: Keyset columns
+    :return: Key values
+    """
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.decoder.JSONDecodeError):
+        raise CursorParseException
+
+    if not isinstance(data, dict) or data.get("o") != order:
+        raise CursorParseException
+
+    values = data.get("k")
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise CursorParseException
+
+    try:
+        for i, (column, _) in enumerate(keys):
+            python_type = column.type.python_type
+            if python_type is datetime.datetime:
+                values[i] = datetime.datetime.fromisoformat(values[i])
+            elif python_type is uuid_pkg.UUID:
+                values[i] = uuid_pkg.UUID(values[i])
+    except (TypeError, ValueError, AttributeError, NotImplementedError):
+        raise CursorParseException
+
+    return values
+
+
+def build_keyset_filter(keys: list[tuple[Any, bool]], values: list) -> Any:
+    """
+    Build condition selecting rows after given key values, i.e.
+    (a > x) OR (a = x AND b > y) for ascending keys (a, b).
+    """
+    clauses = []
+
+    for i, (column, descending) in enumerate(keys):
+        conditions = [col(k) == v for (k, _), v in zip(keys[:i], values[:i])]
+        conditions.append(col(column) < values[i] if descending else col(column) > values[i])
+        clauses.append(and_(*conditions))
+
+    return or_(*clauses)
+
+
+def build_multi_query(
+    model: Any,
+    *,
+    columns: Optional[list[str]] = None,
+    filters: Optional[dict | str] = None,
+    group: Optional[list[str] | str] = None,
+    order: Optional[list[str] | str] = None,
+    options: Optional[Sequence] = None
+):
+    """
+    Build select statement from filter, grouping and order parameters
+
+    :param model: Model to be selected
+    :param columns: Only select these columns instead of whole objects
+    :param filters: Filter dict or JSON string
+    :param group: Grouping list or JSON string
+    :param order: Order list or JSON string
+    :param options: Loader options
+    :return: Select statement
+    """
+    q = select(*parse_columns(columns, model)) if columns else select(model)
+
+    # Add filter to query
+    if filters is not None:
+        if isinstance(filters, str):
+            try:
+                filters = json.loads(filters)
+            except json.decoder.JSONDecodeError:
+                raise JSONParseError
+
+            if not isinstance(filters, dict):
+                raise JSONParseError
+
+        q = q.filter(*parse_filter(filters, model))
+
+    # Add grouping to query
+    if group is not None:
+        if isinstance(group, str):
+            try:
+                group = json.loads(group)
+            except json.decoder.JSONDecodeError:
+                raise JSONParseError
+
+            if not isinstance(group, list):
+                raise JSONParseError
+
+        q = q.group_by(*parse_group(group, model))
+
+    # Add ordering to query
+    if order is not None:
+        if isinstance(order, str):
+            try:
+                order = json.loads(order)
+            except json.decoder.JSONDecodeError:
+                raise JSONParseError
+            if not isinstance(order, list):
+                raise JSONParseError
+
+        q = q.order_by(*parse_order(order, model))
+
+    if options:
+        q = q.options(*options)
+
+    return q
+
+
+def build_page_query(
+    model: Any,
+    *,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    filters: Optional[dict | str] = None,
+    group: Optional[list[str] | str] = None,
+    order: Optional[list[str] | str] = None,
+    options: Optional[Sequence] = None
+) -> tuple[Any, list[str], list[tuple[Any, bool]]]:
+    """
+    Build select statement for a keyset page. One extra row is selected to
+    find out if there is a next page.
+
+    :return: Select statement, order list and keyset columns
+    """
+    q = build_multi_query(model, filters=filters, group=group, options=options)
+
+    if order is None:
+        order = DEFAULT_PAGE_ORDER
+    elif isinstance(order, str):
+        try:
+            order = json.loads(order)
+        except json.decoder.JSONDecodeError:
+            raise JSONParseError
+        if not isinstance(order, list):
+            raise JSONParseError
+
+    keys = parse_keyset_order(order, model)
+
+    if cursor:
+        q = q.filter(build_keyset_filter(keys, decode_cursor(cursor, order, keys)))
+
+    q = q.order_by(
+        *[desc(col(column)) if descending else asc(col(column)) for column, descending in keys]
+    )
+
+    return q.limit(limit + 1), order, keys
+
+
+def commit(db: Session) -> bool:
+    """
+    Commit session, or only flush it when it belongs to a unit of work.
+    The owner of a unit of work commits it once at the end.
+
+    Cache keys of committed changes are deleted by the owner of the session
+    with flush_invalidations_sync, e.g. when a worker task has returned, or
+    by AsyncCRUD after the call.
+
+    :param db: Database Session to be used
+    :return: Was session committed
+    """
+    if db.info.get(UNIT_OF_WORK):
+        db.flush()
+        return False
+
+    db.commit()
+    return True
+
+
+def chunked(items: Sequence, size: Optional[int]) -> Iterator[Sequence]:
+    """
+    Split items into chunks of given size. None means a single chunk.
+    """
+    if not size:
+        size = max(len(items), 1)
+
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def get_row_data(obj_in: SQLModel | dict[str, Any]) -> dict[str, Any]:
+    if isinstance(obj_in, dict):
+        return obj_in
+    return obj_in.dict(exclude_unset=True)
+
+
+def build_rows(model: Any, objs_in: Sequence[SQLModel | dict[str, Any]]) -> list[dict]:
+    """
+    Convert input objects into full rows, defaults included, for bulk insert
+
+    :param model: Table model
+    :param objs_in: Create schemas or dicts
+    :return: Rows
+    """
+    return [model(**get_row_data(obj_in)).dict() for obj_in in objs_in]
+
+
+def build_upsert(
+    model: Any, unique_keys: Sequence[str], objs_in: Sequence[SQLModel | dict[str, Any]]
+):
+    """
+    Build INSERT ... ON CONFLICT DO UPDATE statement. Only columns given in
+    objs_in are overwritten on conflict.
+
+    :param model: Table model
+    :param unique_keys: Columns of unique constraint to detect conflicts on
+    :param objs_in: Create schemas or dicts
+    :return: Insert statement
+    """
+    columns = set()
+    for obj_in in objs_in:
+        columns.update(get_row_data(obj_in).keys())
+    columns -= {"uuid", "created_on", *unique_keys}
+
+    q = pg_insert(model)
+    if columns:
+        q = q.on_conflict_do_update(
+            index_elements=list(unique_keys),
+            set_={c: getattr(q.excluded, c) for c in sorted(columns)},
         )
-    return order
+    else:
+        q = q.on_conflict_do_nothing(index_elements=list(unique_keys))
+
+    return q.returning(model)
 
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # Columns of the unique constraint used by upsert_many
+    unique_keys: tuple[str, ...] = ("uuid",)
+
     def __init__(self, model: Type[ModelType]):
         self.model = model
 
-    def get_count(self, db: Session) -> int:
+    def changed(self, db: Session, objs: Sequence[ModelType]) -> None:
+        """
+        Called with the objects a CRUD method created, updated or removed,
+        before they are committed. Subclasses invalidate caches of them here
+        with invalidate_on_commit.
+        """
+
+    def get_count(self, db: Session, *, filters: Optional[dict | str] = None) -> int:
         """
         Get total number of objects in database.
         :param db: Database Session to be used
+        :param filters: Only count objects matching filter
         """
         # return db.query(self.model).count()
-        return db.scalar(select(func.count()).select_from(self.model))
+        q = build_multi_query(self.model, filters=filters)
+        return db.scalar(select(func.count()).select_from(q.subquery()))
+
+    def exists(self, db: Session, *, filters: Optional[dict | str] = None) -> bool:
+        """
+        Check if any object matches filter without loading it.
+        :param db: Database Session to be used
+        :param filters: Filter dict or JSON string
+        """
+        q = build_multi_query(self.model, filters=filters)
+        return db.scalar(select(q.exists()))
 
-    def get(self, db: Session, uuid: Any) -> Optional[ModelType]:
+    def get(
+        self, db: Session, uuid: Any, *, options: Optional[Sequence] = None
+    ) -> Optional[ModelType]:
         # return db.query(self.model).filter(self.model.id == id).first()
-        return db.scalars(select(self.model).filter(self.model.uuid == uuid)).first()
+        q = select(self.model).filter(self.model.uuid == uuid)
+        if options:
+            q = q.options(*options)
+        return db.scalars(q).first()
 
     def get_multi(
         self,
@@ -117,57 +591,80 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         limit: int = 100,
         filters: Optional[dict | str] = None,
         group: Optional[list[str] | str] = None,
-        order: Optional[list[str] | str] = None
+        order: Optional[list[str] | str] = None,
+        options: Optional[Sequence] = None
     ) -> list[ModelType]:
 
-        q = select(self.model)
-
-        # Add filter to query
-        if filters is not None:
-            if isinstance(filters, str):
-                try:
-                    filters = json.loads(filters)
-                except json.decoder.JSONDecodeError:
-                    raise JSONParseError
-
-                if not isinstance(filters, dict):
-                    raise JSONParseError
-
-            q = q.filter(*parse_filter(filters, self.model))
+        q = build_multi_query(
+            self.model, filters=filters, group=group, order=order, options=options
+        )
 
-        # Add grouping to query
-        if group is not None:
-            if isinstance(group, str):
-                try:
-                    group = json.loads(group)
-                except json.decoder.JSONDecodeError:
-                    raise JSONParseError
+        return db.scalars(q.offset(skip).limit(limit)).all()
 
-                if not isinstance(group, list):
-                    raise JSONParseError
+    def get_multi_columns(
+        self,
+        db: Session,
+        *,
+        columns: list[str],
+        skip: int = 0,
+        limit: Optional[int] = 100,
+        filters: Optional[dict | str] = None,
+        order: Optional[list[str] | str] = None
+    ) -> list[Any]:
+        """
+        Same as get_multi, but only selects the given columns. Rows are
+        returned as tuples with column names as attributes.
+        """
+        q = build_multi_query(self.model, columns=columns, filters=filters, order=order)
+        return db.execute(q.offset(skip).limit(limit)).all()
 
-            q = q.group_by(*group)
+    def get_page(
+        self,
+        db: Session,
+        *,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        filters: Optional[dict | str] = None,
+        group: Optional[list[str] | str] = None,
+        order: Optional[list[str] | str] = None,
+        options: Optional[Sequence] = None
+    ) -> tuple[list[ModelType], Optional[str]]:
+        """
+        Get page of objects with keyset pagination. Unlike get_multi with skip,
+        the cost of a page doesn't depend on how deep it is.
 
-        # Add ordering to query
-        if order is not None:
-            if isinstance(order, str):
-                try:
-                    order = json.loads(order)
-                except json.decoder.JSONDecodeError:
-                    raise JSONParseError
-                if not isinstance(order, list):
-                    raise JSONParseError
+        :param db: Database Session to be used
+        :param limit: Maximum size of page
+        :param cursor: Cursor returned with previous page
+        :param filters: Filter dict or JSON string
+        :param group: Grouping list or JSON string
+        :param order: Order list or JSON string, only non-nullable columns
+        :param options: Loader options
+        :return: Objects and cursor of next page, None on last page
+        """
+        q, order, keys = build_page_query(
+            self.model,
+            limit=limit,
+            cursor=cursor,
+            filters=filters,
+            group=group,
+            order=order,
+            options=options,
+        )
 
-            q = q.order_by(*parse_order(order, self.model))
+        result = db.scalars(q).all()
 
-        return db.scalars(q.offset(skip).limit(limit)).all()
+        if len(result) > limit:
+            return result[:limit], encode_cursor(order, keys, result[limit - 1])
+        return result, None
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        self.changed(db, [db_obj])
+        if commit(db):
+            db.refresh(db_obj)
         return db_obj
 
     def update(
@@ -183,17 +680,140 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         else:
             update_data = obj_in.dict(exclude_unset=True)
 
-        result = db.scalars(
-            update(self.model).where(self.model.uuid == db_obj.uuid).values(**update_data)
-            .returning(self.model)
-        )
+        obj = db.scalars(
+            update(self.model).where(*primary_key_filter(self.model, db_obj))
+            .values(**update_data).returning(self.model)
+        ).first()
 
-        db.commit()
-        return result.first()
+        self.changed(db, [obj])
+        commit(db)
+        return obj
 
     def remove(self, db: Session, *, uuid: Any) -> ModelType:
-        result = db.scalars(
+        obj = db.scalars(
             delete(self.model).where(self.model.uuid == uuid).returning(self.model)
-        )
-        db.commit()
-        return result.first()
+        ).first()
+        if obj is not None:
+            self.changed(db, [obj])
+        commit(db)
+        return obj
+
+    def create_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[CreateSchemaType | dict[str, Any]],
+        chunk_size: Optional[int] = 1000
+    ) -> list[ModelType]:
+        """
+        Insert objects with multi-row INSERT ... RETURNING in one transaction.
+
+        :param db: Database Session to be used
+        :param objs_in: Objects to be created
+        :param chunk_size: Rows per statement, None for all at once
+        :return: Created objects
+        """
+        result = []
+        for chunk in chunked(build_rows(self.model, objs_in), chunk_size):
+            result += db.scalars(insert(self.model).returning(self.model), chunk).all()
+
+        self.changed(db, result)
+        commit(db)
+        return result
+
+    def update_many(
+        self,
+        db: Session,
+        *,
+        db_objs: Sequence[ModelType],
+        objs_in: Sequence[UpdateSchemaType | dict[str, Any]],
+        chunk_size: Optional[int] = 1000
+    ) -> None:
+        """
+        Update objects by primary key with executemany in one transaction.
+
+        :param db: Database Session to be used
+        :param db_objs: Objects to be updated
+        :param objs_in: Contents to be updated, in the same order as db_objs
+        :param chunk_size: Rows per statement, None for all at once
+        """
+        rows = [
+            {**get_row_data(obj_in), **get_primary_key_values(self.model, db_obj)}
+            for db_obj, obj_in in zip(db_objs, objs_in)
+        ]
+
+        for chunk in chunked(rows, chunk_size):
+            db.execute(update(self.model), chunk)
+
+        self.changed(db, db_objs)
+        commit(db)
+
+    def remove_many(
+        self, db: Session, *, uuids: Sequence[Any], chunk_size: Optional[int] = 1000
+    ) -> list[ModelType]:
+        result = []
+        for chunk in chunked(uuids, chunk_size):
+            result += db.scalars(
+                delete(self.model).where(col(self.model.uuid).in_(chunk))
+                .returning(self.model)
+            ).all()
+
+        self.changed(db, result)
+        commit(db)
+        return result
+
+    def upsert_many(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[CreateSchemaType | dict[str, Any]],
+        chunk_size: Optional[int] = 1000
+    ) -> list[ModelType]:
+        """
+        Insert objects or update existing ones that conflict on unique_keys.
+
+        :param db: Database Session to be used
+        :param objs_in: Objects to be created or updated
+        :param chunk_size: Rows per statement, None for all at once
+        :return: Created and updated objects
+        """
+        q = build_upsert(self.model, self.unique_keys, objs_in)
+
+        result = []
+        for chunk in chunked(build_rows(self.model, objs_in), chunk_size):
+            result += db.scalars(
+                q.execution_options(populate_existing=True), chunk
+            ).all()
+
+        self.changed(db, result)
+        commit(db)
+        return result
+
+
+class AsyncCRUD(Generic[CRUDType]):
+    """
+    Runs the methods of a CRUD on AsyncSession. Each call executes the sync
+    method with AsyncSession.run_sync, which runs it on the underlying
+    Session in the same greenlet AsyncSession uses for its own statements,
+    so queries are only built in one place. Relationships are not loaded
+    lazily once a call returned, so the ones needed must be given as options.
+    """
+
+    def __init__(self, crud: CRUDType):
+        self.crud = crud
+        self.model = crud.model
+
+    def __getattr__(self, name: str) -> Any:
+        method = getattr(self.crud, name)
+        if not callable(method):
+            return method
+
+        @wraps(method)
+        async def run(db: AsyncSession, *args, **kwargs):
+            result = await db.run_sync(lambda session: method(session, *args, **kwargs))
+            await flush_invalidations(db)
+            return result
+
+        # Cached on instance, so __getattr__ only runs once per method
+        setattr(self, name, run)
+        return run
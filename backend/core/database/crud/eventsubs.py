@@ -2,7 +2,7 @@ import uuid
 
 from sqlmodel import Session, select
 
-from core.database.crud import CRUDBase, ModelType
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType
 from core.database.models.eventsubs import EventSubscription, EventSubscriptionCreate, EventSubscriptionUpdate
 
 
@@ -53,3 +53,4 @@ class CRUDEventSubscription(CRUDBase[EventSubscription, EventSubscriptionCreate,
 
 
 crud = CRUDEventSubscription(EventSubscription)
+acrud = AsyncCRUD(crud)
@@ -2,7 +2,7 @@ import uuid
 
 from sqlmodel import Session, select
 
-from core.database.crud import CRUDBase, ModelType
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType
 from core.database.models.invites import TeamInvite, TeamInviteCreate, TeamInviteUpdate
 
 
@@ -15,3 +15,4 @@ class CRUDTeamInvite(CRUDBase[TeamInvite, TeamInviteCreate, TeamInviteUpdate]):
 
 
 crud = CRUDTeamInvite(TeamInvite)
+acrud = AsyncCRUD(crud)
@@ -1,29 +1,59 @@
 import uuid
+from typing import Optional, Sequence
 from sqlmodel import Session, select
 
-from core.database.crud import CRUDBase, ModelType
+from core.cache import invalidate_permissions_on_commit
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType, commit
 from core.database.models.memberships import Membership, MembershipCreate, MembershipUpdate
 
 
 class CRUDMembership(CRUDBase[Membership, MembershipCreate, MembershipUpdate]):
-    def get_by_user_uuid(self, db: Session, user_uuid: uuid.UUID) -> list[ModelType]:
-        return db.scalars(
-            select(self.model).filter(self.model.user_uuid == user_uuid)).all()
-
-    def get_by_team_uuid(self, db: Session, team_uuid: uuid.UUID) -> list[ModelType]:
-        return db.scalars(
-            select(self.model).filter(self.model.team_uuid == team_uuid)).all()
-
-    def get_by_team_user_uuid(self, db: Session, user_uuid: uuid.UUID, team_uuid: uuid.UUID) -> ModelType | None:
-        return db.scalars(
-            select(self.model).filter(self.model.user_uuid == user_uuid).filter(self.model.team_uuid == team_uuid)
-        ).first()
+    """
+    Changes drop the permission snapshots of the affected users once they
+    were committed.
+    """
+
+    unique_keys = ("team_uuid", "user_uuid")
+
+    def changed(self, db: Session, objs: Sequence[Membership]) -> None:
+        invalidate_permissions_on_commit(db, {x.user_uuid for x in objs})
+
+    def get_by_user_uuid(
+        self, db: Session, user_uuid: uuid.UUID, *, options: Optional[Sequence] = None
+    ) -> list[ModelType]:
+        q = select(self.model).filter(self.model.user_uuid == user_uuid)
+        if options:
+            q = q.options(*options)
+        return db.scalars(q).all()
+
+    def get_by_team_uuid(
+        self, db: Session, team_uuid: uuid.UUID, *, options: Optional[Sequence] = None
+    ) -> list[ModelType]:
+        q = select(self.model).filter(self.model.team_uuid == team_uuid)
+        if options:
+            q = q.options(*options)
+        return db.scalars(q).all()
+
+    def get_by_team_user_uuid(
+        self,
+        db: Session,
+        user_uuid: uuid.UUID,
+        team_uuid: uuid.UUID,
+        *,
+        options: Optional[Sequence] = None
+    ) -> ModelType | None:
+        q = select(self.model).filter(self.model.user_uuid == user_uuid).filter(self.model.team_uuid == team_uuid)
+        if options:
+            q = q.options(*options)
+        return db.scalars(q).first()
 
     def remove_by_team_user_uuid(self, db: Session, *, user_uuid: uuid.UUID, team_uuid: uuid.UUID) -> ModelType:
         obj = self.get_by_team_user_uuid(db, user_uuid, team_uuid)
         db.delete(obj)
-        db.commit()
+        self.changed(db, [obj])
+        commit(db)
         return obj
 
 
 crud = CRUDMembership(Membership)
+acrud = AsyncCRUD(crud)
@@ -0,0 +1,69 @@
+import uuid
+from typing import Collection, Optional
+from sqlmodel import Session, col, select
+
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType
+from core.database.models.oauth import OAuth2Token, OAuth2TokenCreate, OAuth2TokenUpdate
+
+
+class CRUDOAuth2Token(CRUDBase[OAuth2Token, OAuth2TokenCreate, OAuth2TokenUpdate]):
+    def get_expiring(
+        self,
+        db: Session,
+        *,
+        after: int,
+        before: int,
+        limit: int = 100,
+        exclude: Collection[uuid.UUID] = ()
+    ) -> list[ModelType]:
+        """
+        Claim refreshable tokens that expire between given times, soonest
+        first. Claimed rows stay locked until the transaction ends, rows
+        locked by another transaction are skipped.
+
+        :param db: Database Session to be used
+        :param after: UNIX timestamp
+        :param before: UNIX timestamp
+        :param limit: Maximum number of tokens
+        :param exclude: UUIDs of tokens to be skipped
+        :return: Tokens
+        """
+        q = (
+            select(self.model)
+            .where(self.model.refresh_token.is_not(None))
+            .where(self.model.expires_at > after)
+            .where(self.model.expires_at < before)
+            .order_by(self.model.expires_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        if exclude:
+            q = q.where(col(self.model.uuid).not_in(exclude))
+        return db.scalars(q).all()
+
+    def get_by_user_name(
+        self, db: Session, user_uuid: uuid.UUID | str, name: str
+    ) -> Optional[ModelType]:
+        return db.scalars(
+            select(self.model).filter_by(user_id=user_uuid, name=name)
+        ).first()
+
+    def get_by_token(
+        self,
+        db: Session,
+        name: str,
+        *,
+        refresh_token: str | None = None,
+        access_token: str | None = None
+    ) -> Optional[ModelType]:
+        if refresh_token:
+            q = select(self.model).filter_by(name=name, refresh_token=refresh_token)
+        elif access_token:
+            q = select(self.model).filter_by(name=name, access_token=access_token)
+        else:
+            return None
+        return db.scalars(q).first()
+
+
+crud = CRUDOAuth2Token(OAuth2Token)
+acrud = AsyncCRUD(crud)
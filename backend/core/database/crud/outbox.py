@@ -0,0 +1,144 @@
+import datetime
+
+from sqlmodel import Session, select, update, delete
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType, commit
+from core.database.models.outbox import (
+    NotificationOutbox,
+    NotificationOutboxCreate,
+    NotificationOutboxUpdate,
+    OUTBOX_PENDING,
+    OUTBOX_SENT,
+    OUTBOX_FAILED,
+)
+from core.database.utils import timezoned
+
+
+class CRUDNotificationOutbox(
+    CRUDBase[NotificationOutbox, NotificationOutboxCreate, NotificationOutboxUpdate]
+):
+    def enqueue(
+        self, db: Session, *, objs_in: list[NotificationOutboxCreate]
+    ) -> list[ModelType]:
+        """
+        Insert outbox rows, ignoring targets that are already queued for the message.
+
+        :param db: Database Session to be used
+        :param objs_in: Rows to be queued
+        :return: Newly queued rows
+        """
+        if len(objs_in) == 0:
+            return []
+
+        q = (
+            insert(self.model)
+            .values([self.model(**obj.dict()).dict() for obj in objs_in])
+            .on_conflict_do_nothing(index_elements=["message_id", "eventsub_uuid"])
+            .returning(self.model)
+        )
+
+        result = db.scalars(select(self.model).from_statement(q)).all()
+        commit(db)
+        return result
+
+    def claim_batch(self, db: Session, *, limit: int = 100) -> list[ModelType]:
+        """
+        Lock a batch of due rows. Rows locked by other workers are skipped and
+        locks are held until the transaction is committed.
+
+        :param db: Database Session to be used
+        :param limit: Maximum size of batch
+        :return: Claimed rows
+        """
+        q = (
+            select(self.model)
+            .where(self.model.status == OUTBOX_PENDING)
+            .where(self.model.next_attempt_at <= timezoned())
+            .order_by(self.model.next_attempt_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        return db.scalars(q).all()
+
+    def mark_sent(self, db: Session, *, db_objs: list[NotificationOutbox]) -> None:
+        if len(db_objs) == 0:
+            return
+
+        db.execute(
+            update(self.model)
+            .where(self.model.uuid.in_([x.uuid for x in db_objs]))
+            .values(status=OUTBOX_SENT, updated_on=timezoned(), last_error=None)
+        )
+
+    def mark_failed(
+        self, db: Session, *, db_obj: NotificationOutbox, error: str
+    ) -> None:
+        """
+        Schedule retry with exponential backoff or give up after too many attempts.
+        """
+        attempts = db_obj.attempts + 1
+        delay = min(
+            int(settings.OUTBOX_RETRY_BASE) * 2 ** (attempts - 1),
+            int(settings.OUTBOX_RETRY_MAX),
+        )
+
+        db.execute(
+            update(self.model)
+            .where(self.model.uuid == db_obj.uuid)
+            .values(
+                status=OUTBOX_FAILED
+                if attempts >= int(settings.OUTBOX_MAX_ATTEMPTS)
+                else OUTBOX_PENDING,
+                attempts=attempts,
+                next_attempt_at=timezoned() + datetime.timedelta(seconds=delay),
+                last_error=error,
+                updated_on=timezoned(),
+            )
+        )
+
+    def purge(
+        self, db: Session, *, status: str, before: datetime.datetime, limit: int = 1000
+    ) -> int:
+        """
+        Delete rows of status that were last due before given time. For sent
+        and failed rows that is their last attempt, give or take the retry
+        delay, so the index used by claim_batch serves the purge as well.
+
+        :param db: Database Session to be used
+        :param status: Status of rows to be deleted
+        :param before: Deletes rows due before this time
+        :param limit: Maximum number of rows deleted
+        :return: Number of deleted rows
+        """
+        chunk = (
+            select(self.model.uuid)
+            .where(self.model.status == status)
+            .where(self.model.next_attempt_at < before)
+            .limit(limit)
+        )
+        result = db.execute(
+            delete(self.model).where(self.model.uuid.in_(chunk.scalar_subquery()))
+        )
+        commit(db)
+        return result.rowcount
+
+    def get_multi_by_status(
+        self,
+        db: Session,
+        status: str,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[ModelType]:
+        q = (
+            select(self.model)
+            .where(self.model.status == status)
+            .order_by(self.model.next_attempt_at)
+        )
+        return db.scalars(q.offset(skip).limit(limit)).all()
+
+
+crud = CRUDNotificationOutbox(NotificationOutbox)
+acrud = AsyncCRUD(crud)
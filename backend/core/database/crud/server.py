@@ -1,9 +1,10 @@
-from core.database.crud import CRUDBase
+from core.database.crud import CRUDBase, AsyncCRUD
 from core.database.models.server import Server, ServerCreate, ServerUpdate
 
 
 class CRUDServer(CRUDBase[Server, ServerCreate, ServerUpdate]):
-    pass
+    unique_keys = ("discord_id",)
 
 
 crud = CRUDServer(Server)
+acrud = AsyncCRUD(crud)
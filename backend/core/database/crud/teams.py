@@ -1,9 +1,12 @@
 import uuid
+from typing import Any, Optional, Sequence
 
-from sqlmodel import Session, select
+from sqlmodel import Session, col, select
 
-from core.database.crud import CRUDBase, ModelType
+from core.cache import invalidate_permissions_on_commit
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType
 from core.database.models.teams import Team, TeamCreate, TeamUpdate
+from core.database.models.memberships import Membership
 
 
 class CRUDTeam(CRUDBase[Team, TeamCreate, TeamUpdate]):
@@ -11,5 +14,21 @@ class CRUDTeam(CRUDBase[Team, TeamCreate, TeamUpdate]):
         return db.scalars(
             select(self.model).filter(self.model.user_uuid == user_uuid)).all()
 
+    def remove(self, db: Session, *, uuid: Any) -> Team:
+        # Memberships are removed by cascade, which the CRUD can't see
+        user_uuids = db.scalars(
+            select(Membership.user_uuid).filter(Membership.team_uuid == uuid)).all()
+        invalidate_permissions_on_commit(db, user_uuids)
+        return super().remove(db, uuid=uuid)
+
+    def remove_many(
+        self, db: Session, *, uuids: Sequence[Any], chunk_size: Optional[int] = 1000
+    ) -> list[Team]:
+        user_uuids = db.scalars(
+            select(Membership.user_uuid).filter(col(Membership.team_uuid).in_(uuids))).all()
+        invalidate_permissions_on_commit(db, user_uuids)
+        return super().remove_many(db, uuids=uuids, chunk_size=chunk_size)
+
 
 crud = CRUDTeam(Team)
+acrud = AsyncCRUD(crud)
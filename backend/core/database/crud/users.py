@@ -1,11 +1,22 @@
-from typing import Optional
+from typing import Optional, Sequence
 from sqlmodel import Session, select
 
-from core.database.crud import CRUDBase, ModelType
+from core.cache import invalidate_users_on_commit
+from core.database.crud import CRUDBase, AsyncCRUD, ModelType
 from core.database.models.users import User, UserCreate, UserUpdate
 
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    """
+    Changes drop the users from the cache used by get_current_user once
+    they were committed.
+    """
+
+    unique_keys = ("twitch_id",)
+
+    def changed(self, db: Session, objs: Sequence[User]) -> None:
+        invalidate_users_on_commit(db, [x.uuid for x in objs])
+
     def get_by_twitch_id(self, db: Session, twitch_id: str) -> Optional[ModelType]:
         return db.scalars(select(self.model).filter(self.model.twitch_id == twitch_id)).first()
 
@@ -14,3 +25,4 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
 
 
 crud = CRUDUser(User)
+acrud = AsyncCRUD(crud)
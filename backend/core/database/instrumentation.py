@@ -0,0 +1,175 @@
+import re
+import time
+import hashlib
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from core.metrics import DB_QUERIES, DB_QUERY_TIME, DB_SLOW_QUERIES
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_HEADER = "X-DB-Queries"
+QUERY_TIME_HEADER = "X-DB-Time"
+
+# Literals and bind parameters of psycopg2 and asyncpg
+FINGERPRINT_PATTERNS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\$\d+(?:::[\w ]+(?:\[\])?)?"), "?"),
+    (re.compile(r"%\(\w+\)s"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\s+"), " "),
+    # IN lists and multi-row VALUES of any length
+    (re.compile(r"\(\?(?:, \?)*\)"), "(?)"),
+    (re.compile(r"\(\?\)(?:, \(\?\))+"), "(?)"),
+)
+
+
+class RepeatedQueryError(Exception):
+    pass
+
+
+class QueryStats:
+    """
+    Statements run by a single request or task.
+    """
+
+    def __init__(self, scope: str, name: str):
+        self.scope = scope
+        self.name = name
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints: Counter[str] = Counter()
+
+
+current_stats: ContextVar[QueryStats | None] = ContextVar("query_stats", default=None)
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """
+    Normalize statement so that runs with different parameters are equal.
+    """
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        statement = pattern.sub(replacement, statement)
+    return statement.strip()
+
+
+def fingerprint_id(fp: str) -> str:
+    return hashlib.md5(fp.encode("utf-8")).hexdigest()[:12]
+
+
+@contextmanager
+def track_queries(scope: str, name: str) -> Iterator[QueryStats]:
+    """
+    Count statements run inside block. Name of stats may be changed inside
+    block, it is only used for metrics when block exits.
+
+    :param scope: "request" or "task"
+    :param name: Route path or task name
+    """
+    stats = QueryStats(scope, name)
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+        DB_QUERIES.labels(scope=stats.scope, name=stats.name).observe(stats.count)
+        DB_QUERY_TIME.labels(scope=stats.scope, name=stats.name).observe(
+            stats.duration
+        )
+
+
+def record_query(statement: str, elapsed: float) -> None:
+    stats = current_stats.get()
+    fp = None
+
+    if elapsed >= float(settings.DATABASE_SLOW_QUERY):
+        fp = fingerprint(statement)
+        DB_SLOW_QUERIES.labels(scope=stats.scope if stats else "none").inc()
+        logger.warning(
+            "Slow query %s took %.3fs in %s: %s",
+            fingerprint_id(fp),
+            elapsed,
+            stats.name if stats else "no scope",
+            fp,
+        )
+
+    if stats is None:
+        return
+
+    stats.count += 1
+    stats.duration += elapsed
+
+    limit = int(settings.DATABASE_QUERY_GUARD)
+    if limit:
+        fp = fp or fingerprint(statement)
+        stats.fingerprints[fp] += 1
+        if stats.fingerprints[fp] > limit:
+            raise RepeatedQueryError(
+                f"Statement ran {stats.fingerprints[fp]} times in {stats.name}, "
+                f"likely N+1: {fp}"
+            )
+
+
+def instrument_queries(engine: Engine) -> None:
+    """
+    Record every statement executed by engine.
+
+    :param engine: Engine to be tracked, sync_engine of AsyncEngine
+    """
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        record_query(statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def on_error(context):
+        if context.connection is not None and context.connection.info.get("query_start"):
+            context.connection.info["query_start"].pop()
+
+
+class QueryStatsMiddleware:
+    """
+    Tracks statements of each request. Counts are added to response headers
+    if headers is set.
+    """
+
+    def __init__(self, app: ASGIApp, *, headers: bool = False):
+        self.app = app
+        self.headers = headers
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries("request", "unmatched") as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start":
+                    # Set by FastAPI when the request was routed
+                    if "route" in scope:
+                        stats.name = scope["route"].path
+
+                    if self.headers:
+                        headers = MutableHeaders(scope=message)
+                        headers[QUERY_COUNT_HEADER] = str(stats.count)
+                        headers[QUERY_TIME_HEADER] = f"{stats.duration * 1000:.1f}"
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
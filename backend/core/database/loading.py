@@ -0,0 +1,26 @@
+from sqlalchemy.orm import joinedload, selectinload
+
+from core.database.models.all import Membership, Team, User
+
+# Loading profiles for the Read models. Relationships are not loaded lazily
+# while a response is serialized, so routes returning these models load them
+# with the matching profile. Collections are loaded with one extra SELECT
+# for all parents, the team and user of each membership are joined to it.
+
+# MembershipRead: 1 query
+MEMBERSHIP_READ = (
+    joinedload(Membership.team),
+    joinedload(Membership.user),
+)
+
+# TeamRead: 2 queries
+TEAM_READ = (
+    selectinload(Team.members).joinedload(Membership.team),
+    selectinload(Team.members).joinedload(Membership.user),
+)
+
+# UserRead: 2 queries
+USER_READ = (
+    selectinload(User.teams).joinedload(Membership.team),
+    selectinload(User.teams).joinedload(Membership.user),
+)
@@ -5,3 +5,4 @@ from .server import Server
 from .teams import Team
 from .memberships import Membership
 from .invites import TeamInvite
+from .outbox import NotificationOutbox
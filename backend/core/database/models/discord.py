@@ -22,11 +22,14 @@ class DiscordUser(BaseModel):
     is_admin: bool
 
 
-class DiscordServer(BaseModel):
+class DiscordServerSummary(BaseModel):
     discord_id: str
     name: str
     icon_url: str | None
+
+
+class DiscordServer(DiscordServerSummary):
     description: str | None
-    owner: DiscordUser
+    owner: DiscordUser | None
     channels: list[DiscordChannel]
     roles: list[DiscordRole]
@@ -1,11 +1,15 @@
 import uuid
 
-from sqlmodel import Field, SQLModel, Column, String
+from sqlmodel import Field, SQLModel, Column, String, Index
 
 from core.database.models import ObjectMixin
 
 
 class EventSubscription(SQLModel, ObjectMixin, table=True):
+    __table_args__ = (
+        Index("ix_eventsubscription_user_uuid_event", "user_uuid", "event"),
+    )
+
     user_uuid: uuid.UUID = Field(foreign_key="user.uuid", description="UUID of user", ondelete="CASCADE")
     server_discord_id: str = Field(
         description="Discord ID of Server", sa_column=Column(String(), nullable=False)
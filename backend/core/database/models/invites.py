@@ -5,8 +5,8 @@ from core.database.models import ObjectMixin
 
 
 class TeamInvite(SQLModel, ObjectMixin, table=True):
-    team_uuid: uuid.UUID = Field(description="UUID of team", foreign_key="team.uuid", ondelete="CASCADE")
-    user_twitch_id: str = Field(description="Twitch id of invited user")
+    team_uuid: uuid.UUID = Field(description="UUID of team", foreign_key="team.uuid", ondelete="CASCADE", index=True)
+    user_twitch_id: str = Field(description="Twitch id of invited user", index=True)
 
     class Config:
         from_attributes = True
@@ -14,7 +14,7 @@ class Membership(SQLModel, LinkObjectMixin, table=True):
         description="UUID of team", foreign_key="team.uuid", primary_key=True, ondelete="CASCADE"
     )
     user_uuid: uuid.UUID = Field(
-        description="UUID of user", foreign_key="user.uuid", primary_key=True, ondelete="CASCADE"
+        description="UUID of user", foreign_key="user.uuid", primary_key=True, ondelete="CASCADE", index=True
     )
     is_admin: bool = Field(description="Is admin of the team", default=False)
     allowed_invites: bool = Field(
@@ -1,6 +1,6 @@
 import uuid
 from typing import TYPE_CHECKING
-from sqlmodel import Field, SQLModel, Relationship, Column, Integer, String
+from sqlmodel import Field, SQLModel, Relationship, Column, Integer, String, Index
 
 from core.database.utils import INTEGER_SIZE
 from core.database.models import ObjectMixin
@@ -10,6 +10,10 @@ if TYPE_CHECKING:
 
 
 class OAuth2Token(SQLModel, ObjectMixin, table=True):
+    __table_args__ = (
+        Index("ix_oauth2token_user_id_name", "user_id", "name"),
+    )
+
     user_id: uuid.UUID = Field(
         foreign_key="user.uuid",
         description="ID of user",
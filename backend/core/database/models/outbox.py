@@ -0,0 +1,67 @@
+import uuid
+import datetime
+
+from sqlmodel import Field, SQLModel, Column, JSON, Index, UniqueConstraint
+
+from core.database.models import ObjectMixin
+from core.database.utils import timezoned
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_FAILED = "failed"
+
+
+class NotificationOutbox(SQLModel, ObjectMixin, table=True):
+    __table_args__ = (
+        UniqueConstraint("message_id", "eventsub_uuid"),
+        Index("ix_notificationoutbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    message_id: str = Field(description="Twitch EventSub message ID")
+    eventsub_uuid: uuid.UUID = Field(
+        foreign_key="eventsubscription.uuid",
+        description="UUID of target Event Subscription",
+        ondelete="CASCADE",
+    )
+    event: str = Field(description="Name of event object")
+    route: str = Field(description="IPC route used for delivery")
+    payload: dict = Field(
+        default_factory=dict,
+        description="IPC request payload",
+        sa_column=Column(JSON, nullable=False),
+    )
+    status: str = Field(OUTBOX_PENDING, description="Delivery status")
+    attempts: int = Field(0, description="Number of delivery attempts")
+    next_attempt_at: datetime.datetime = Field(
+        default_factory=timezoned, description="Next time delivery is attempted"
+    )
+    last_error: str | None = Field(None, description="Error of last failed attempt")
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+
+class NotificationOutboxCreate(SQLModel):
+    message_id: str = Field(description="Twitch EventSub message ID")
+    eventsub_uuid: uuid.UUID = Field(description="UUID of target Event Subscription")
+    event: str = Field(description="Name of event object")
+    route: str = Field(description="IPC route used for delivery")
+    payload: dict = Field(default_factory=dict, description="IPC request payload")
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
+
+
+class NotificationOutboxUpdate(SQLModel):
+    status: str | None = Field(None, description="Delivery status")
+    attempts: int | None = Field(None, description="Number of delivery attempts")
+    next_attempt_at: datetime.datetime | None = Field(
+        None, description="Next time delivery is attempted"
+    )
+    last_error: str | None = Field(None, description="Error of last failed attempt")
+
+    class Config:
+        from_attributes = True
+        populate_by_name = True
@@ -0,0 +1,49 @@
+import uuid
+from typing import Literal
+from pydantic import TypeAdapter
+from sqlmodel import Field, SQLModel
+
+
+class TeamPermissions(SQLModel):
+    is_admin: bool = Field(False, description="Is admin of the team")
+    allowed_invites: bool = Field(False, description="Is allowed to send invites")
+
+
+# Cached form of a snapshot, superadmin is taken from the user instead
+TeamPermissionsMap = TypeAdapter(dict[uuid.UUID, TeamPermissions])
+
+
+class PermissionSnapshot(SQLModel):
+    is_superadmin: bool = Field(False, description="Is user super admin")
+    teams: dict[uuid.UUID, TeamPermissions] = Field(
+        {}, description="Permissions by UUID of team"
+    )
+
+    def is_member(self, team_uuid: uuid.UUID) -> bool:
+        return self.is_superadmin or team_uuid in self.teams
+
+    def is_admin(self, team_uuid: uuid.UUID) -> bool:
+        return self.is_superadmin or (
+            team_uuid in self.teams and self.teams[team_uuid].is_admin
+        )
+
+    def can_invite(self, team_uuid: uuid.UUID) -> bool:
+        return self.is_superadmin or (
+            self.is_admin(team_uuid) and self.teams[team_uuid].allowed_invites
+        )
+
+    def can_use_eventsubs(self) -> bool:
+        return self.is_superadmin or len(self.teams) > 0
+
+
+class PermissionCheck(SQLModel):
+    permission: Literal["member", "admin", "invite", "eventsubs"] = Field(
+        description="Permission to be checked"
+    )
+    team_uuid: uuid.UUID | None = Field(
+        None, description="UUID of team, not needed for eventsubs"
+    )
+
+
+class PermissionCheckResult(PermissionCheck):
+    allowed: bool = Field(description="Is permission granted")
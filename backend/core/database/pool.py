@@ -0,0 +1,57 @@
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
+
+from core.metrics import DB_POOL_CHECKOUT_WAIT, DB_POOL_CHECKOUT_TIMEOUTS, DB_POOL_IN_USE
+
+
+class TimedPoolMixin:
+    """
+    Records how long checkouts wait for a connection. Pools are labeled by
+    pool_logging_name of the engine, which survives engine.dispose().
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            DB_POOL_CHECKOUT_TIMEOUTS.labels(pool=self.logging_name).inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_WAIT.labels(pool=self.logging_name).observe(
+                time.perf_counter() - start
+            )
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class TimedNullPool(TimedPoolMixin, NullPool):
+    pass
+
+
+def instrument_pool(engine: Engine, name: str) -> None:
+    """
+    Track connections in use of engine's pool.
+
+    :param engine: Engine to be tracked, sync_engine of AsyncEngine
+    :param name: Label of pool
+    """
+    gauge = DB_POOL_IN_USE.labels(pool=name)
+
+    @event.listens_for(engine, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        gauge.inc()
+
+    @event.listens_for(engine, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        gauge.dec()
@@ -0,0 +1,92 @@
+import time
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from core.metrics import DB_REPLICA_LAG
+
+logger = logging.getLogger(__name__)
+
+# Replay timestamp only advances when the primary writes, so a replica that
+# has replayed everything it received is considered up to date. That only
+# holds while it is streaming from the primary: a stopped WAL receiver also
+# leaves nothing to replay. Without one, lag is the age of the last replayed
+# transaction, NULL if there was none yet. The status of the receiver is only
+# visible to roles with pg_read_all_stats, others always get the age.
+REPLICA_LAG_QUERY = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn()
+            AND EXISTS (
+                SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming'
+            ) THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END
+    """
+)
+
+
+class ReplicaRouter:
+    """
+    Picks read replicas in turn, skipping ones that lag behind primary by
+    more than max_lag or can't be reached. Lag of each replica is checked at
+    most once per check_interval.
+    """
+
+    def __init__(
+        self, engines: list[AsyncEngine], *, max_lag: float, check_interval: float
+    ):
+        self.engines = engines
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+
+        self._lag: dict[int, float | None] = {}
+        self._checked_at: dict[int, float] = {}
+        self._next = 0
+
+    async def check_lag(self, index: int) -> float | None:
+        try:
+            async with self.engines[index].connect() as conn:
+                lag = await conn.scalar(REPLICA_LAG_QUERY)
+        except (SQLAlchemyError, OSError) as e:
+            logger.warning(f"Replica {index} is unavailable: {e}")
+            lag = None
+        else:
+            if lag is None:
+                logger.warning(f"Replica {index} is not streaming and has not replayed anything")
+            else:
+                lag = float(lag)
+
+        DB_REPLICA_LAG.labels(replica=str(index)).set(-1 if lag is None else lag)
+        return lag
+
+    async def get_lag(self, index: int) -> float | None:
+        """
+        Get lag of replica in seconds, None if replica is unavailable or its
+        lag is unknown
+        """
+        now = time.monotonic()
+
+        if now - self._checked_at.get(index, float("-inf")) >= self.check_interval:
+            # Concurrent requests keep using the previous value meanwhile
+            self._checked_at[index] = now
+            self._lag[index] = await self.check_lag(index)
+
+        return self._lag.get(index)
+
+    async def pick(self) -> AsyncEngine | None:
+        """
+        Get engine of next usable replica, None if all of them lag or are down
+        """
+        for _ in range(len(self.engines)):
+            index = self._next % len(self.engines)
+            self._next += 1
+
+            lag = await self.get_lag(index)
+            if lag is not None and lag <= self.max_lag:
+                return self.engines[index]
+
+        return None
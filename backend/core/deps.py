@@ -1,11 +1,20 @@
+import time
+
 from fastapi import Depends, HTTPException, Request
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from core.database import engine
-from core.database.crud.users import crud
+from core.database import engine, AsyncSessionLocal, ReadSessionLocal, replica_router
+from core.database.crud.users import acrud
+from core.database.crud import memberships
+from core.database.models.permissions import PermissionSnapshot, TeamPermissions
+from core.cache import get_cached_user, cache_user, get_cached_permissions, cache_permissions
+from core.cache import flush_invalidations
 from core.database.models.users import User
 
-from core.ipc.client import Client
+from core.ipc.sharding import get_ipc_client
+from core.database.crud import UNIT_OF_WORK
+from core.metrics import DB_COMMITS, DB_READ_ROUTING
 
 from config import settings
 
@@ -15,15 +24,71 @@ def get_db():
         yield session
 
 
+# Session key holding the time until which reads of the user go to primary
+PRIMARY_UNTIL_KEY = "db_primary_until"
+
+
+async def get_async_db(request: Request):
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            # Changes committed by the route itself
+            await flush_invalidations(session)
+
+        DB_COMMITS.labels(scope="request").observe(session.info.get("commits", 0))
+
+        # Let the user read their own writes until replicas have caught up
+        if session.info.get("has_writes"):
+            request.session[PRIMARY_UNTIL_KEY] = (
+                time.time() + float(settings.DATABASE_STICKY_PRIMARY)
+            )
+
+
+async def get_unit_of_work(db: AsyncSession = Depends(get_async_db)):
+    """
+    Request session in which CRUD calls only flush. It is committed once
+    after the route has returned, or rolled back if the route raised.
+    """
+    db.info[UNIT_OF_WORK] = True
+    yield db
+    await db.commit()
+    await flush_invalidations(db)
+
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only routes. Uses a replica, unless none is configured
+    or usable, or the user has written recently.
+    """
+    replica = None
+    if time.time() >= request.session.get(PRIMARY_UNTIL_KEY, 0):
+        replica = await replica_router.pick()
+
+    if replica is None:
+        DB_READ_ROUTING.labels(target="primary").inc()
+        async with AsyncSessionLocal() as session:
+            yield session
+    else:
+        DB_READ_ROUTING.labels(target="replica").inc()
+        async with ReadSessionLocal(bind=replica) as session:
+            yield session
+
+
 async def get_ipc():
     #async with Client(host=settings.IPC_HOST, port=settings.IPC_PORT, secret_key=settings.IPC_SECRET) as ipc_client:
     #    yield ipc_client
-    ipc_client = Client(host=settings.IPC_HOST, port=settings.IPC_PORT, secret_key=settings.IPC_SECRET)
+    ipc_client = get_ipc_client()
     yield ipc_client
-    await ipc_client.close()
 
+    # RPC clients are shared by all requests and stay connected
+    if settings.IPC_TRANSPORT != "rpc":
+        await ipc_client.close()
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+
+async def get_current_user(
+    request: Request, db: AsyncSession = Depends(get_async_db)
+) -> User:
     req_user = request.session.get("user", None)
 
     if req_user is None:
@@ -31,8 +96,52 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     if "uuid" not in req_user:
         raise HTTPException(status_code=400, detail="Invalid session")
 
-    user = crud.get(db, uuid=req_user["uuid"])
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Resolved once per request, also for code that only has the request
+    user = getattr(request.state, "current_user", None)
+    if user is not None:
+        return user
+
+    user = await get_cached_user(db, req_user["uuid"])
+    if user is None:
+        user = await acrud.get(db, uuid=req_user["uuid"])
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        await cache_user(user)
 
+    request.state.current_user = user
     return user
+
+
+async def get_permissions(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+) -> PermissionSnapshot:
+    """
+    Team permissions of the current user, loaded with one query and cached
+    until memberships of the user change.
+    """
+    permissions = getattr(request.state, "permissions", None)
+    if permissions is not None:
+        return permissions
+
+    teams = await get_cached_permissions(current_user.uuid)
+    if teams is None:
+        rows = await memberships.acrud.get_multi_columns(
+            db,
+            columns=["team_uuid", "is_admin", "allowed_invites"],
+            limit=None,
+            filters={"user_uuid": current_user.uuid},
+        )
+        teams = {
+            row.team_uuid: TeamPermissions(
+                is_admin=row.is_admin, allowed_invites=row.allowed_invites
+            )
+            for row in rows
+        }
+        await cache_permissions(current_user.uuid, teams)
+
+    request.state.permissions = PermissionSnapshot(
+        is_superadmin=bool(current_user.is_superadmin), teams=teams
+    )
+    return request.state.permissions
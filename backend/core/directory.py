@@ -0,0 +1,132 @@
+import logging
+
+import redis
+
+from core.cache import redis_client, async_redis_client
+from core.ipc.sharding import get_ipc_hosts
+from core.database.models.discord import DiscordServer, DiscordServerSummary
+
+logger = logging.getLogger(__name__)
+
+# Must match keys published by the bot
+DIRECTORY_VERSION_KEY = "discord:directory:version"
+DIRECTORY_GUILDS_KEY = "discord:directory:guilds"
+# Discord IDs of users linked to the site, the lean member cache of the bot keeps them
+LINKED_USERS_KEY = "discord:directory:linked_users"
+
+
+def directory_ready_key(process: int) -> str:
+    return f"discord:directory:ready:{process}"
+
+
+def directory_ready_keys() -> list[str]:
+    # Each bot process publishes its own guilds
+    return [directory_ready_key(x) for x in range(len(get_ipc_hosts()))]
+
+
+def guild_key(guild_id: int | str) -> str:
+    return f"discord:directory:guild:{guild_id}"
+
+
+def guild_summary_key(guild_id: int | str) -> str:
+    return f"discord:directory:guild:{guild_id}:summary"
+
+
+def user_guilds_key(user_id: int | str) -> str:
+    return f"discord:directory:user:{user_id}:guilds"
+
+
+async def get_cached_servers(
+    user_id: str | None = None,
+    *,
+    summary: bool = False,
+    skip: int = 0,
+    limit: int | None = None,
+) -> tuple[list[DiscordServer] | list[DiscordServerSummary], int] | None:
+    """
+    Get page of servers ordered by ID from guild directory published by the
+    processes of the bot.
+
+    :param user_id: Discord ID of user to get servers administrated by, all
+        servers if not given
+    :param summary: Only read summaries of servers
+    :param skip: Offset
+    :param limit: Max number of servers, all if not given
+    :return: Servers and version of directory or None if directory is cold
+    """
+    try:
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            pipe.mget(directory_ready_keys())
+            pipe.get(DIRECTORY_VERSION_KEY)
+            pipe.smembers(
+                user_guilds_key(user_id) if user_id else DIRECTORY_GUILDS_KEY
+            )
+            ready, version, guild_ids = await pipe.execute()
+
+        if not all(ready) or version is None:
+            return None
+
+        guild_ids = sorted(int(x) for x in guild_ids)
+        guild_ids = guild_ids[skip:] if limit is None else guild_ids[skip : skip + limit]
+        if len(guild_ids) == 0:
+            return [], int(version)
+
+        key = guild_summary_key if summary else guild_key
+        guilds = await async_redis_client.mget([key(x) for x in guild_ids])
+    except redis.RedisError as e:
+        logger.warning(f"Reading guild directory failed: {e}")
+        return None
+
+    if None in guilds:
+        return None
+
+    model = DiscordServerSummary if summary else DiscordServer
+    return [model.model_validate_json(x) for x in guilds], int(version)
+
+
+async def get_cached_server(server_id: str) -> tuple[DiscordServer, int] | None:
+    """
+    Get server from guild directory published by the bot.
+
+    :param server_id: Discord ID of server
+    :return: Server and version of directory or None if server is not cached
+    """
+    try:
+        async with async_redis_client.pipeline(transaction=True) as pipe:
+            pipe.mget(directory_ready_keys())
+            pipe.get(DIRECTORY_VERSION_KEY)
+            pipe.get(guild_key(server_id))
+            ready, version, guild = await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Reading guild directory failed: {e}")
+        return None
+
+    if not all(ready) or version is None or guild is None:
+        return None
+
+    return DiscordServer.model_validate_json(guild), int(version)
+
+
+async def link_discord_users(discord_ids: list[str]) -> None:
+    try:
+        await async_redis_client.sadd(LINKED_USERS_KEY, *discord_ids)
+    except redis.RedisError as e:
+        logger.warning(f"Publishing linked users failed: {e}")
+
+
+async def unlink_discord_users(discord_ids: list[str]) -> None:
+    try:
+        await async_redis_client.srem(LINKED_USERS_KEY, *discord_ids)
+    except redis.RedisError as e:
+        logger.warning(f"Publishing linked users failed: {e}")
+
+
+def publish_linked_users_sync(discord_ids: list[str]) -> None:
+    """
+    Replace linked users, e.g. to drop users unlinked while Redis was down.
+    """
+    with redis_client.pipeline(transaction=True) as pipe:
+        pipe.delete(LINKED_USERS_KEY)
+        if discord_ids:
+            pipe.sadd(LINKED_USERS_KEY, *discord_ids)
+        pipe.execute()
@@ -10,4 +10,5 @@ class Client(OriginalClient):
         await self.session.close()
 
     async def close(self):
-        await self.session.close()
+        if self.session:
+            await self.session.close()
@@ -0,0 +1,212 @@
+import struct
+import asyncio
+import logging
+import itertools
+
+import msgpack
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Frames are a 4 byte big endian length followed by a msgpack array. Must
+# match bot/core/rpc.py
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# [AUTH, secret], [REQUEST, id, endpoint, data], [RESPONSE, id, result], [CANCEL, id]
+AUTH = 0
+REQUEST = 1
+RESPONSE = 2
+CANCEL = 3
+
+
+class RpcError(Exception):
+    pass
+
+
+def encode_frame(message: list) -> bytes:
+    payload = msgpack.packb(message, use_bin_type=True)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> list:
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise RpcError(f"Frame of {size} bytes exceeds limit")
+    return msgpack.unpackb(await reader.readexactly(size), raw=False)
+
+
+async def open_connection(
+    host: str, port: int, path: str | None
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    if path:
+        return await asyncio.open_unix_connection(path)
+    return await asyncio.open_connection(host, port)
+
+
+class RpcClient:
+    """
+    Client of the RPC server of the bot. All requests share one connection
+    and may be in flight at once, responses are matched by request ID.
+    Connects on first request and again after the connection was lost.
+
+    Has the request and close methods of the IPC client, so it can be used
+    in its place.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 9998,
+        *,
+        path: str | None = None,
+        secret_key: str | None = None,
+        timeout: float = 10.0,
+        max_in_flight: int = 64,
+    ):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_key = secret_key or ""
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+
+        self._ids = itertools.count(1)
+        self._pending: dict[int, asyncio.Future] = {}
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        self._read_task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._connect_lock: asyncio.Lock | None = None
+        self._write_lock: asyncio.Lock | None = None
+        self._in_flight: asyncio.Semaphore | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def _bind_loop(self) -> None:
+        # Primitives are bound to the loop they were created in
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+
+        self._loop = loop
+        self._connect_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._pending = {}
+        self._reader = self._writer = self._read_task = None
+
+    async def connect(self) -> None:
+        self._bind_loop()
+
+        async with self._connect_lock:
+            if self.connected:
+                return
+
+            self._reader, self._writer = await open_connection(
+                self.host, self.port, self.path
+            )
+            self._writer.write(encode_frame([AUTH, self.secret_key]))
+            await self._writer.drain()
+            self._read_task = asyncio.create_task(
+                self._read_responses(self._reader, self._writer)
+            )
+
+    async def _read_responses(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        error: Exception = ConnectionError("RPC connection closed")
+        try:
+            while True:
+                message = await read_frame(reader)
+                if message[0] != RESPONSE:
+                    continue
+
+                future = self._pending.pop(message[1], None)
+                if future is not None and not future.done():
+                    future.set_result(message[2])
+        except (asyncio.IncompleteReadError, ConnectionError, RpcError) as e:
+            error = ConnectionError(f"RPC connection lost: {e!r}")
+        finally:
+            writer.close()
+            if self._writer is writer:
+                self._writer = None
+
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(error)
+            self._pending.clear()
+
+    async def _send(self, message: list) -> None:
+        async with self._write_lock:
+            if not self.connected:
+                raise ConnectionError("RPC connection closed")
+            self._writer.write(encode_frame(message))
+            # Waits while the bot isn't reading fast enough
+            await self._writer.drain()
+
+    async def request(self, endpoint: str, *, timeout: float | None = None, **kwargs):
+        """
+        Call route of the bot.
+
+        :param endpoint: Name of route
+        :param timeout: Seconds to wait for response, timeout of client if not given
+        :return: Response of route
+        """
+        self._bind_loop()
+
+        async with self._in_flight:
+            if not self.connected:
+                await self.connect()
+
+            request_id = next(self._ids)
+            future = asyncio.get_running_loop().create_future()
+            self._pending[request_id] = future
+
+            try:
+                await self._send([REQUEST, request_id, endpoint, kwargs])
+                return await asyncio.wait_for(future, timeout or self.timeout)
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                if self._pending.pop(request_id, None) is not None and self.connected:
+                    # Let the bot stop working on it, response would be dropped anyway
+                    try:
+                        await self._send([CANCEL, request_id])
+                    except ConnectionError:
+                        pass
+                raise
+            finally:
+                self._pending.pop(request_id, None)
+
+    async def close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+            try:
+                await self._read_task
+            except asyncio.CancelledError:
+                pass
+            self._read_task = None
+
+
+_clients: dict[str, RpcClient] = {}
+
+
+def get_rpc_client(host: str | None = None) -> RpcClient:
+    """
+    Client shared by all requests of the process.
+
+    :param host: Host of bot process, IPC_HOST if not given
+    """
+    host = host or settings.IPC_HOST
+    if host not in _clients:
+        _clients[host] = RpcClient(
+            host,
+            int(settings.RPC_PORT),
+            path=settings.RPC_PATH or None,
+            secret_key=settings.IPC_SECRET,
+            timeout=float(settings.RPC_TIMEOUT),
+            max_in_flight=int(settings.RPC_MAX_IN_FLIGHT),
+        )
+    return _clients[host]
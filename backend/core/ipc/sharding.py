@@ -0,0 +1,105 @@
+import asyncio
+import itertools
+
+from config import settings
+from core.ipc.client import Client
+from core.ipc.rpc import RpcClient, get_rpc_client
+
+# Routes answered by every bot process for its own guilds
+CROSS_SHARD_ROUTES = {"get_all_servers", "get_user_servers"}
+
+# Request parameters carrying the guild a route acts on
+GUILD_ID_PARAMS = ("server_discord_id", "server_id")
+
+
+def get_shard_id(guild_id: int | str, shard_count: int) -> int:
+    """
+    Shard Discord sends events of guild to. Must match bot/core/sharding.py
+    """
+    return (int(guild_id) >> 22) % shard_count
+
+
+def get_ipc_hosts() -> list[str]:
+    hosts = [x.strip() for x in settings.IPC_HOSTS.split(",") if x.strip()]
+    return hosts or [settings.IPC_HOST]
+
+
+def create_client(host: str) -> Client | RpcClient:
+    if settings.IPC_TRANSPORT == "rpc":
+        return get_rpc_client(host)
+    return Client(host=host, port=settings.IPC_PORT, secret_key=settings.IPC_SECRET)
+
+
+class ShardedClient:
+    """
+    Routes requests to the bot process running the shard of their guild.
+    Requests of cross shard routes go to all processes and their results are
+    merged in order of discord_id, the order each process pages them in.
+    """
+
+    def __init__(self, clients: list[Client | RpcClient], shard_count: int):
+        if shard_count < len(clients):
+            raise ValueError(
+                f"{len(clients)} bot processes need at least as many shards, got {shard_count}"
+            )
+
+        self.clients = clients
+        self.shard_count = shard_count
+
+    def get_client(self, kwargs: dict) -> Client | RpcClient:
+        for param in GUILD_ID_PARAMS:
+            if kwargs.get(param):
+                # Shards are dealt to processes round robin
+                shard_id = get_shard_id(kwargs[param], self.shard_count)
+                return self.clients[shard_id % len(self.clients)]
+
+        return self.clients[0]
+
+    async def request(self, endpoint: str, **kwargs):
+        if endpoint in CROSS_SHARD_ROUTES:
+            return await self.request_all(endpoint, **kwargs)
+        return await self.get_client(kwargs).request(endpoint, **kwargs)
+
+    async def request_all(self, endpoint: str, **kwargs) -> list | dict:
+        skip = kwargs.pop("skip", 0) or 0
+        limit = kwargs.pop("limit", None)
+
+        # Any process may hold the whole page
+        responses = await asyncio.gather(
+            *[
+                x.request(
+                    endpoint,
+                    skip=0,
+                    limit=None if limit is None else skip + limit,
+                    **kwargs,
+                )
+                for x in self.clients
+            ]
+        )
+
+        for response in responses:
+            if isinstance(response, dict) and "error" in response:
+                return response
+
+        merged = sorted(
+            itertools.chain.from_iterable(responses), key=lambda x: int(x["discord_id"])
+        )
+        return merged[skip:] if limit is None else merged[skip : skip + limit]
+
+    async def close(self) -> None:
+        for client in self.clients:
+            await client.close()
+
+
+IpcClient = Client | RpcClient | ShardedClient
+
+
+def get_ipc_client() -> IpcClient:
+    """
+    Client of the bot, routing requests to its processes if it is sharded.
+    RPC clients are shared by the process and must not be closed.
+    """
+    clients = [create_client(x) for x in get_ipc_hosts()]
+    if len(clients) == 1:
+        return clients[0]
+    return ShardedClient(clients, int(settings.SHARD_COUNT))
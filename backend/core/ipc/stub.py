@@ -0,0 +1,167 @@
+import time
+import random
+import asyncio
+
+from aiohttp import web, WSMsgType
+
+from core.ipc.rpc import AUTH, CANCEL, REQUEST, RESPONSE, RpcError, encode_frame, read_frame
+
+# Routes served by bot/core/cogs/ipc.py
+NOTIFICATION_ROUTES = {
+    "send_live_notification",
+    "send_new_subscription_notification",
+    "send_resubscription_notification",
+    "send_gift_subscription_notification",
+    "send_cheer_notification",
+    "send_raid_notification",
+    "send_hype_train_end_notification",
+}
+
+QUERY_ROUTES = {
+    "get_all_servers": [],
+    "get_user_servers": [],
+    "get_member": {},
+    "get_server": {},
+}
+
+
+class StubRoutes:
+    """
+    Imitates the routes of the bot. Notification routes wait for a simulated
+    Discord round trip and report success, query routes return responses.
+    """
+
+    def __init__(
+        self, latency: float = 0.05, jitter: float = 0.0, responses: dict | None = None
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.responses = {**QUERY_ROUTES, **(responses or {})}
+
+        self.requests = 0
+        self.errors = 0
+        self.started = time.monotonic()
+
+    async def respond(self, endpoint: str | None):
+        if endpoint in NOTIFICATION_ROUTES:
+            delay = self.latency + random.uniform(0, self.jitter)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            response = None
+        elif endpoint in self.responses:
+            response = self.responses[endpoint]
+        else:
+            self.errors += 1
+            response = {"error": "Invalid or unknown endpoint", "code": 404}
+
+        self.requests += 1
+        return response
+
+
+class StubIpcServer(StubRoutes):
+    """
+    Imitates the IPC server of the bot.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9999, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+
+        self._runner: web.AppRunner | None = None
+
+    async def handle_accept(self, request: web.Request) -> web.WebSocketResponse:
+        websocket = web.WebSocketResponse()
+        await websocket.prepare(request)
+
+        async for message in websocket:
+            if message.type != WSMsgType.TEXT:
+                continue
+
+            request_data = message.json()
+            response = await self.respond(request_data.get("endpoint"))
+            await websocket.send_json(response)
+
+        return websocket
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_route("GET", "/", self.handle_accept)
+
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.started = time.monotonic()
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class StubRpcServer(StubRoutes):
+    """
+    Imitates the RPC server of the bot. Requests are answered concurrently
+    and cancelled on CANCEL, but without the concurrency limit of the bot.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 9998,
+        *,
+        secret_key: str | None = None,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.secret_key = secret_key or ""
+
+        self._server: asyncio.AbstractServer | None = None
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        tasks: dict[int, asyncio.Task] = {}
+        write_lock = asyncio.Lock()
+
+        async def handle(request_id: int, endpoint: str) -> None:
+            response = await self.respond(endpoint)
+            try:
+                async with write_lock:
+                    writer.write(encode_frame([RESPONSE, request_id, response]))
+                    await writer.drain()
+            except ConnectionError:
+                pass
+
+        try:
+            message = await read_frame(reader)
+            if message[0] != AUTH or message[1] != self.secret_key:
+                return
+
+            while True:
+                message = await read_frame(reader)
+
+                if message[0] == REQUEST:
+                    task = asyncio.create_task(handle(message[1], message[2]))
+                    tasks[message[1]] = task
+                    task.add_done_callback(lambda t, i=message[1]: tasks.pop(i, None))
+                elif message[0] == CANCEL and message[1] in tasks:
+                    tasks[message[1]].cancel()
+        except (asyncio.IncompleteReadError, ConnectionError, RpcError):
+            pass
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(
+            self.handle_connection, self.host, self.port
+        )
+        self.started = time.monotonic()
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
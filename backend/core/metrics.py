@@ -0,0 +1,151 @@
+import os
+import time
+import datetime
+
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    multiprocess,
+)
+
+# Stages of a notification in the order they happen. Latency of a stage is
+# measured from the previous stage that has a timestamp.
+NOTIFICATION_STAGES = (
+    "twitch",
+    "received",
+    "enqueued",
+    "worker_started",
+    "helix_fetched",
+    "ipc_sent",
+    "discord_ack",
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+
+NOTIFICATION_STAGE_LATENCY = Histogram(
+    "notification_stage_latency_seconds",
+    "Time spent between notification stages",
+    ["event", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that gave up waiting for a connection",
+    ["pool"],
+)
+
+DB_POOL_IN_USE = Gauge(
+    "db_pool_connections_in_use",
+    "Connections currently checked out of the pool",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+
+
+DB_REPLICA_LAG = Gauge(
+    "db_replica_lag_seconds",
+    "Replication lag of read replica, -1 if unreachable",
+    ["replica"],
+    multiprocess_mode="max",
+)
+
+DB_READ_ROUTING = Counter(
+    "db_read_routing_total",
+    "Read sessions by database they were routed to",
+    ["target"],
+)
+
+
+DB_COMMITS = Histogram(
+    "db_commits_per_scope",
+    "Commits done by a single request or task",
+    ["scope"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100),
+)
+
+DB_QUERIES = Histogram(
+    "db_queries_per_scope",
+    "Statements run by a single request or task",
+    ["scope", "name"],
+    buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250, 1000),
+)
+
+DB_QUERY_TIME = Histogram(
+    "db_query_seconds_per_scope",
+    "Time spent running statements by a single request or task",
+    ["scope", "name"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "Statements slower than DB_SLOW_QUERY",
+    ["scope"],
+)
+
+
+def get_registry() -> CollectorRegistry:
+    """
+    Get registry to be exported. Processes forked by gunicorn or Celery
+    share their metrics through PROMETHEUS_MULTIPROC_DIR if it is set.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def parse_twitch_timestamp(timestamp: str) -> float | None:
+    """
+    Convert RFC3339 timestamp with nanosecond precision into UNIX time.
+    """
+    try:
+        date, _, fraction = timestamp.rstrip("Z").partition(".")
+        dt = datetime.datetime.fromisoformat(date).replace(tzinfo=datetime.UTC)
+        return dt.timestamp() + (float(f"0.{fraction}") if fraction else 0.0)
+    except ValueError:
+        return None
+
+
+def mark_stage(timings: dict | None, stage: str) -> dict:
+    if timings is None:
+        timings = {}
+    timings[stage] = time.time()
+    return timings
+
+
+def observe_stages(event: str, timings: dict | None, stages: list[str]) -> None:
+    """
+    Record latencies of given stages.
+
+    :param event: Subscription type of notification
+    :param timings: Stage timestamps carried by notification
+    :param stages: Stages to be recorded
+    """
+    if not timings:
+        return
+
+    previous = None
+    for stage in NOTIFICATION_STAGES:
+        if stage not in timings:
+            continue
+
+        if previous is not None and stage in stages:
+            NOTIFICATION_STAGE_LATENCY.labels(event=event, stage=stage).observe(
+                max(timings[stage] - timings[previous], 0)
+            )
+        previous = stage
@@ -1,5 +1,10 @@
 from fastapi import HTTPException
 
+# Response header carrying the cursor of the next page of a list endpoint
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Response header carrying the version of the guild directory a response was read from
+DIRECTORY_VERSION_HEADER = "X-Directory-Version"
+
 
 def not_authorized():
     return HTTPException(status_code=401, detail="Not authorized")
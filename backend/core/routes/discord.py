@@ -1,38 +1,94 @@
-from fastapi import APIRouter, Depends, HTTPException, Path
-from nextcord.ext.ipc import Client
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Response
 
-from core.database.models.discord import DiscordServer
+from core.database.models.discord import DiscordServer, DiscordServerSummary
 from core.database.models.users import User
 
 from core.deps import get_current_user, get_ipc
-from core.routes import not_authorized, not_found, forbidden
+from core.directory import get_cached_servers, get_cached_server
+from core.ipc.sharding import IpcClient
+from core.routes import not_authorized, not_found, forbidden, DIRECTORY_VERSION_HEADER
 
 router = APIRouter()
 
 
-@router.get("/servers", response_model=list[DiscordServer], tags=["discord"])
-async def get_servers(
-    *, current_user: User = Depends(get_current_user), ipc: Client = Depends(get_ipc)
-) -> list[DiscordServer]:
+async def read_servers(
+    current_user: User,
+    ipc: IpcClient,
+    response: Response,
+    *,
+    summary: bool,
+    skip: int,
+    limit: int | None,
+) -> list[DiscordServer] | list[DiscordServerSummary]:
     if not current_user:
         raise not_authorized()
 
     if not current_user.discord_id:
         raise HTTPException(status_code=400, detail="Discord not linked!")
 
+    cached = await get_cached_servers(
+        None if current_user.is_superadmin else current_user.discord_id,
+        summary=summary,
+        skip=skip,
+        limit=limit,
+    )
+    if cached is not None:
+        servers, version = cached
+        response.headers[DIRECTORY_VERSION_HEADER] = str(version)
+        return servers
+
+    mode = "summary" if summary else "full"
     if current_user.is_superadmin:
-        servers = await ipc.request("get_all_servers")
+        servers = await ipc.request("get_all_servers", mode=mode, skip=skip, limit=limit)
     else:
-        servers = await ipc.request("get_user_servers", user_id=current_user.discord_id)
+        servers = await ipc.request(
+            "get_user_servers",
+            user_id=current_user.discord_id,
+            mode=mode,
+            skip=skip,
+            limit=limit,
+        )
 
-    return [DiscordServer.parse_obj(s) for s in servers]
+    model = DiscordServerSummary if summary else DiscordServer
+    return [model.parse_obj(s) for s in servers]
+
+
+@router.get("/servers", response_model=list[DiscordServer], tags=["discord"])
+async def get_servers(
+    *,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    ipc: IpcClient = Depends(get_ipc),
+    skip: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=1000, description="All servers if not given"),
+) -> list[DiscordServer]:
+    return await read_servers(
+        current_user, ipc, response, summary=False, skip=skip, limit=limit
+    )
+
+
+@router.get(
+    "/servers/summary", response_model=list[DiscordServerSummary], tags=["discord"]
+)
+async def get_server_summaries(
+    *,
+    response: Response,
+    current_user: User = Depends(get_current_user),
+    ipc: IpcClient = Depends(get_ipc),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> list[DiscordServerSummary]:
+    return await read_servers(
+        current_user, ipc, response, summary=True, skip=skip, limit=limit
+    )
 
 
 @router.get("/servers/{server_id}", response_model=DiscordServer, tags=["discord"])
 async def get_server(
     *,
+    response: Response,
     current_user: User = Depends(get_current_user),
-    ipc: Client = Depends(get_ipc),
+    ipc: IpcClient = Depends(get_ipc),
     server_id: str = Path(..., description="ID of server")
 ) -> DiscordServer:
     if not current_user:
@@ -41,6 +97,12 @@ async def get_server(
     if not current_user.discord_id:
         raise HTTPException(status_code=400, detail="Discord not linked!")
 
+    cached = await get_cached_server(server_id)
+    if cached is not None:
+        server, version = cached
+        response.headers[DIRECTORY_VERSION_HEADER] = str(version)
+        return server
+
     server = await ipc.request("get_server", server_id=server_id)
 
     if server == {}:
@@ -1,16 +1,17 @@
 import uuid
 
 from fastapi import APIRouter, Depends, Path, Body
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from core.deps import get_db, get_current_user
+from core.deps import get_async_db, get_read_db, get_current_user, get_permissions
 from core.database.models.users import User
 from core.database.models.eventsubs import (
     EventSubscription,
     EventSubscriptionCreate,
     EventSubscriptionUpdate,
 )
-from core.database.crud import eventsubs, memberships
+from core.database.models.permissions import PermissionSnapshot
+from core.database.crud import eventsubs
 
 from worker import create_twitch_eventsub, delete_twitch_eventsub
 
@@ -19,32 +20,34 @@ from core.routes import not_authorized, not_found, forbidden
 router = APIRouter()
 
 
-def check_feature_availability(db: Session, current_user: User) -> None:
-    mships = memberships.crud.get_by_user_uuid(db, current_user.uuid)
-
-    if len(mships) == 0 and not current_user.is_superadmin:
+def check_feature_availability(permissions: PermissionSnapshot) -> None:
+    if not permissions.can_use_eventsubs():
         raise forbidden()
 
 
 @router.get("/", response_model=list[EventSubscription], tags=["eventsubs"])
-def get_eventsubs(
-    *, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)
+async def get_eventsubs(
+    *,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
 ) -> list[EventSubscription]:
     if not current_user:
         raise not_authorized()
 
-    check_feature_availability(db, current_user)
+    check_feature_availability(permissions)
 
-    return eventsubs.crud.get_multi_by_user_uuid(db, current_user.uuid)
+    return await eventsubs.acrud.get_multi_by_user_uuid(db, current_user.uuid)
 
 
 @router.get(
     "/user/{user_uuid}", response_model=list[EventSubscription], tags=["eventsubs"]
 )
-def get_eventsubs_by_user(
+async def get_eventsubs_by_user(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     user_uuid: uuid.UUID = Path(..., description="UUID of user")
 ) -> list[EventSubscription]:
     if not current_user:
@@ -53,27 +56,28 @@ def get_eventsubs_by_user(
     if not current_user.is_superadmin and current_user.uuid != user_uuid:
         raise forbidden()
 
-    check_feature_availability(db, current_user)
+    check_feature_availability(permissions)
 
-    return eventsubs.crud.get_multi_by_user_uuid(db, user_uuid)
+    return await eventsubs.acrud.get_multi_by_user_uuid(db, user_uuid)
 
 
 @router.post("/", response_model=EventSubscription, tags=["eventsubs"])
-def create_eventsub(
+async def create_eventsub(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     eventsub: EventSubscriptionCreate = Body(..., description="Eventsubscription")
 ) -> EventSubscription:
     if not current_user:
         raise not_authorized()
 
-    check_feature_availability(db, current_user)
+    check_feature_availability(permissions)
 
     if not current_user.is_superadmin and current_user.uuid != eventsub.user_uuid:
         raise forbidden()
 
-    db_eventsub = eventsubs.crud.create(db, obj_in=eventsub)
+    db_eventsub = await eventsubs.acrud.create(db, obj_in=eventsub)
 
     create_twitch_eventsub.delay(db_eventsub.dict())
 
@@ -81,18 +85,19 @@ def create_eventsub(
 
 
 @router.get("/{eventsub_uuid}", response_model=EventSubscription, tags=["eventsubs"])
-def get_eventsub(
+async def get_eventsub(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     eventsub_uuid: uuid.UUID = Path(..., description="UUID of Event subscription")
 ) -> EventSubscription:
     if not current_user:
         raise not_authorized()
 
-    check_feature_availability(db, current_user)
+    check_feature_availability(permissions)
 
-    eventsub = eventsubs.crud.get(db, eventsub_uuid)
+    eventsub = await eventsubs.acrud.get(db, eventsub_uuid)
 
     if not eventsub:
         raise not_found("Event Subscription")
@@ -104,10 +109,11 @@ def get_eventsub(
 
 
 @router.put("/{eventsub_uuid}", response_model=EventSubscription, tags=["eventsubs"])
-def update_eventsub(
+async def update_eventsub(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     eventsub_uuid: uuid.UUID = Path(..., description="UUID of Event subscription"),
     eventsub_update: EventSubscriptionUpdate = Body(
         ..., description="Contents to be updated"
@@ -116,9 +122,9 @@ def update_eventsub(
     if not current_user:
         raise not_authorized()
 
-    check_feature_availability(db, current_user)
+    check_feature_availability(permissions)
 
-    db_eventsub = eventsubs.crud.get(db, eventsub_uuid)
+    db_eventsub = await eventsubs.acrud.get(db, eventsub_uuid)
 
     if not db_eventsub:
         raise not_found("Event Subscription")
@@ -126,21 +132,21 @@ def update_eventsub(
     if not current_user.is_superadmin and current_user.uuid != db_eventsub.user_uuid:
         raise forbidden()
 
-    db_eventsub = eventsubs.crud.update(db, db_obj=db_eventsub, obj_in=eventsub_update)
+    db_eventsub = await eventsubs.acrud.update(db, db_obj=db_eventsub, obj_in=eventsub_update)
     return db_eventsub
 
 
 @router.delete("/{eventsub_uuid}", response_model=EventSubscription, tags=["eventsubs"])
-def delete_eventsub(
+async def delete_eventsub(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     eventsub_uuid: uuid.UUID = Path(..., description="UUID of Event Subscription")
 ) -> EventSubscription:
     if not current_user:
         raise not_authorized()
 
-    db_eventsub = eventsubs.crud.get(db, eventsub_uuid)
+    db_eventsub = await eventsubs.acrud.get(db, eventsub_uuid)
 
     if not db_eventsub:
         raise not_found("Event Subscription")
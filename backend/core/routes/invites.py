@@ -1,45 +1,51 @@
 import uuid
 
-from fastapi import APIRouter, Depends, Path, Body
-from sqlmodel import Session
-
-from core.deps import get_db, get_current_user
+from fastapi import APIRouter, Depends, Path, Body, Response, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.deps import (
+    get_async_db,
+    get_read_db,
+    get_unit_of_work,
+    get_current_user,
+    get_permissions,
+)
 from core.database.models.users import User
-from core.database.models.teams import Team
 from core.database.models.invites import TeamInvite, TeamInviteCreate, TeamInviteUpdate
-from core.database.models.memberships import Membership, MembershipCreate
+from core.database.models.memberships import MembershipCreate
+from core.database.models.permissions import PermissionSnapshot
 from core.database.crud import teams
 from core.database.crud import memberships
 from core.database.crud import invites
 
-from core.routes import not_authorized, not_found, forbidden
+from core.routes import not_authorized, not_found, forbidden, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
 
-def check_invite_permissions(
-    db: Session, current_user: User, invite: TeamInvite | TeamInviteCreate
-) -> tuple[Team, Membership]:
-    db_team = teams.crud.get(db, invite.team_uuid)
-
-    if not db_team:
+async def check_invite_permissions(
+    db: AsyncSession,
+    permissions: PermissionSnapshot,
+    invite: TeamInvite | TeamInviteCreate,
+) -> None:
+    if not await teams.acrud.exists(db, filters={"uuid": invite.team_uuid}):
         raise not_found("Team")
 
-    mship = memberships.crud.get_by_team_user_uuid(
-        db, current_user.uuid, invite.team_uuid
-    )
-
-    if not current_user.is_superadmin and (mship is None or not mship.is_admin):
+    if not permissions.is_admin(invite.team_uuid):
         raise forbidden()
 
-    return db_team, mship
-
 
 @router.get("/", response_model=list[TeamInvite], tags=["invites"])
-def get_invites(
+async def get_invites(
+    response: Response,
     *,
-    db: Session = Depends(get_db),
-    current_user: User | None = Depends(get_current_user)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User | None = Depends(get_current_user),
+    cursor: str | None = Query(None, description="Cursor of next page"),
+    skip: int | None = Query(None, ge=0, description="Offset, disables cursors"),
+    limit: int = Query(100, ge=1, le=1000),
+    filters: str | None = Query(None, description="Filter as JSON"),
+    order: str | None = Query(None, description="Order as JSON list"),
 ) -> list[TeamInvite]:
     if not current_user:
         raise not_authorized()
@@ -47,39 +53,52 @@ def get_invites(
     if not current_user.is_superadmin:
         raise forbidden()
 
-    return invites.crud.get_multi(db)
+    if skip is not None:
+        return await invites.acrud.get_multi(
+            db, skip=skip, limit=limit, filters=filters, order=order
+        )
+
+    db_invites, next_cursor = await invites.acrud.get_page(
+        db, limit=limit, cursor=cursor, filters=filters, order=order
+    )
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return db_invites
 
 
 @router.post("/", response_model=TeamInvite, tags=["invites"])
-def create_invite(
+async def create_invite(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     invite: TeamInviteCreate = Body(..., description="Invite")
 ) -> TeamInvite:
     if not current_user:
         raise not_authorized()
 
-    _, db_mship = check_invite_permissions(db, current_user, invite)
+    await check_invite_permissions(db, permissions, invite)
 
-    if not current_user.is_superadmin and not db_mship.allowed_invites:
+    if not permissions.can_invite(invite.team_uuid):
         raise forbidden()
 
-    db_invite = invites.crud.create(db, obj_in=invite)
+    db_invite = await invites.acrud.create(db, obj_in=invite)
     return db_invite
 
 
 @router.get("/{invite_uuid}", response_model=TeamInvite, tags=["invites"])
-def get_invite(
+async def get_invite(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     invite_uuid: uuid.UUID = Path(..., description="UUID of invite")
 ) -> TeamInvite:
     if not current_user:
         raise not_authorized()
 
-    invite = invites.crud.get(db, invite_uuid)
+    invite = await invites.acrud.get(db, invite_uuid)
 
     if not invite:
         raise not_found("Invite")
@@ -90,60 +109,62 @@ def get_invite(
 
 
 @router.put("/{invite_uuid}", response_model=TeamInvite, tags=["invites"])
-def update_invite(
+async def update_invite(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     invite_uuid: uuid.UUID = Path(..., description="UUID of invite"),
     invite_update: TeamInviteUpdate = Body(..., description="Contents to be updated")
 ) -> TeamInvite:
     if not current_user:
         raise not_authorized()
 
-    db_invite = invites.crud.get(db, invite_uuid)
+    db_invite = await invites.acrud.get(db, invite_uuid)
 
     if not db_invite:
         raise not_found("Invite")
 
-    check_invite_permissions(db, current_user, db_invite)
+    await check_invite_permissions(db, permissions, db_invite)
 
-    db_invite = invites.crud.update(db, db_obj=db_invite, obj_in=invite_update)
+    db_invite = await invites.acrud.update(db, db_obj=db_invite, obj_in=invite_update)
     return db_invite
 
 
 @router.delete("/{invite_uuid}", response_model=TeamInvite, tags=["invites"])
-def delete_invite(
+async def delete_invite(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    db: AsyncSession = Depends(get_async_db),
     invite_uuid: uuid.UUID = Path(..., description="UUID of invite")
 ) -> TeamInvite:
     if not current_user:
         raise not_authorized()
 
-    db_invite = invites.crud.get(db, invite_uuid)
+    db_invite = await invites.acrud.get(db, invite_uuid)
 
     if not db_invite:
         raise not_found("Invite")
 
-    check_invite_permissions(db, current_user, db_invite)
+    await check_invite_permissions(db, permissions, db_invite)
 
-    invites.crud.remove(db, uuid=invite_uuid)
+    await invites.acrud.remove(db, uuid=invite_uuid)
 
     return db_invite
 
 
 @router.post("/{invite_uuid}/redeem", response_model=TeamInvite, tags=["invites"])
-def redeem_invite(
+async def redeem_invite(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_unit_of_work),
     invite_uuid: uuid.UUID = Path(..., description="UUID of invite")
 ) -> TeamInvite:
     if not current_user:
         raise not_authorized()
 
-    db_invite = invites.crud.get(db, invite_uuid)
+    db_invite = await invites.acrud.get(db, invite_uuid)
 
     if not db_invite:
         raise not_found("Invite")
@@ -151,9 +172,9 @@ def redeem_invite(
     if not db_invite.user_twitch_id == current_user.twitch_id:
         raise forbidden()
 
-    team = teams.crud.get(db, db_invite.team_uuid)
-
-    is_first = len(team.members) == 0
+    is_first = not await memberships.acrud.exists(
+        db, filters={"team_uuid": db_invite.team_uuid}
+    )
 
     membership = MembershipCreate(
         **{
@@ -164,8 +185,8 @@ def redeem_invite(
         }
     )
 
-    memberships.crud.create(db, obj_in=membership)
+    await memberships.acrud.create(db, obj_in=membership)
 
-    db_invite = invites.crud.remove(db, uuid=invite_uuid)
+    db_invite = await invites.acrud.remove(db, uuid=invite_uuid)
 
     return db_invite
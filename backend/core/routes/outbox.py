@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, Query
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.deps import get_async_db, get_current_user
+from core.database.models.users import User
+from core.database.models.outbox import NotificationOutbox, OUTBOX_PENDING
+from core.database.crud import outbox
+
+from core.routes import not_authorized, forbidden
+
+router = APIRouter()
+
+
+@router.get("/", response_model=list[NotificationOutbox], tags=["outbox"])
+async def get_outbox(
+    *,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user),
+    status: str = Query(OUTBOX_PENDING, description="Delivery status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+) -> list[NotificationOutbox]:
+    if not current_user:
+        raise not_authorized()
+
+    if not current_user.is_superadmin:
+        raise forbidden()
+
+    return await outbox.acrud.get_multi_by_status(db, status, skip=skip, limit=limit)
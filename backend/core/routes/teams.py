@@ -1,63 +1,58 @@
 import uuid
 
 from fastapi import APIRouter, Depends, Path, Body
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from core.deps import get_db, get_current_user
+from core.deps import get_async_db, get_read_db, get_current_user, get_permissions
 from core.database.models.users import User
 from core.database.models.teams import Team, TeamUpdate, TeamCreate
 from core.database.models.invites import TeamInvite
 from core.database.models.memberships import MembershipUpdate
 from core.database.models.readonly import MembershipRead, TeamRead, UserRead
+from core.database.models.permissions import PermissionSnapshot
 from core.database.crud import teams
+from core.database.crud import users
 from core.database.crud import memberships
 from core.database.crud import invites
+from core.database.loading import MEMBERSHIP_READ, TEAM_READ, USER_READ
 
 from core.routes import not_authorized, not_found, forbidden
 
 router = APIRouter()
 
 
-def check_membership(
-    db: Session, current_user: User, team_uuid: uuid.UUID
-) -> MembershipRead:
-    mship = memberships.crud.get_by_team_user_uuid(db, current_user.uuid, team_uuid)
-
-    if not current_user.is_superadmin and mship is None:
+def check_membership(permissions: PermissionSnapshot, team_uuid: uuid.UUID) -> None:
+    if not permissions.is_member(team_uuid):
         raise forbidden()
 
-    return mship
-
 
-def check_adminship(
-    db: Session, current_user: User, team_uuid: uuid.UUID
-) -> MembershipRead:
-    mship = memberships.crud.get_by_team_user_uuid(db, current_user.uuid, team_uuid)
-
-    if not current_user.is_superadmin and (mship is None or not mship.is_admin):
+def check_adminship(permissions: PermissionSnapshot, team_uuid: uuid.UUID) -> None:
+    if not permissions.is_admin(team_uuid):
         raise forbidden()
 
-    return mship
-
 
 @router.get("/", response_model=list[str | TeamRead | MembershipRead], tags=["teams"])
-def get_teams(
+async def get_teams(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User | None | UserRead = Depends(get_current_user)
 ) -> list[str | TeamRead | MembershipRead]:
     if not current_user:
-        return [team.name for team in teams.crud.get_multi(db)]
+        return [
+            team.name
+            for team in await teams.acrud.get_multi_columns(db, columns=["name"])
+        ]
     elif not current_user.is_superadmin:
-        return current_user.teams
+        user = await users.acrud.get(db, current_user.uuid, options=USER_READ)
+        return user.teams
     else:
-        return teams.crud.get_multi(db)
+        return await teams.acrud.get_multi(db, options=TEAM_READ)
 
 
 @router.post("/", response_model=TeamRead, tags=["teams"])
-def create_teams(
+async def create_teams(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
     team: TeamCreate = Body(..., description="Team")
 ) -> TeamRead:
@@ -67,21 +62,21 @@ def create_teams(
     if not current_user.is_superadmin:
         raise forbidden()
 
-    db_team = teams.crud.create(db, obj_in=team)
-    return db_team
+    db_team = await teams.acrud.create(db, obj_in=team)
+    return await teams.acrud.get(db, db_team.uuid, options=TEAM_READ)
 
 
 @router.get("/{team_uuid}", response_model=TeamRead, tags=["teams"])
-def get_team(
+async def get_team(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
     team_uuid: uuid.UUID = Path(..., description="UUID of team")
 ) -> TeamRead:
     if not current_user:
         raise not_authorized()
 
-    team = teams.crud.get(db, team_uuid)
+    team = await teams.acrud.get(db, team_uuid, options=TEAM_READ)
 
     if not team:
         raise not_found("Team")
@@ -92,87 +87,93 @@ def get_team(
 @router.get(
     "/{team_uuid}/invites", response_model=list[TeamInvite], tags=["teams", "invites"]
 )
-def get_invites_by_team(
+async def get_invites_by_team(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     team_uuid: uuid.UUID = Path(..., description="UUID of team")
 ) -> list[TeamInvite]:
     if not current_user:
         raise not_authorized()
 
-    team = teams.crud.get(db, team_uuid)
+    team = await teams.acrud.get(db, team_uuid)
 
     if not team:
         raise not_found("Team")
 
-    check_adminship(db, current_user, team_uuid)
+    check_adminship(permissions, team_uuid)
 
-    return invites.crud.get_by_team_uuid(db, team_uuid)
+    return await invites.acrud.get_by_team_uuid(db, team_uuid)
 
 
 @router.put("/{team_uuid}", response_model=TeamRead, tags=["teams"])
-def update_team(
+async def update_team(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
+    permissions: PermissionSnapshot = Depends(get_permissions),
     team_uuid: uuid.UUID = Path(..., description="UUID of team"),
     team_update: TeamUpdate = Body(..., description="Contents to be updated")
 ) -> TeamRead:
     if not current_user:
         raise not_authorized()
 
-    db_team = teams.crud.get(db, team_uuid)
+    db_team = await teams.acrud.get(db, team_uuid, options=TEAM_READ)
 
     if not db_team:
         raise not_found("Team")
 
-    check_adminship(db, current_user, team_uuid)
+    check_adminship(permissions, team_uuid)
 
-    db_team = teams.crud.update(db, db_obj=db_team, obj_in=team_update)
+    db_team = await teams.acrud.update(db, db_obj=db_team, obj_in=team_update)
     return db_team
 
 
 @router.delete("/{team_uuid}", response_model=TeamRead, tags=["team"])
-def delete_team(
+async def delete_team(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    db: AsyncSession = Depends(get_async_db),
     team_uuid: uuid.UUID = Path(..., description="UUID of team")
 ) -> TeamRead:
     if not current_user:
         raise not_authorized()
 
-    db_team = teams.crud.get(db, team_uuid)
+    db_team = await teams.acrud.get(db, team_uuid, options=TEAM_READ)
 
     if not db_team:
         raise not_found("Team")
 
-    check_adminship(db, current_user, team_uuid)
+    check_adminship(permissions, team_uuid)
 
-    teams.crud.remove(db, uuid=team_uuid)
+    await teams.acrud.remove(db, uuid=team_uuid)
 
     return db_team
 
 
 @router.get("/{team_uuid}/members", response_model=list[MembershipRead])
-def get_members(
+async def get_members(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    db: AsyncSession = Depends(get_read_db),
     team_uuid: uuid.UUID = Path(..., description="UUID of team")
 ) -> list[MembershipRead]:
     if not current_user:
         raise not_authorized()
 
-    db_team = teams.crud.get(db, team_uuid)
+    db_team = await teams.acrud.get(db, team_uuid)
 
     if not db_team:
         raise not_found("Team")
 
-    check_membership(db, current_user, team_uuid)
+    check_membership(permissions, team_uuid)
 
-    db_memberships = memberships.crud.get_by_team_uuid(db, team_uuid)
+    db_memberships = await memberships.acrud.get_by_team_uuid(
+        db, team_uuid, options=MEMBERSHIP_READ
+    )
 
     return db_memberships
 
@@ -199,24 +200,27 @@ def get_members(
 
 
 @router.get("/{team_uuid}/members/{user_uuid}", response_model=MembershipRead)
-def get_member(
+async def get_member(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    db: AsyncSession = Depends(get_read_db),
     team_uuid: uuid.UUID = Path(..., description="UUID of team"),
     user_uuid: uuid.UUID = Path(..., description="UUID of user")
 ) -> MembershipRead:
     if not current_user:
         raise not_authorized()
 
-    db_team = teams.crud.get(db, team_uuid)
+    db_team = await teams.acrud.get(db, team_uuid)
 
     if not db_team:
         raise not_found("Team")
 
-    check_membership(db, current_user, team_uuid)
+    check_membership(permissions, team_uuid)
 
-    membership = memberships.crud.get_by_team_user_uuid(db, user_uuid, team_uuid)
+    membership = await memberships.acrud.get_by_team_user_uuid(
+        db, user_uuid, team_uuid, options=MEMBERSHIP_READ
+    )
 
     if not membership:
         raise not_found("Membership")
@@ -225,10 +229,11 @@ def get_member(
 
 
 @router.put("/{team_uuid}/members/{user_uuid}", response_model=MembershipRead)
-def update_member(
+async def update_member(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    db: AsyncSession = Depends(get_async_db),
     team_uuid: uuid.UUID = Path(..., description="UUID of team"),
     user_uuid: uuid.UUID = Path(..., description="UUID of user"),
     member_update: MembershipUpdate = Body(..., description="Content to be updated")
@@ -236,19 +241,21 @@ def update_member(
     if not current_user:
         raise not_authorized()
 
-    db_team = teams.crud.get(db, team_uuid)
+    db_team = await teams.acrud.get(db, team_uuid)
 
     if not db_team:
         raise not_found("Team")
 
-    check_adminship(db, current_user, team_uuid)
+    check_adminship(permissions, team_uuid)
 
-    db_membership = memberships.crud.get_by_team_user_uuid(db, user_uuid, team_uuid)
+    db_membership = await memberships.acrud.get_by_team_user_uuid(
+        db, user_uuid, team_uuid, options=MEMBERSHIP_READ
+    )
 
     if not db_membership:
         raise not_found("Membership")
 
-    db_membership = memberships.crud.update(
+    db_membership = await memberships.acrud.update(
         db, db_obj=db_membership, obj_in=member_update
     )
 
@@ -256,29 +263,34 @@ def update_member(
 
 
 @router.delete("/{team_uuid}/members/{user_uuid}", response_model=MembershipRead)
-def remove_member(
+async def remove_member(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    db: AsyncSession = Depends(get_async_db),
     team_uuid: uuid.UUID = Path(..., description="UUID of team"),
     user_uuid: uuid.UUID = Path(..., description="UUID of user")
 ) -> MembershipRead:
     if not current_user:
         raise not_authorized()
 
-    db_team = teams.crud.get(db, team_uuid)
+    db_team = await teams.acrud.get(db, team_uuid)
 
     if not db_team:
         raise not_found("Team")
 
     if user_uuid != current_user.uuid:
-        check_adminship(db, current_user, team_uuid)
+        check_adminship(permissions, team_uuid)
 
-    db_membership = memberships.crud.get_by_team_user_uuid(db, user_uuid, team_uuid)
+    db_membership = await memberships.acrud.get_by_team_user_uuid(
+        db, user_uuid, team_uuid, options=MEMBERSHIP_READ
+    )
 
     if not db_membership:
         raise not_found("Membership")
 
-    memberships.crud.remove_by_team_user_uuid(db, user_uuid, team_uuid)
+    await memberships.acrud.remove_by_team_user_uuid(
+        db, user_uuid=user_uuid, team_uuid=team_uuid
+    )
 
     return db_membership
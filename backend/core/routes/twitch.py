@@ -10,6 +10,7 @@ from core.database.models.users import User
 
 from core.deps import get_current_user
 from core.twitch_tools import get_twitch_headers
+from core.metrics import mark_stage, observe_stages, parse_twitch_timestamp
 from core.routes import not_authorized
 
 from config import settings
@@ -62,6 +63,8 @@ async def event_sub_callback(
         Twitch_Eventsub_Subscription_Version: str = Header()
 
 ):
+    timings = mark_stage(None, "received")
+
     if Twitch_Eventsub_Message_Type not in ["notification", "webhook_callback_verification", "revocation"]:
         return Response(content="Invalid Message Type!", status_code=400)
 
@@ -79,7 +82,13 @@ async def event_sub_callback(
     if Twitch_Eventsub_Message_Type == "notification" and 'event' in json_body:
         event = get_model_by_subscription_type(Twitch_Eventsub_Subscription_Type, json_body['event'])
 
-        process_notification.delay(Twitch_Eventsub_Message_Id, Twitch_Eventsub_Subscription_Type, event.dict())
+        twitch_timestamp = parse_twitch_timestamp(Twitch_Eventsub_Message_Timestamp)
+        if twitch_timestamp:
+            timings["twitch"] = twitch_timestamp
+
+        mark_stage(timings, "enqueued")
+        process_notification.delay(Twitch_Eventsub_Message_Id, Twitch_Eventsub_Subscription_Type, event.dict(), timings)
+        observe_stages(Twitch_Eventsub_Subscription_Type, timings, ["received", "enqueued"])
     elif Twitch_Eventsub_Message_Type == "webhook_callback_verification":
         return Response(content=json_body["challenge"], status_code=200, media_type="text/plain")
     elif Twitch_Eventsub_Message_Type == "revocation":
@@ -1,33 +1,49 @@
 import uuid
 
-from fastapi import APIRouter, Depends, Path, Body, Request
+from fastapi import APIRouter, Depends, Path, Body, Request, Response, Query
 from starlette.responses import RedirectResponse
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from config import settings
 from core.database.models.readonly import TeamRead, MembershipRead, UserRead
-from core.deps import get_db, get_current_user
+from core.deps import get_async_db, get_read_db, get_current_user, get_permissions
 from core.database.models.users import User, UserUpdate
-from core.database.crud import users, memberships
+from core.database.models.permissions import (
+    PermissionSnapshot,
+    PermissionCheck,
+    PermissionCheckResult,
+)
+from core.database.crud import users, teams
+from core.database.loading import TEAM_READ, USER_READ
 
-from core.routes import not_authorized, not_found, forbidden
+from core.routes import not_authorized, not_found, forbidden, NEXT_CURSOR_HEADER
 
 router = APIRouter()
 
 
 @router.get("/", response_model=UserRead, tags=["users"])
-def users_root(
-    *, current_user: User | UserRead = Depends(get_current_user)
+async def users_root(
+    *,
+    current_user: User | UserRead = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
 ) -> UserRead:
     if not current_user:
         raise not_authorized()
 
-    return current_user
+    return await users.acrud.get(db, current_user.uuid, options=USER_READ)
 
 
 @router.get("/all", response_model=list[UserRead], tags=["users"])
-def get_users(
-    *, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
+async def get_users(
+    response: Response,
+    *,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    cursor: str | None = Query(None, description="Cursor of next page"),
+    skip: int | None = Query(None, ge=0, description="Offset, disables cursors"),
+    limit: int = Query(100, ge=1, le=1000),
+    filters: str | None = Query(None, description="Filter as JSON"),
+    order: str | None = Query(None, description="Order as JSON list"),
 ) -> list[UserRead]:
     if not current_user:
         raise not_authorized()
@@ -35,14 +51,74 @@ def get_users(
     if not current_user.is_superadmin:
         raise forbidden()
 
-    return users.crud.get_multi(db)
+    if skip is not None:
+        return await users.acrud.get_multi(
+            db, skip=skip, limit=limit, filters=filters, order=order, options=USER_READ
+        )
+
+    db_users, next_cursor = await users.acrud.get_page(
+        db, limit=limit, cursor=cursor, filters=filters, order=order, options=USER_READ
+    )
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    return db_users
+
+
+@router.get("/teams", response_model=list[TeamRead], tags=["users"])
+async def get_teams(
+    *, current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_read_db)
+) -> list[TeamRead]:
+    if not current_user:
+        raise not_authorized()
+
+    return await teams.acrud.get_multi(
+        db,
+        limit=None,
+        filters={"members": {"user_uuid": current_user.uuid}},
+        options=TEAM_READ,
+    )
+
+
+@router.get("/permissions", response_model=PermissionSnapshot, tags=["users"])
+async def get_user_permissions(
+    *, permissions: PermissionSnapshot = Depends(get_permissions)
+) -> PermissionSnapshot:
+    return permissions
+
+
+@router.post(
+    "/permissions", response_model=list[PermissionCheckResult], tags=["users"]
+)
+async def check_user_permissions(
+    *,
+    permissions: PermissionSnapshot = Depends(get_permissions),
+    checks: list[PermissionCheck] = Body(..., description="Permissions to be checked")
+) -> list[PermissionCheckResult]:
+    results = []
+    for check in checks:
+        if check.permission == "eventsubs":
+            allowed = permissions.can_use_eventsubs()
+        elif check.team_uuid is None:
+            allowed = False
+        elif check.permission == "member":
+            allowed = permissions.is_member(check.team_uuid)
+        elif check.permission == "admin":
+            allowed = permissions.is_admin(check.team_uuid)
+        else:
+            allowed = permissions.can_invite(check.team_uuid)
+
+        results.append(PermissionCheckResult(**check.dict(), allowed=allowed))
+
+    return results
 
 
 @router.get("/{user_uuid}", response_model=UserRead, tags=["users"])
-def get_user(
+async def get_user(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     user_uuid: uuid.UUID = Path(..., description="UUID of user"),
 ) -> UserRead:
     if not current_user:
@@ -51,7 +127,7 @@ def get_user(
     if not current_user.is_superadmin and user_uuid != current_user.uuid:
         raise forbidden()
 
-    user = users.crud.get(db, user_uuid)
+    user = await users.acrud.get(db, user_uuid, options=USER_READ)
 
     if not user:
         raise not_found("User")
@@ -60,10 +136,10 @@ def get_user(
 
 
 @router.put("/{user_uuid", response_model=UserRead, tags=["users"])
-def update_user(
+async def update_user(
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_uuid: uuid.UUID = Path(..., description="UUID of user"),
     user_update: UserUpdate = Body(..., description="Contents to be updated"),
 ) -> UserRead:
@@ -73,7 +149,7 @@ def update_user(
     if not current_user.is_superadmin or user_uuid != current_user.uuid:
         raise forbidden()
 
-    db_user = users.crud.get(db, user_uuid)
+    db_user = await users.acrud.get(db, user_uuid, options=USER_READ)
 
     if not db_user:
         raise not_found("User")
@@ -81,16 +157,16 @@ def update_user(
     if not current_user.is_superadmin and user_update.is_superadmin:
         raise forbidden()
 
-    db_user = users.crud.update(db, db_obj=db_user, obj_in=user_update)
+    db_user = await users.acrud.update(db, db_obj=db_user, obj_in=user_update)
     return db_user
 
 
 @router.delete("/{user_uuid}", response_model=User, tags=["users"])
-def delete_user(
+async def delete_user(
     request: Request,
     *,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user_uuid: uuid.UUID = Path(..., description="UUID of user"),
 ) -> User | RedirectResponse:
     if not current_user:
@@ -99,12 +175,12 @@ def delete_user(
     if not current_user.is_superadmin and user_uuid != current_user.uuid:
         raise forbidden()
 
-    db_user = users.crud.get(db, user_uuid)
+    db_user = await users.acrud.get(db, user_uuid)
 
     if not db_user:
         raise not_found("User")
 
-    users.crud.remove(db, uuid=user_uuid)
+    await users.acrud.remove(db, uuid=user_uuid)
 
     # In case user deleted themselves, redirect and remove session
     if user_uuid == current_user.uuid:
@@ -112,13 +188,3 @@ def delete_user(
         request.session.pop("user", None)
 
     return db_user
-
-
-@router.get("/teams", response_model=list[TeamRead], tags=["users"])
-def get_teams(
-    *, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
-) -> list[TeamRead]:
-    if not current_user:
-        raise not_authorized()
-
-    return memberships.crud.get_by_user_uuid(db, current_user.uuid)
@@ -0,0 +1,123 @@
+import time
+import uuid
+import json
+
+import requests
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from config import settings
+from core.cache import (
+    cache_get,
+    cache_set,
+    cache_delete,
+    cache_delete_sync,
+    invalidate_on_commit,
+)
+from core.database.crud.oauth import acrud
+from core.database.models.oauth import OAuth2Token
+
+# Seconds before expiry at which authlib refreshes tokens on use, the
+# background refresh leaves tokens this close to expiry alone
+AUTHLIB_LEEWAY = 60
+
+# Token endpoints used to refresh user tokens of each OAuth provider
+TOKEN_ENDPOINTS = {
+    "discord": lambda: (
+        "https://discord.com/api/oauth2/token",
+        settings.DISCORD_CLIENT_ID,
+        settings.DISCORD_CLIENT_SECRET,
+    ),
+    "twitch": lambda: (
+        f"{settings.TWITCH_ID_URL}/token",
+        settings.TWITCH_CLIENT_ID,
+        settings.TWITCH_CLIENT_SECRET,
+    ),
+}
+
+
+def token_cache_key(user_uuid: uuid.UUID | str, name: str) -> str:
+    return f"cache:token:{name}:{user_uuid}"
+
+
+def get_token_ttl(token: OAuth2Token) -> int:
+    """
+    Tokens are cached at most until they expire.
+    """
+    ttl = int(settings.TOKEN_CACHE_TTL)
+    if token.expires_at:
+        ttl = min(ttl, token.expires_at - int(time.time()))
+    return ttl
+
+
+async def get_token(db: AsyncSession, user_uuid: uuid.UUID | str, name: str) -> dict | None:
+    """
+    Get OAuth token of user in the form authlib expects. Tokens are never
+    refreshed here, refresh_tokens keeps them valid in the background.
+
+    :param db: Database Session to be used on cache miss
+    :param user_uuid: UUID of user
+    :param name: Name of OAuth provider
+    :return: Token or None if user has no token of provider
+    """
+    data = await cache_get(token_cache_key(user_uuid, name))
+    if data is not None:
+        return json.loads(data)
+
+    token_obj = await acrud.get_by_user_name(db, user_uuid, name)
+    if token_obj is None:
+        return None
+
+    token = token_obj.to_token()
+    ttl = get_token_ttl(token_obj)
+    if ttl > 0:
+        await cache_set(token_cache_key(user_uuid, name), json.dumps(token), ttl)
+    return token
+
+
+async def invalidate_tokens(keys: list[tuple[uuid.UUID | str, str]]) -> None:
+    await cache_delete([token_cache_key(user_uuid, name) for user_uuid, name in keys])
+
+
+def invalidate_tokens_sync(keys: list[tuple[uuid.UUID | str, str]]) -> None:
+    cache_delete_sync([token_cache_key(user_uuid, name) for user_uuid, name in keys])
+
+
+def invalidate_tokens_on_commit(
+    db: AsyncSession, keys: list[tuple[uuid.UUID | str, str]]
+) -> None:
+    invalidate_on_commit(
+        db, [token_cache_key(user_uuid, name) for user_uuid, name in keys]
+    )
+
+
+def refresh_token(session: requests.Session, token: OAuth2Token) -> dict:
+    """
+    Exchange refresh token of token for a new token.
+
+    :param session: HTTP session reused for all refreshes
+    :param token: Token to be refreshed
+    :return: Changed fields of token
+    """
+    url, client_id, client_secret = TOKEN_ENDPOINTS[token.name]()
+
+    resp = session.post(
+        url,
+        data={
+            "grant_type": "refresh_token",
+            "refresh_token": token.refresh_token,
+            "client_id": client_id,
+            "client_secret": client_secret,
+        },
+        timeout=10,
+    )
+    resp.raise_for_status()
+    data = resp.json()
+
+    return {
+        "access_token": data["access_token"],
+        "refresh_token": data.get("refresh_token", token.refresh_token),
+        "token_type": data.get("token_type", token.token_type),
+        "expires_at": int(time.time()) + int(data.get("expires_in", 0))
+        if data.get("expires_in")
+        else 0,
+    }
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Depends, Request, HTTPException, Query
+from fastapi import FastAPI, Depends, Request, HTTPException, Query, BackgroundTasks
 from fastapi.openapi.utils import get_openapi
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -8,20 +8,32 @@ from authlib.integrations.base_client.errors import (
     OAuthError,
 )
 from starlette.responses import RedirectResponse
+from prometheus_client import make_asgi_app
 
-from sqlmodel import Session
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from config import settings
-from config.overrides import SessionMiddleware
-from core.database import SessionLocal
+from config.overrides import SessionMiddleware, RedisSessionMiddleware
+from core.database import AsyncSessionLocal
+from core.database.crud import oauth as oauth_tokens
+from core.database.instrumentation import (
+    QueryStatsMiddleware,
+    QUERY_COUNT_HEADER,
+    QUERY_TIME_HEADER,
+)
 from core.database.models import Meta
 from core.database.models.oauth import OAuth2Token
 from core.database.models.users import User
 
-from core.routes import twitch, users, teams, invites, eventsubs, discord
-from core.routes import not_authorized
+from core.routes import twitch, users, teams, invites, eventsubs, discord, outbox
+from core.routes import not_authorized, NEXT_CURSOR_HEADER, DIRECTORY_VERSION_HEADER
 
-from core.deps import get_current_user, get_db
+from core.deps import get_current_user, get_async_db, get_unit_of_work
+from core.metrics import get_registry
+from core.cache import invalidate_users, invalidate_users_on_commit, async_redis_client
+from core.directory import link_discord_users, unlink_discord_users
+from core.tokens import get_token, invalidate_tokens, invalidate_tokens_on_commit
 
 app = FastAPI(root_path=settings.ROOT_PATH)
 
@@ -63,70 +75,82 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
-app.add_middleware(SessionMiddleware, secret_key=settings.SECRET_KEY)
+app.add_middleware(QueryStatsMiddleware, headers=settings.DEBUG)
+# Routes that never use the session skip loading and saving it
+SESSIONLESS_PATHS = ("/twitch/event-sub/callback", "/meta", "/metrics")
+
+if settings.SESSION_BACKEND == "redis":
+    app.add_middleware(
+        RedisSessionMiddleware,
+        secret_key=settings.SECRET_KEY,
+        redis=async_redis_client,
+        exclude_paths=SESSIONLESS_PATHS,
+    )
+else:
+    app.add_middleware(
+        SessionMiddleware,
+        secret_key=settings.SECRET_KEY,
+        exclude_paths=SESSIONLESS_PATHS,
+    )
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        NEXT_CURSOR_HEADER,
+        DIRECTORY_VERSION_HEADER,
+        QUERY_COUNT_HEADER,
+        QUERY_TIME_HEADER,
+    ],
 )
 
 
-def update_token(name, token, refresh_token=None, access_token=None):
-
-    db = SessionLocal()
-    if refresh_token:
-        item = (
-            db.query(OAuth2Token)
-            .filter_by(name=name, refresh_token=refresh_token)
-            .first()
+async def update_token(name, token, refresh_token=None, access_token=None):
+    """
+    Store token refreshed by authlib. refresh_tokens normally refreshes
+    tokens before they expire, so this only runs if it fell behind.
+    """
+    async with AsyncSessionLocal() as db:
+        item = await oauth_tokens.acrud.get_by_token(
+            db, name, refresh_token=refresh_token, access_token=access_token
         )
-    elif access_token:
-        item = (
-            db.query(OAuth2Token)
-            .filter_by(name=name, access_token=access_token)
-            .first()
+        if item is None:
+            return
+
+        await oauth_tokens.acrud.update(
+            db,
+            db_obj=item,
+            obj_in={
+                "access_token": token["access_token"],
+                "refresh_token": token.get("refresh_token"),
+                "expires_at": token["expires_at"],
+            },
         )
-    else:
-        db.close()
-        return
-
-    # update old token
-    item.access_token = token["access_token"]
-    item.refresh_token = token.get("refresh_token")
-    item.expires_at = token["expires_at"]
-    db.add(item)
-    db.commit()
 
-    db.close()
+    await invalidate_tokens([(item.user_id, name)])
 
 
 oauth = OAuth(update_token=update_token)
 
 
-def fetch_discord_token(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
-):
-    token = (
-        db.query(OAuth2Token)
-        .filter_by(name="discord", user_id=current_user.uuid)
-        .first()
-    )
-    if token:
-        return token.to_token()
+async def fetch_user_token(request: Request, name: str) -> dict | None:
+    req_user = request.session.get("user")
+    if not req_user or "uuid" not in req_user:
+        return None
 
+    # Session only connects on cache miss
+    async with AsyncSessionLocal() as db:
+        return await get_token(db, req_user["uuid"], name)
 
-def fetch_twitch_token(
-    current_user: User = Depends(get_current_user), db: Session = Depends(get_db)
-):
-    token = (
-        db.query(OAuth2Token)
-        .filter_by(name="twitch", user_id=current_user.uuid)
-        .first()
-    )
-    if token:
-        return token.to_token()
+
+async def fetch_discord_token(request: Request):
+    return await fetch_user_token(request, "discord")
+
+
+async def fetch_twitch_token(request: Request):
+    return await fetch_user_token(request, "twitch")
 
 
 # OAuth with discord setup
@@ -216,7 +240,9 @@ async def discord_login(request: Request, redirect: str = None):
 
 @app.get("/discord/unlink", tags=["discord"])
 async def discord_unlink(
-    user: User = Depends(get_current_user), db: Session = Depends(get_db), _rsc=Query()
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+    _rsc=Query(),
 ):
     if _rsc:
         raise HTTPException(status_code=400, detail="RSC not supported")
@@ -225,16 +251,23 @@ async def discord_unlink(
         raise not_authorized()
 
     token_obj = (
-        db.query(OAuth2Token).filter_by(user_id=user.uuid, name="discord").first()
-    )
+        await db.scalars(
+            select(OAuth2Token).filter_by(user_id=user.uuid, name="discord")
+        )
+    ).first()
 
     if token_obj:
-        db.delete(token_obj)
+        await db.delete(token_obj)
 
+    discord_id = user.discord_id
     user.discord_id = None
     db.add(user)
 
-    db.commit()
+    await db.commit()
+    await invalidate_users([user.uuid])
+    await invalidate_tokens([(user.uuid, "discord")])
+    if discord_id:
+        await unlink_discord_users([discord_id])
 
     return RedirectResponse(url=settings.SITE_HOSTNAME)
 
@@ -260,15 +293,17 @@ async def logout(request: Request, _rsc=Query()):
     "/user_update", tags=["oauth"], responses={401: {"description": "Unauthorized"}}
 )
 async def user_update(
-    user: User = Depends(get_current_user), db: Session = Depends(get_db)
+    user: User = Depends(get_current_user), db: AsyncSession = Depends(get_async_db)
 ):
-    token = db.query(OAuth2Token).filter_by(user_id=user.uuid).first()
+    token = (
+        await db.scalars(select(OAuth2Token).filter_by(user_id=user.uuid))
+    ).first()
     if token is None:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    await db.commit()
+    await db.refresh(user)
 
     return {"status": "user updated"}
 
@@ -278,7 +313,9 @@ async def user_update(
     tags=["oauth"],
     responses={400: {"description": "Unsupported Token-Type"}},
 )
-async def twitch_authorize(request: Request, db: Session = Depends(get_db)):
+async def twitch_authorize(
+    request: Request, db: AsyncSession = Depends(get_unit_of_work)
+):
     try:
         token = await oauth.twitch.authorize_access_token(request)
     except OAuthError as e:
@@ -296,7 +333,7 @@ async def twitch_authorize(request: Request, db: Session = Depends(get_db)):
     profile = profile["data"][0]
 
     # Get user
-    user = db.query(User).filter_by(twitch_id=profile["id"]).first()
+    user = (await db.scalars(select(User).filter_by(twitch_id=profile["id"]))).first()
 
     # If user doesn't exist, create a new one.
     if user is None:
@@ -313,14 +350,14 @@ async def twitch_authorize(request: Request, db: Session = Depends(get_db)):
         )
 
         db.add(user)
-        db.commit()
-        db.refresh(user)
 
     if token:
         # Update token
         token_obj = (
-            db.query(OAuth2Token).filter_by(user_id=user.uuid, name="twitch").first()
-        )
+            await db.scalars(
+                select(OAuth2Token).filter_by(user_id=user.uuid, name="twitch")
+            )
+        ).first()
         if token_obj is None:
             token_obj = OAuth2Token(
                 user_id=user.uuid,
@@ -337,8 +374,10 @@ async def twitch_authorize(request: Request, db: Session = Depends(get_db)):
             token_obj.expires_at = token.get("expires_at")
 
         db.add(token_obj)
-    db.commit()
-    db.refresh(user)
+    # Committed by get_unit_of_work after the route has returned
+    await db.flush()
+    invalidate_users_on_commit(db, [user.uuid])
+    invalidate_tokens_on_commit(db, [(user.uuid, "twitch")])
 
     request.session["user"] = user.jsonable()
 
@@ -358,7 +397,8 @@ async def twitch_authorize(request: Request, db: Session = Depends(get_db)):
 )
 async def discord_authorize(
     request: Request,
-    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_unit_of_work),
     user: User = Depends(get_current_user),
 ):
     if not user:
@@ -389,8 +429,10 @@ async def discord_authorize(
     if token:
         # Update token
         token_obj = (
-            db.query(OAuth2Token).filter_by(user_id=user.uuid, name="discord").first()
-        )
+            await db.scalars(
+                select(OAuth2Token).filter_by(user_id=user.uuid, name="discord")
+            )
+        ).first()
         if token_obj is None:
             token_obj = OAuth2Token(
                 user_id=user.uuid,
@@ -408,8 +450,13 @@ async def discord_authorize(
 
         db.add(token_obj)
 
-    db.commit()
-    db.refresh(user)
+    # Committed by get_unit_of_work after the route has returned
+    await db.flush()
+    invalidate_users_on_commit(db, [user.uuid])
+    invalidate_tokens_on_commit(db, [(user.uuid, "discord")])
+    if user.discord_id:
+        # Background tasks run after dependencies have exited
+        background_tasks.add_task(link_discord_users, [user.discord_id])
 
     request.session["user"] = user.jsonable()
 
@@ -427,3 +474,6 @@ app.include_router(teams.router, prefix="/teams")
 app.include_router(invites.router, prefix="/invites")
 app.include_router(eventsubs.router, prefix="/eventsubs")
 app.include_router(discord.router, prefix="/discord")
+app.include_router(outbox.router, prefix="/outbox")
+
+app.mount("/metrics", make_asgi_app(registry=get_registry()))
@@ -0,0 +1,173 @@
+"""
+Replay captured EventSub notifications to measure notification fan-out.
+
+Notifications are captured by the worker when NOTIFICATION_CAPTURE_DIR is set.
+Each capture is fed through build_notifications and delivered with the same
+IPC code the worker uses, by default against a stub of the bot's IPC server.
+
+    python replay.py /captures/*.jsonl.gz --speed 1 10 100 --latency 0.1
+"""
+import time
+import gzip
+import json
+import asyncio
+import argparse
+
+from config import settings
+from core.database.models.eventsubs import EventSubscription
+from core.database.models.outbox import NotificationOutbox
+from core.database.models.twitch import get_model_by_subscription_type
+from core.database.models.users import User
+from core.ipc.stub import StubIpcServer, StubRpcServer
+from core.metrics import mark_stage
+
+from worker import build_notifications, deliver_batch
+
+
+def load_capture(paths: list[str]) -> list[dict]:
+    records = []
+
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            try:
+                for line in f:
+                    # Last line may be cut off in capture of a running worker
+                    if line.endswith("\n"):
+                        records.append(json.loads(line))
+            except EOFError:
+                # Stream of a running worker ends at its last flush
+                pass
+
+    return sorted(records, key=lambda x: x["received_at"])
+
+
+def percentile(values: list[float], p: float) -> float:
+    if len(values) == 0:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * p), len(values) - 1)]
+
+
+async def replay(records: list[dict], *, speed: float, workers: int) -> dict:
+    """
+    Deliver captured notifications with their original spacing divided by speed.
+
+    :param records: Captured notifications
+    :param speed: Speed multiplier
+    :param workers: Number of notifications processed concurrently
+    :return: Statistics of run
+    """
+    semaphore = asyncio.Semaphore(workers)
+    latencies = []
+    stats = {"notifications": len(records), "messages": 0, "errors": 0}
+
+    start = time.monotonic()
+    first = records[0]["received_at"] if records else 0
+
+    async def run(record: dict):
+        due = start + (record["received_at"] - first) / speed
+        await asyncio.sleep(max(due - time.monotonic(), 0))
+
+        async with semaphore:
+            data = get_model_by_subscription_type(
+                record["subscription_type"], record["event"]
+            )
+            user = User(**record["user"])
+            eventsubs = [EventSubscription(**x) for x in record["eventsubs"]]
+
+            notifications = build_notifications(
+                record["message_id"],
+                data,
+                user,
+                eventsubs,
+                mark_stage(None, "worker_started"),
+                record.get("streams"),
+            )
+            results = await deliver_batch(
+                [NotificationOutbox(**x.dict()) for x in notifications]
+            )
+
+        latencies.append(time.monotonic() - due)
+        stats["messages"] += len(results)
+        stats["errors"] += len([x for x in results if x[1] is not None])
+
+    await asyncio.gather(*[run(r) for r in records])
+
+    stats["elapsed"] = time.monotonic() - start
+    stats["throughput"] = stats["messages"] / stats["elapsed"] if stats["elapsed"] else 0
+    stats["p50"] = percentile(latencies, 0.5)
+    stats["p95"] = percentile(latencies, 0.95)
+    stats["p99"] = percentile(latencies, 0.99)
+    return stats
+
+
+async def main(args: argparse.Namespace):
+    records = load_capture(args.captures)
+
+    settings.IPC_HOST = args.host
+    settings.IPC_PORT = args.port
+    settings.RPC_PORT = args.port
+    settings.IPC_TRANSPORT = args.transport
+
+    server = None
+    if not args.no_stub:
+        if args.transport == "rpc":
+            server = StubRpcServer(
+                host=args.host,
+                port=args.port,
+                secret_key=settings.IPC_SECRET,
+                latency=args.latency,
+                jitter=args.jitter,
+            )
+        else:
+            server = StubIpcServer(
+                host=args.host, port=args.port, latency=args.latency, jitter=args.jitter
+            )
+        await server.start()
+
+    print(
+        f"{'speed':>8} {'notifs':>8} {'msgs':>8} {'errors':>7} {'elapsed':>9} "
+        f"{'msg/s':>9} {'p50':>8} {'p95':>8} {'p99':>8}"
+    )
+
+    try:
+        for speed in args.speed:
+            stats = await replay(records, speed=speed, workers=args.workers)
+            print(
+                f"{speed:>8g} {stats['notifications']:>8} {stats['messages']:>8} "
+                f"{stats['errors']:>7} {stats['elapsed']:>9.2f} "
+                f"{stats['throughput']:>9.1f} {stats['p50']:>8.3f} "
+                f"{stats['p95']:>8.3f} {stats['p99']:>8.3f}"
+            )
+    finally:
+        if server:
+            await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("captures", nargs="+", help="Capture files")
+    parser.add_argument(
+        "--speed", type=float, nargs="+", default=[1.0], help="Speed multipliers"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=8, help="Concurrently processed notifications"
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="IPC host")
+    parser.add_argument("--port", type=int, default=9999, help="IPC or RPC port")
+    parser.add_argument(
+        "--transport", choices=["ipc", "rpc"], default="ipc", help="Transport to the bot"
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Simulated Discord latency (s)"
+    )
+    parser.add_argument(
+        "--jitter", type=float, default=0.0, help="Extra random Discord latency (s)"
+    )
+    parser.add_argument(
+        "--no-stub",
+        action="store_true",
+        help="Deliver to a running IPC server instead of the stub",
+    )
+
+    asyncio.run(main(parser.parse_args()))
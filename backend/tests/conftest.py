@@ -0,0 +1,36 @@
+import os
+
+# Tests that need PostgreSQL are skipped unless a database is configured
+DATABASE_CONFIGURED = bool(os.environ.get("DB_NAME"))
+
+# Settings without defaults, only needed to import the app
+for key in (
+    "SECRET_KEY",
+    "TWITCH_WEBHOOK_SECRET",
+    "IPC_SECRET",
+    "DISCORD_CLIENT_ID",
+    "DISCORD_CLIENT_SECRET",
+    "TWITCH_CLIENT_ID",
+    "TWITCH_CLIENT_SECRET",
+    "DB_USER",
+    "DB_PASS",
+    "DB_NAME",
+):
+    os.environ.setdefault(key, "test")
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def postgres():
+    if not DATABASE_CONFIGURED:
+        pytest.skip("No database configured, set DB_NAME")
+
+    from core.database import engine
+
+    return engine
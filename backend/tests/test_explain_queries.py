@@ -0,0 +1,81 @@
+"""
+Hot path queries must be served by indexes. Runs the CRUD methods against
+PostgreSQL, captures the statements they execute and plans them with
+sequential scans disabled, so a Seq Scan in a plan means that no index can
+serve the query at all. Skipped unless a database is configured.
+"""
+import json
+import uuid
+from typing import Any, Callable
+
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import Session
+
+from core.database.crud import UNIT_OF_WORK
+from core.database.crud import eventsubs, invites, memberships, oauth, outbox, users
+
+SAMPLE_UUID = uuid.UUID(int=1)
+
+CALLS: dict[str, Callable[[Session], Any]] = {
+    "users.get_by_twitch_id": lambda db: users.crud.get_by_twitch_id(db, "1"),
+    "users.get_by_discord_id": lambda db: users.crud.get_by_discord_id(db, "1"),
+    "eventsubs.get_multi_by_user_uuid_and_event": lambda db: (
+        eventsubs.crud.get_multi_by_user_uuid_and_event(db, SAMPLE_UUID, "stream.online")
+    ),
+    "memberships.get_by_user_uuid": lambda db: (
+        memberships.crud.get_by_user_uuid(db, SAMPLE_UUID)
+    ),
+    "memberships.get_by_team_user_uuid": lambda db: (
+        memberships.crud.get_by_team_user_uuid(db, SAMPLE_UUID, SAMPLE_UUID)
+    ),
+    "oauth.get_by_user_name": lambda db: (
+        oauth.crud.get_by_user_name(db, SAMPLE_UUID, "twitch")
+    ),
+    "invites.get_by_twitch_id": lambda db: invites.crud.get_by_twitch_id(db, "1"),
+    "invites.get_by_team_uuid": lambda db: invites.crud.get_by_team_uuid(db, SAMPLE_UUID),
+    "outbox.claim_batch": lambda db: outbox.crud.claim_batch(db),
+}
+
+
+def get_scans(plan: dict) -> list[tuple[str, str]]:
+    scans = []
+    if "Relation Name" in plan:
+        scans.append((plan["Node Type"], plan["Relation Name"]))
+    for child in plan.get("Plans", []):
+        scans += get_scans(child)
+    return scans
+
+
+@pytest.fixture
+def db(postgres):
+    # Nothing is committed, all changes are rolled back at the end
+    with Session(postgres) as session:
+        session.info[UNIT_OF_WORK] = True
+        session.execute(text("SET LOCAL enable_seqscan = off"))
+        yield session
+        session.rollback()
+
+
+@pytest.mark.parametrize("name", CALLS)
+def test_uses_index(db: Session, name: str):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(db.get_bind(), "before_cursor_execute", capture)
+    try:
+        CALLS[name](db)
+    finally:
+        event.remove(db.get_bind(), "before_cursor_execute", capture)
+
+    assert statements
+    for statement, parameters in statements:
+        result = db.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {statement}", parameters
+        ).scalar()
+        plan = (json.loads(result) if isinstance(result, str) else result)[0]["Plan"]
+
+        seq_scans = [x for x in get_scans(plan) if x[0] == "Seq Scan"]
+        assert not seq_scans, f"{name} scans {seq_scans}: {statement}"
@@ -0,0 +1,143 @@
+"""
+Routes returning Read models must load their relationships with a fixed
+number of statements, however many rows there are. Runs the routes against
+SQLite and counts statements like QueryStatsMiddleware does in production.
+"""
+
+import httpx
+import pytest
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy.pool import StaticPool
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from core.deps import get_async_db, get_read_db, get_current_user, get_permissions
+from core.database.instrumentation import QUERY_COUNT_HEADER, QueryStatsMiddleware, instrument_queries
+from core.database.models.all import Membership, Team, User
+from core.database.models.permissions import PermissionSnapshot, TeamPermissions
+from core.routes import teams, users
+
+TEAMS = 3
+MEMBERS = 4
+
+# UUID of current user, anonymous if missing
+USER_HEADER = "X-Test-User"
+
+
+@pytest.fixture
+async def sessionmaker():
+    engine = create_async_engine(
+        "sqlite+aiosqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    instrument_queries(engine.sync_engine)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+@pytest.fixture
+async def data(sessionmaker) -> dict:
+    async with sessionmaker() as db:
+        team_list = [Team(name=f"team{i}", description="") for i in range(TEAMS)]
+        user_list = [
+            User(twitch_id=str(i), name=f"user{i}", is_superadmin=i == 0)
+            for i in range(MEMBERS)
+        ]
+        db.add_all(team_list + user_list)
+        db.add_all(
+            Membership(team_uuid=team.uuid, user_uuid=user.uuid, is_admin=user is user_list[0])
+            for team in team_list
+            for user in user_list
+        )
+        await db.commit()
+
+    return {"teams": team_list, "users": user_list}
+
+
+@pytest.fixture
+def client(sessionmaker, data):
+    app = FastAPI()
+    app.add_middleware(QueryStatsMiddleware, headers=True)
+    app.include_router(users.router, prefix="/users")
+    app.include_router(teams.router, prefix="/teams")
+    users_by_uuid = {str(x.uuid): x for x in data["users"]}
+
+    async def get_db():
+        async with sessionmaker() as session:
+            yield session
+
+    async def get_user(request: Request):
+        return users_by_uuid.get(request.headers.get(USER_HEADER))
+
+    async def get_user_permissions(current_user: User = Depends(get_user)):
+        return PermissionSnapshot(
+            is_superadmin=current_user.is_superadmin,
+            teams={x.uuid: TeamPermissions(is_admin=False) for x in data["teams"]},
+        )
+
+    app.dependency_overrides[get_async_db] = get_db
+    app.dependency_overrides[get_read_db] = get_db
+    app.dependency_overrides[get_current_user] = get_user
+    app.dependency_overrides[get_permissions] = get_user_permissions
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://test")
+
+
+async def get(client: httpx.AsyncClient, user: User | None, path: str) -> httpx.Response:
+    headers = {USER_HEADER: str(user.uuid)} if user else {}
+    response = await client.get(path, headers=headers)
+    assert response.status_code == 200, response.text
+    return response
+
+
+def queries(response: httpx.Response) -> int:
+    return int(response.headers[QUERY_COUNT_HEADER])
+
+
+@pytest.mark.anyio
+async def test_get_teams_anonymous(client, data):
+    response = await get(client, None, "/teams/")
+
+    assert len(response.json()) == TEAMS
+    assert queries(response) == 1
+
+
+@pytest.mark.anyio
+async def test_get_teams_member(client, data):
+    response = await get(client, data["users"][1], "/teams/")
+
+    assert len(response.json()) == TEAMS
+    assert queries(response) == 2
+
+
+@pytest.mark.anyio
+async def test_get_teams_superadmin(client, data):
+    response = await get(client, data["users"][0], "/teams/")
+
+    assert len(response.json()) == TEAMS
+    assert all(len(x["members"]) == MEMBERS for x in response.json())
+    assert queries(response) == 2
+
+
+@pytest.mark.anyio
+async def test_get_team_members(client, data):
+    team = data["teams"][0]
+    response = await get(client, data["users"][1], f"/teams/{team.uuid}/members")
+
+    assert len(response.json()) == MEMBERS
+    assert queries(response) == 2
+
+
+@pytest.mark.anyio
+async def test_get_user_teams(client, data):
+    response = await get(client, data["users"][1], "/users/teams")
+
+    assert len(response.json()) == TEAMS
+    assert all(len(x["members"]) == MEMBERS for x in response.json())
+    assert queries(response) == 2
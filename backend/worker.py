@@ -1,29 +1,50 @@
 import json
 import os
+import gzip
+import time
 import asyncio
 import uuid
+import datetime
 import redis
 
 import requests
 from celery import Celery, Task
 from celery.schedules import crontab
+from celery.signals import worker_ready, worker_process_init, worker_process_shutdown
+from prometheus_client import start_http_server, multiprocess
 
 from sqlmodel import Session, select
 from sqlalchemy.orm import scoped_session
+from fastapi.encoders import jsonable_encoder
 
 from celery.utils.log import get_task_logger
 
 from config import settings
 from core.database.models.twitch import *
-from core.database.models.users import UserUpdate
+from core.database.models.users import User, UserUpdate
 from core.database.models.eventsubs import EventSubscription
 from core.database.crud.eventsubs import crud as eventsub_crud
 from core.database.crud.users import crud as user_crud
 from core.database.crud.server import crud as server_crud
+from core.database.crud.outbox import crud as outbox_crud
+from core.database.crud.oauth import crud as oauth_crud
+from core.database.models.outbox import (
+    NotificationOutbox,
+    NotificationOutboxCreate,
+    OUTBOX_FAILED,
+    OUTBOX_SENT,
+)
 from core.database import engine, SessionLocal
+from core.database.crud import UNIT_OF_WORK
+from core.database.utils import timezoned
+from core.database.instrumentation import track_queries
 from core.twitch_tools import get_twitch_access_token
+from core.tokens import AUTHLIB_LEEWAY, refresh_token, invalidate_tokens_sync
+from core.cache import flush_invalidations_sync
+from core.metrics import get_registry, mark_stage, observe_stages, DB_COMMITS
 
-from core.ipc.client import Client
+from core.ipc.sharding import IpcClient, get_ipc_client
+from core.directory import publish_linked_users_sync
 
 app = Celery(__name__)
 app.conf.broker_url = os.environ.get("CELERY_BROKER_URL", "redis://redis:6379")
@@ -31,17 +52,70 @@ app.conf.result_backend = os.environ.get("CELERY_RESULT_BACKEND", "redis://redis
 
 TWITCH_MESSAGE_ID_SET_KEY = "twitchmessageids"
 
+# Fields of users and eventsubs build_notifications reads, captures only keep these
+CAPTURE_USER_FIELDS = {"twitch_id", "name", "icon_url"}
+CAPTURE_EVENTSUB_FIELDS = {
+    "uuid",
+    "event",
+    "message",
+    "custom_title",
+    "custom_description",
+    "channel_discord_id",
+    "server_discord_id",
+}
+
+_capture_file = None
+_capture_flushed = 0.0
+
 db_session = scoped_session(SessionLocal)
 logger = get_task_logger(__name__)
 
 
+@worker_ready.connect
+def start_metrics_server(**kwargs):
+    start_http_server(int(settings.WORKER_METRICS_PORT), registry=get_registry())
+
+
+@worker_process_init.connect
+def reset_db_pool(**kwargs):
+    # Connections opened by the parent must not be shared by forked children
+    engine.dispose(close=False)
+
+
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
 class SqlAlchemyTask(Task):
     """An abstract Celery Task that ensures that the connection the
     database is closed on task completion"""
 
     abstract = True
 
+    # Commit once when the task returns instead of on every CRUD call
+    unit_of_work = False
+
+    def __call__(self, *args, **kwargs):
+        with track_queries("task", self.name):
+            if not self.unit_of_work:
+                return super().__call__(*args, **kwargs)
+
+            db_session.info[UNIT_OF_WORK] = True
+            try:
+                result = super().__call__(*args, **kwargs)
+                db_session.commit()
+                return result
+            except Exception:
+                db_session.rollback()
+                raise
+            finally:
+                db_session.info.pop(UNIT_OF_WORK, None)
+
     def after_return(self, status, retval, task_id, args, kwargs, einfo):
+        flush_invalidations_sync(db_session)
+        DB_COMMITS.labels(scope="task").observe(db_session.info.pop("commits", 0))
         db_session.remove()
 
 
@@ -53,8 +127,32 @@ def setup_periodic_tasks(sender, **kwargs):
         update_users.s(update_all=True),
     )
 
+    # Retry pending notification deliveries
+    sender.add_periodic_task(
+        float(settings.OUTBOX_POLL_INTERVAL),
+        deliver_notifications.s(),
+    )
 
-@app.task(base=SqlAlchemyTask)
+    # Delete delivered and given up notifications after their retention
+    sender.add_periodic_task(
+        float(settings.OUTBOX_PURGE_INTERVAL),
+        purge_outbox.s(),
+    )
+
+    # Refresh user OAuth tokens before they expire
+    sender.add_periodic_task(
+        float(settings.TOKEN_REFRESH_INTERVAL),
+        refresh_oauth_tokens.s(),
+    )
+
+    # Users linked or unlinked while Redis was unavailable
+    sender.add_periodic_task(
+        float(settings.LINKED_USERS_INTERVAL),
+        publish_linked_users.s(),
+    )
+
+
+@app.task(base=SqlAlchemyTask, unit_of_work=True)
 def update_users(
     update_all: bool = False,
     token: str = None,
@@ -78,15 +176,16 @@ def update_users(
     }
 
     if not update_all:
-        users_by_uuid = [user_crud.get(db_session, x) for x in user_uuids]
-        users_by_twitch = [
-            user_crud.get_by_twitch_id(db_session, x) for x in twitch_ids
-        ]
-        users_by_discord = [
-            user_crud.get_by_discord_id(db_session, x) for x in discord_ids
-        ]
-
-        users = users_by_uuid + users_by_twitch + users_by_discord
+        users = []
+        for key, values in [
+            ("uuid__in", user_uuids),
+            ("twitch_id__in", twitch_ids),
+            ("discord_id__in", discord_ids),
+        ]:
+            if values:
+                users += user_crud.get_multi(
+                    db_session, limit=len(values), filters={key: values}
+                )
     else:
         users = user_crud.get_multi(db_session)
 
@@ -102,8 +201,12 @@ def update_users(
         if "data" not in user_data:
             return user_data
 
+        users_by_twitch_id = {x.twitch_id: x for x in users if x}
+        db_users = []
+        user_updates = []
+
         for ud in user_data["data"]:
-            user = user_crud.get_by_twitch_id(db_session, ud["id"])
+            user = users_by_twitch_id.get(ud["id"])
 
             if user:
                 user_update = UserUpdate(
@@ -116,7 +219,10 @@ def update_users(
                     }
                 )
 
-                user_crud.update(db_session, db_obj=user, obj_in=user_update)
+                db_users.append(user)
+                user_updates.append(user_update)
+
+        user_crud.update_many(db_session, db_objs=db_users, objs_in=user_updates)
 
 
 def get_event_condition(session: Session, e: EventSubscription) -> dict:
@@ -325,12 +431,201 @@ def get_event_version(e: EventSubscription) -> int:
             return 1
 
 
-def ipc_request(loop, *args, **kwargs):
-    ipc_client = Client(
-        host=settings.IPC_HOST, port=settings.IPC_PORT, secret_key=settings.IPC_SECRET
+def outbox_entry(
+    message_id: str,
+    eventsub: EventSubscription,
+    timings: dict | None,
+    route: str,
+    **kwargs,
+) -> NotificationOutboxCreate:
+    return NotificationOutboxCreate(
+        message_id=message_id,
+        eventsub_uuid=eventsub.uuid,
+        event=eventsub.event,
+        route=route,
+        payload=jsonable_encoder(
+            {
+                **kwargs,
+                "notification_event": eventsub.event,
+                "notification_timings": timings,
+            }
+        ),
+    )
+
+
+async def deliver_entry(
+    ipc_client: IpcClient, entry: NotificationOutbox
+) -> tuple[NotificationOutbox, str | None]:
+    payload = dict(entry.payload)
+    payload["notification_timings"] = mark_stage(
+        payload.get("notification_timings"), "ipc_sent"
+    )
+
+    try:
+        response = await ipc_client.request(entry.route, **payload)
+    except Exception as e:
+        return entry, repr(e)
+
+    observe_stages(entry.event, payload["notification_timings"], ["ipc_sent"])
+
+    if isinstance(response, dict) and "error" in response:
+        return entry, str(response["error"])
+    return entry, None
+
+
+async def deliver_batch(
+    entries: list[NotificationOutbox],
+) -> list[tuple[NotificationOutbox, str | None]]:
+    """
+    Deliver outbox rows over one IPC connection per bot process. Over RPC all
+    rows of the batch are in flight at once.
+
+    :param entries: Outbox rows to be delivered
+    :return: Rows with error message, or None if delivered
+    """
+    ipc_client = get_ipc_client()
+
+    if settings.IPC_TRANSPORT == "rpc":
+        return list(await asyncio.gather(*[deliver_entry(ipc_client, x) for x in entries]))
+
+    try:
+        return [await deliver_entry(ipc_client, x) for x in entries]
+    finally:
+        await ipc_client.close()
+
+
+@app.task(base=SqlAlchemyTask)
+def refresh_oauth_tokens():
+    """
+    Refresh user tokens that expire within TOKEN_REFRESH_AHEAD seconds, so
+    API requests never wait for a refresh. Expired tokens are left to
+    authlib, which refreshes them on use.
+
+    Providers rotate refresh tokens, so tokens are claimed with row locks in
+    chunks of TOKEN_REFRESH_CHUNK_SIZE and every chunk is committed right
+    after its refresh. Tokens claimed by an overlapping run are skipped.
+    """
+    limit = int(settings.TOKEN_REFRESH_BATCH_SIZE)
+    chunk_size = min(int(settings.TOKEN_REFRESH_CHUNK_SIZE), limit)
+    claimed = set()
+    count = 0
+
+    with requests.Session() as session:
+        while len(claimed) < limit:
+            now = int(time.time())
+            tokens = oauth_crud.get_expiring(
+                db_session,
+                after=now + AUTHLIB_LEEWAY,
+                before=now + int(settings.TOKEN_REFRESH_AHEAD),
+                limit=min(chunk_size, limit - len(claimed)),
+                exclude=claimed,
+            )
+            if len(tokens) == 0:
+                break
+            claimed.update(x.uuid for x in tokens)
+
+            refreshed = []
+            updates = []
+            for token in tokens:
+                # authlib refreshes tokens about to expire on use itself
+                if token.expires_at - AUTHLIB_LEEWAY <= time.time():
+                    continue
+                try:
+                    updates.append(refresh_token(session, token))
+                    refreshed.append(token)
+                except (requests.RequestException, KeyError, ValueError) as e:
+                    logger.warning(
+                        f"Refreshing {token.name} token of {token.user_id} failed: {e}"
+                    )
+
+            if len(refreshed) == 0:
+                # Release the claimed rows
+                db_session.rollback()
+                continue
+
+            # Read before committing, which expires the tokens
+            keys = [(x.user_id, x.name) for x in refreshed]
+            oauth_crud.update_many(db_session, db_objs=refreshed, objs_in=updates)
+            invalidate_tokens_sync(keys)
+            count += len(refreshed)
+
+    return count
+
+
+@app.task(base=SqlAlchemyTask)
+def publish_linked_users():
+    """
+    Publish Discord IDs of all linked users, the bot keeps them in its
+    member cache.
+    """
+    rows = user_crud.get_multi_columns(
+        db_session,
+        columns=["discord_id"],
+        limit=None,
+        filters={"discord_id__isnull": False},
     )
-    loop.run_until_complete(ipc_client.request(*args, **kwargs))
-    loop.run_until_complete(ipc_client.close())
+    publish_linked_users_sync([x.discord_id for x in rows])
+
+    return len(rows)
+
+
+@app.task(base=SqlAlchemyTask)
+def deliver_notifications():
+    loop = asyncio.get_event_loop()
+    delivered = 0
+
+    while True:
+        entries = outbox_crud.claim_batch(
+            db_session, limit=int(settings.OUTBOX_BATCH_SIZE)
+        )
+
+        if len(entries) == 0:
+            break
+
+        results = loop.run_until_complete(deliver_batch(entries))
+
+        sent = [entry for entry, error in results if error is None]
+        outbox_crud.mark_sent(db_session, db_objs=sent)
+
+        for entry, error in results:
+            if error is not None:
+                logger.warning(f"Delivery of {entry.uuid} via {entry.route} failed: {error}")
+                outbox_crud.mark_failed(db_session, db_obj=entry, error=error)
+
+        # Releases row locks of the batch
+        db_session.commit()
+        delivered += len(sent)
+
+    return delivered
+
+
+@app.task(base=SqlAlchemyTask)
+def purge_outbox():
+    """
+    Delete sent notifications older than OUTBOX_RETENTION and failed ones
+    older than OUTBOX_FAILED_RETENTION. Rows are deleted and committed in
+    chunks, so deliveries aren't blocked behind one long transaction.
+    """
+    chunk_size = int(settings.OUTBOX_PURGE_CHUNK_SIZE)
+    purged = 0
+
+    for status, retention in (
+        (OUTBOX_SENT, int(settings.OUTBOX_RETENTION)),
+        (OUTBOX_FAILED, int(settings.OUTBOX_FAILED_RETENTION)),
+    ):
+        if retention <= 0:
+            continue
+
+        before = timezoned() - datetime.timedelta(seconds=retention)
+        while True:
+            count = outbox_crud.purge(
+                db_session, status=status, before=before, limit=chunk_size
+            )
+            purged += count
+            if count < chunk_size:
+                break
+
+    return purged
 
 
 @app.task(base=SqlAlchemyTask)
@@ -391,8 +686,10 @@ def delete_twitch_eventsub(eventsub: dict):
 
 
 @app.task(base=SqlAlchemyTask)
-def process_notification(message_id: str, subscription_type, data: dict):
-    loop = asyncio.get_event_loop()
+def process_notification(
+    message_id: str, subscription_type, data: dict, timings: dict | None = None
+):
+    timings = mark_stage(timings, "worker_started")
 
     data = get_model_by_subscription_type(subscription_type, data)
 
@@ -405,74 +702,121 @@ def process_notification(message_id: str, subscription_type, data: dict):
     if result == 0:
         return
 
-    if hasattr(data, "broadcaster_user_id"):
-        user = user_crud.get_by_twitch_id(db_session, data.broadcaster_user_id)
-    else:
-        user = None
-
-    if user:
-        sent = []
-        if isinstance(data, StreamOnlineEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "stream.online"
-            )
-            sent += [
-                f"{user.name} =[stream.online]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
+    try:
+        sent = queue_notifications(message_id, subscription_type, data, timings)
+    except Exception:
+        # Nothing was queued, so let Twitch's redelivery be processed
+        r.srem(TWITCH_MESSAGE_ID_SET_KEY, message_id)
+        raise
+
+    observe_stages(subscription_type, timings, ["worker_started", "helix_fetched"])
+
+    if isinstance(sent, list) and len(sent) > 0:
+        deliver_notifications.delay()
+
+    return sent
+
+
+def get_notification_event(data: TwitchEvent) -> str | None:
+    """
+    Get event of the Event Subscriptions notified about given event.
+    """
+    if isinstance(data, StreamOnlineEvent):
+        return "stream.online"
+    elif isinstance(data, ChannelSubscribeEvent):
+        return "channel.subscribe"
+    elif isinstance(data, ChannelSubscriptionMessageEvent):
+        return "channel.subscription.message"
+    elif isinstance(data, ChannelSubscriptionGiftEvent):
+        return "channel.subscription.gift"
+    elif isinstance(data, ChannelCheerEvent):
+        return "channel.cheer"
+    elif isinstance(data, ChannelRaidEvent):
+        return "channel.raid"
+    elif isinstance(data, HypeTrainEndEvent):
+        return "channel.hype_train.end"
+    return None
+
+
+def get_live_streams(user: User) -> dict:
+    token = get_twitch_access_token()
 
-            token = get_twitch_access_token()
+    twitch_headers = {
+        "Authorization": f"Bearer {token}",
+        "Client-Id": settings.TWITCH_CLIENT_ID,
+    }
 
-            twitch_headers = {
-                "Authorization": f"Bearer {token}",
-                "Client-Id": settings.TWITCH_CLIENT_ID,
-            }
+    # channel_info = requests.get(
+    #    f"{settings.TWITCH_API_URL}/channels",
+    #    headers=twitch_headers,
+    #    params={
+    #        "broadcaster_id": user.twitch_id
+    #    }).json()
 
-            # channel_info = requests.get(
-            #    f"{settings.TWITCH_API_URL}/channels",
-            #    headers=twitch_headers,
-            #    params={
-            #        "broadcaster_id": user.twitch_id
-            #    }).json()
-
-            streams = requests.get(
-                f"{settings.TWITCH_API_URL}/streams",
-                headers=twitch_headers,
-                params={"user_id": user.twitch_id, "type": "live"},
-            ).json()
-
-            # if isinstance(channel_info, list) and len(channel_info) > 0:
-            #    default_title = channel_info[0]["title"]
-            #    game = channel_info[0]["game_name"]
-            #    tags = channel_info[0]["tags"]
-            # else:
-            #    default_title = "Hey I'm live!"
-            #    game = None
-            #    tags = None
-            default_description = f"Hey {data.broadcaster_user_name} is now live!"
-
-            if "data" in streams and len(streams["data"]) > 0:
-                default_title = streams["data"][0]["title"]
-                game = streams["data"][0]["game_name"]
-                tags = streams["data"][0]["tags"]
-                viewers = streams["data"][0]["viewer_count"]
-                started = streams["data"][0]["started_at"]
-                thumbnail = streams["data"][0]["thumbnail_url"].format(
-                    width=1280 // 2, height=720 // 2
-                )
-                is_mature = streams["data"][0]["is_mature"]
-            else:
-                default_title = "Hey I'm live!"
-                game = None
-                tags = None
-                viewers = None
-                started = None
-                thumbnail = None
-                is_mature = None
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    return requests.get(
+        f"{settings.TWITCH_API_URL}/streams",
+        headers=twitch_headers,
+        params={"user_id": user.twitch_id, "type": "live"},
+    ).json()
+
+
+def build_notifications(
+    message_id: str,
+    data: TwitchEvent,
+    user: User,
+    eventsubs: list[EventSubscription],
+    timings: dict | None = None,
+    streams: dict | None = None,
+) -> list[NotificationOutboxCreate]:
+    """
+    Build outbox rows for resolved targets of notification.
+
+    :param message_id: Twitch EventSub message ID
+    :param data: Notification event
+    :param user: Broadcaster
+    :param eventsubs: Event Subscriptions to be notified
+    :param timings: Stage timestamps of notification
+    :param streams: Helix streams response, required for stream.online
+    :return: Outbox rows
+    """
+    notifications: list[NotificationOutboxCreate] = []
+
+    if isinstance(data, StreamOnlineEvent):
+        # if isinstance(channel_info, list) and len(channel_info) > 0:
+        #    default_title = channel_info[0]["title"]
+        #    game = channel_info[0]["game_name"]
+        #    tags = channel_info[0]["tags"]
+        # else:
+        #    default_title = "Hey I'm live!"
+        #    game = None
+        #    tags = None
+        default_description = f"Hey {data.broadcaster_user_name} is now live!"
+
+        if streams and "data" in streams and len(streams["data"]) > 0:
+            default_title = streams["data"][0]["title"]
+            game = streams["data"][0]["game_name"]
+            tags = streams["data"][0]["tags"]
+            viewers = streams["data"][0]["viewer_count"]
+            started = streams["data"][0]["started_at"]
+            thumbnail = streams["data"][0]["thumbnail_url"].format(
+                width=1280 // 2, height=720 // 2
+            )
+            is_mature = streams["data"][0]["is_mature"]
+        else:
+            default_title = "Hey I'm live!"
+            game = None
+            tags = None
+            viewers = None
+            started = None
+            thumbnail = None
+            is_mature = None
+
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_live_notification",
                     broadcaster_title=eventsub.custom_title
                     if eventsub.custom_title
@@ -493,18 +837,14 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_thumbnail=thumbnail,
                     twitch_is_mature=is_mature,
                 )
-        elif isinstance(data, ChannelSubscribeEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "channel.subscribe"
             )
-            sent += [
-                f"{user.name} =[channel.subscribe]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    elif isinstance(data, ChannelSubscribeEvent):
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_new_subscription_notification",
                     notification_content=eventsub.message,
                     channel_discord_id=eventsub.channel_discord_id,
@@ -516,18 +856,14 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_tier=data.tier,
                     twitch_is_gift=data.is_gift,
                 )
-        elif isinstance(data, ChannelSubscriptionMessageEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "channel.subscription.message"
             )
-            sent += [
-                f"{user.name} =[channel.subscription.message]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    elif isinstance(data, ChannelSubscriptionMessageEvent):
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_resubscription_notification",
                     notification_content=eventsub.message,
                     channel_discord_id=eventsub.channel_discord_id,
@@ -544,18 +880,14 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_streak_months=data.streak_months,
                     twitch_duration_months=data.duration_months,
                 )
-        elif isinstance(data, ChannelSubscriptionGiftEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "channel.subscription.gift"
             )
-            sent += [
-                f"{user.name} =[channel.subscription.gift]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    elif isinstance(data, ChannelSubscriptionGiftEvent):
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_gift_subscription_notification",
                     notification_content=eventsub.message,
                     channel_discord_id=eventsub.channel_discord_id,
@@ -569,18 +901,14 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_cumulative_total=data.cumulative_total,
                     twitch_is_anonymous=data.is_anonymous
                 )
-        elif isinstance(data, ChannelCheerEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "channel.cheer"
             )
-            sent += [
-                f"{user.name} =[channel.cheer]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    elif isinstance(data, ChannelCheerEvent):
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_cheer_notification",
                     notification_content=eventsub.message,
                     channel_discord_id=eventsub.channel_discord_id,
@@ -592,18 +920,14 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_message=data.message,
                     twitch_bits=data.bits
                 )
-        elif isinstance(data, ChannelRaidEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "channel.raid"
             )
-            sent += [
-                f"{user.name} =[channel.raid]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    elif isinstance(data, ChannelRaidEvent):
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_raid_notification",
                     notification_content=eventsub.message,
                     channel_discord_id=eventsub.channel_discord_id,
@@ -614,18 +938,14 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_user_name=data.from_broadcaster_user_name,
                     twitch_viewers=data.viewers
                 )
-        elif isinstance(data, HypeTrainEndEvent):
-            eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
-                db_session, user.uuid, "channel.hype_train.end"
             )
-            sent += [
-                f"{user.name} =[channel.hype_train.end]=> {x.channel_discord_id}"
-                for x in eventsubs
-            ]
-
-            for eventsub in eventsubs:
-                ipc_request(
-                    loop,
+    elif isinstance(data, HypeTrainEndEvent):
+        for eventsub in eventsubs:
+            notifications.append(
+                outbox_entry(
+                    message_id,
+                    eventsub,
+                    timings,
                     "send_hype_train_end_notification",
                     notification_content=eventsub.message,
                     channel_discord_id=eventsub.channel_discord_id,
@@ -642,9 +962,115 @@ def process_notification(message_id: str, subscription_type, data: dict):
                     twitch_cooldown_ends_at=data.cooldown_ends_at,
                     twitch_golden_kappa=data.is_golden_kappa_train
                 )
-        else:
-            return f"Unknown type for: {data.json()}"
+            )
 
-        return sent
+    return notifications
+
+
+def get_capture_file():
+    """
+    Capture file of this process, one gzip stream kept open by the process.
+    """
+    global _capture_file
+    if _capture_file is None:
+        path = os.path.join(
+            settings.NOTIFICATION_CAPTURE_DIR, f"capture-{os.getpid()}.jsonl.gz"
+        )
+        _capture_file = gzip.open(path, "at", encoding="utf-8")
+    return _capture_file
+
+
+@worker_process_shutdown.connect
+def close_capture_file(**kwargs):
+    global _capture_file
+    if _capture_file is not None:
+        _capture_file.close()
+        _capture_file = None
+
+
+def capture_notification(
+    message_id: str,
+    subscription_type: str,
+    data: TwitchEvent,
+    user: User,
+    eventsubs: list[EventSubscription],
+    timings: dict | None = None,
+    streams: dict | None = None,
+) -> None:
+    """
+    Append notification and its resolved targets to capture file of this
+    process. Records are flushed every NOTIFICATION_CAPTURE_FLUSH_INTERVAL
+    seconds, readers see them from then on.
+    """
+    global _capture_flushed
+
+    record = jsonable_encoder(
+        {
+            "message_id": message_id,
+            "subscription_type": subscription_type,
+            "received_at": (timings or {}).get("received", time.time()),
+            "event": data,
+            "user": user.dict(include=CAPTURE_USER_FIELDS),
+            "eventsubs": [x.dict(include=CAPTURE_EVENTSUB_FIELDS) for x in eventsubs],
+            "streams": streams,
+        }
+    )
+
+    f = get_capture_file()
+    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    now = time.monotonic()
+    if now - _capture_flushed >= float(settings.NOTIFICATION_CAPTURE_FLUSH_INTERVAL):
+        f.flush()
+        _capture_flushed = now
+
+
+def queue_notifications(
+    message_id: str,
+    subscription_type: str,
+    data: TwitchEvent,
+    timings: dict | None = None,
+) -> list[str] | str:
+    """
+    Resolve targets of notification and write them to the outbox in one transaction.
+
+    :param message_id: Twitch EventSub message ID
+    :param subscription_type: Subscription type of notification
+    :param data: Notification event
+    :param timings: Stage timestamps of notification
+    :return: List of queued targets or reason for not queueing
+    """
+    if hasattr(data, "broadcaster_user_id"):
+        user = user_crud.get_by_twitch_id(db_session, data.broadcaster_user_id)
     else:
+        user = None
+
+    if not user:
         return "No user found..."
+
+    event = get_notification_event(data)
+
+    if event is None:
+        return f"Unknown type for: {data.json()}"
+
+    eventsubs = eventsub_crud.get_multi_by_user_uuid_and_event(
+        db_session, user.uuid, event
+    )
+
+    streams = None
+    if isinstance(data, StreamOnlineEvent):
+        streams = get_live_streams(user)
+        mark_stage(timings, "helix_fetched")
+
+    notifications = build_notifications(
+        message_id, data, user, eventsubs, timings, streams
+    )
+
+    if settings.NOTIFICATION_CAPTURE_DIR:
+        capture_notification(
+            message_id, subscription_type, data, user, eventsubs, timings, streams
+        )
+
+    outbox_crud.enqueue(db_session, objs_in=notifications)
+
+    return [f"{user.name} =[{event}]=> {x.channel_discord_id}" for x in eventsubs]
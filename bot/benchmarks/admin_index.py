@@ -0,0 +1,91 @@
+"""
+Compare looking up guilds administrated by a user by walking all members
+against the admin index.
+
+Guilds and members are synthetic stand-ins exposing only what the lookup
+reads, so no gateway connection is needed. Run from the bot directory:
+
+    python -m benchmarks.admin_index --guilds 10 --members 100000
+"""
+import time
+import random
+import argparse
+from types import SimpleNamespace
+
+from core.admins import AdminIndex, is_admin
+
+ADMIN_ROLE = SimpleNamespace(permissions=SimpleNamespace(administrator=True))
+MEMBER_ROLE = SimpleNamespace(permissions=SimpleNamespace(administrator=False))
+
+
+def make_guilds(guilds: int, members: int, admins: int) -> list[SimpleNamespace]:
+    result = []
+    for guild_id in range(guilds):
+        guild = SimpleNamespace(id=guild_id, members=[])
+        admin_ids = set(random.sample(range(members), admins))
+        guild.members = [
+            SimpleNamespace(
+                id=user_id,
+                guild=guild,
+                top_role=ADMIN_ROLE if user_id in admin_ids else MEMBER_ROLE,
+            )
+            for user_id in range(members)
+        ]
+        result.append(guild)
+    return result
+
+
+def scan(guilds: list[SimpleNamespace], user_id: int) -> list[SimpleNamespace]:
+    # What get_user_servers did before the index, get_all_members walks all guilds
+    members = (m for g in guilds for m in g.members)
+    return [m.guild for m in members if m.id == user_id and is_admin(m)]
+
+
+def lookup(
+    index: AdminIndex, guilds: dict[int, SimpleNamespace], user_id: int
+) -> list[SimpleNamespace]:
+    return [guilds[x] for x in index.get_guild_ids(user_id)]
+
+
+def measure(func, lookups: int) -> float:
+    start = time.perf_counter()
+    for _ in range(lookups):
+        func()
+    return (time.perf_counter() - start) / lookups
+
+
+def main(args: argparse.Namespace) -> None:
+    guilds = make_guilds(args.guilds, args.members, args.admins)
+    by_id = {g.id: g for g in guilds}
+    user_id = next(m.id for m in guilds[0].members if is_admin(m))
+
+    index = AdminIndex()
+    start = time.perf_counter()
+    index.rebuild(guilds)
+    build = time.perf_counter() - start
+
+    assert sorted(g.id for g in scan(guilds, user_id)) == sorted(
+        g.id for g in lookup(index, by_id, user_id)
+    )
+
+    scanned = measure(lambda: scan(guilds, user_id), args.lookups)
+    indexed = measure(lambda: lookup(index, by_id, user_id), args.lookups)
+
+    print(f"{args.guilds} guilds of {args.members} members, {args.admins} admins each")
+    print(f"{'build index':<12} {build * 1e3:>12.2f} ms")
+    print(f"{'scan':<12} {scanned * 1e3:>12.3f} ms/lookup")
+    print(f"{'index':<12} {indexed * 1e3:>12.6f} ms/lookup")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--guilds", type=int, default=10, help="Number of guilds")
+    parser.add_argument(
+        "--members", type=int, default=100000, help="Members of each guild"
+    )
+    parser.add_argument("--admins", type=int, default=5, help="Admins of each guild")
+    parser.add_argument(
+        "--lookups", type=int, default=20, help="Lookups measured per method"
+    )
+
+    main(parser.parse_args())
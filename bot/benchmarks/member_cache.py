@@ -0,0 +1,210 @@
+"""
+Compare startup time and memory of the full member cache against the lean
+member cache.
+
+Guilds are created in a real nextcord connection state and members are
+sent by a simulated gateway in chunks of 1000, like GUILD_MEMBERS_CHUNK
+events, so no connection to Discord is needed. Each mode runs in its own
+process to measure its memory. Run from the bot directory:
+
+    python -m benchmarks.member_cache --guilds 20 --members 50000
+"""
+import gc
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import resource
+import subprocess
+
+import nextcord
+
+from core.members import (
+    MEMBER_CACHE_FULL,
+    MEMBER_CACHE_LEAN,
+    MemberPolicy,
+    get_member_cache_options,
+)
+
+CHUNK_SIZE = 1000
+ADMIN_PERMISSIONS = str(nextcord.Permissions(administrator=True).value)
+
+
+def get_rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def role_data(role_id: int, name: str, permissions: str, position: int) -> dict:
+    return {
+        "id": str(role_id),
+        "name": name,
+        "permissions": permissions,
+        "position": position,
+        "color": 0,
+        "hoist": False,
+        "managed": False,
+        "mentionable": False,
+    }
+
+
+def member_data(user_id: int, roles: list[str]) -> dict:
+    return {
+        "user": {
+            "id": str(user_id),
+            "username": f"user{user_id}",
+            "discriminator": "0",
+            "global_name": None,
+            "avatar": None,
+        },
+        "roles": roles,
+        "joined_at": "2024-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def install_gateway(state, members: int, admin_ids: dict[int, set[int]]) -> None:
+    """
+    Answer chunk requests of state with GUILD_MEMBERS_CHUNK payloads, one
+    per loop iteration like events read from the websocket.
+    """
+    chunk_count = -(-members // CHUNK_SIZE)
+    tasks = set()
+
+    async def send_chunks(guild_id: int, nonce: str) -> None:
+        admin_role = [str(guild_id + 1)]
+
+        for index in range(chunk_count):
+            await asyncio.sleep(0)
+            first = guild_id * members + index * CHUNK_SIZE
+            last = min(first + CHUNK_SIZE, (guild_id + 1) * members)
+            state.parse_guild_members_chunk(
+                {
+                    "guild_id": str(guild_id),
+                    "members": [
+                        member_data(x, admin_role if x in admin_ids[guild_id] else [])
+                        for x in range(first, last)
+                    ],
+                    "chunk_index": index,
+                    "chunk_count": chunk_count,
+                    "nonce": nonce,
+                }
+            )
+
+    async def chunker(guild_id, query="", limit=0, presences=False, *, nonce=None):
+        # Answered after the request was sent, as by Discord
+        tasks.add(asyncio.create_task(send_chunks(guild_id, nonce)))
+
+    state.chunker = chunker
+
+
+async def run(args: argparse.Namespace) -> dict:
+    random.seed(0)
+    intents = nextcord.Intents.default()
+    intents.members = True
+    client = nextcord.Client(intents=intents, **get_member_cache_options(args.mode))
+    state = client._connection
+    state.loop = asyncio.get_running_loop()
+
+    policy = MemberPolicy()
+    admin_ids: dict[int, set[int]] = {}
+    guilds = []
+
+    # Guild IDs are spaced so IDs of guilds, roles and members don't overlap
+    for index in range(args.guilds):
+        guild_id = (index + 1) * 10
+        user_ids = range(guild_id * args.members, (guild_id + 1) * args.members)
+        admin_ids[guild_id] = set(random.sample(user_ids, args.admins))
+        policy.linked_user_ids.update(random.sample(user_ids, args.linked))
+        guilds.append(
+            state._add_guild_from_data(
+                {
+                    "id": str(guild_id),
+                    "name": f"guild{guild_id}",
+                    "owner_id": str(guild_id * args.members),
+                    "member_count": args.members,
+                    "roles": [
+                        role_data(guild_id, "@everyone", "0", 0),
+                        role_data(guild_id + 1, "admin", ADMIN_PERMISSIONS, 1),
+                    ],
+                    "channels": [],
+                }
+            )
+        )
+
+    install_gateway(state, args.members, admin_ids)
+    gc.collect()
+    rss_before = get_rss()
+
+    start = time.perf_counter()
+    if args.mode == MEMBER_CACHE_LEAN:
+        # Ready right away, LeanMemberCache chunks guilds afterwards
+        ready = time.perf_counter() - start
+        for guild in guilds:
+            policy.cache_members(guild, await guild.chunk(cache=False))
+    else:
+        # Ready is delayed until all guilds were chunked
+        for guild in guilds:
+            await guild.chunk()
+        ready = time.perf_counter() - start
+    chunked = time.perf_counter() - start
+
+    gc.collect()
+    return {
+        "mode": args.mode,
+        "ready": ready,
+        "chunked": chunked,
+        "cached": sum(len(g.members) for g in guilds),
+        "rss": get_rss() - rss_before,
+        "max_rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.mode:
+        print(json.dumps(asyncio.run(run(args))))
+        return
+
+    print(
+        f"{args.guilds} guilds of {args.members} members, "
+        f"{args.admins} admins and {args.linked} linked users each"
+    )
+    print(
+        f"{'mode':<6} {'ready':>10} {'chunked':>10} {'cached':>10} "
+        f"{'rss':>12} {'max rss':>12}"
+    )
+    for mode in (MEMBER_CACHE_FULL, MEMBER_CACHE_LEAN):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.member_cache", *sys.argv[1:], "--mode", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        r = json.loads(output.strip().splitlines()[-1])
+        print(
+            f"{r['mode']:<6} {r['ready']:>9.2f}s {r['chunked']:>9.2f}s {r['cached']:>10} "
+            f"{r['rss'] / 2**20:>9.1f} MB {r['max_rss'] / 2**20:>9.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--guilds", type=int, default=20, help="Number of guilds")
+    parser.add_argument(
+        "--members", type=int, default=50000, help="Members of each guild"
+    )
+    parser.add_argument("--admins", type=int, default=5, help="Admins of each guild")
+    parser.add_argument(
+        "--linked", type=int, default=50, help="Linked users in each guild"
+    )
+    parser.add_argument(
+        "--mode",
+        choices=[MEMBER_CACHE_FULL, MEMBER_CACHE_LEAN],
+        help="Only run mode in this process",
+    )
+
+    main(parser.parse_args())
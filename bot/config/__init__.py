@@ -7,12 +7,37 @@ from pydantic_settings import BaseSettings
 class Settings(BaseSettings):
     IPC_SECRET: str = os.environ.get("IPC_SECRET")
     IPC_PORT: int = os.environ.get("IPC_PORT", 9999)
+    # Multiplexed msgpack transport serving the same routes as IPC
+    RPC_PORT: int = os.environ.get("RPC_PORT", 9998)
+    # Unix socket to serve RPC on instead of RPC_PORT if set
+    RPC_PATH: str = os.environ.get("RPC_PATH", "")
+    RPC_MAX_CONCURRENCY: int = os.environ.get("RPC_MAX_CONCURRENCY", 64)
+    METRICS_PORT: int = os.environ.get("METRICS_PORT", 9809)
     API_HOSTNAME: AnyHttpUrl = os.environ.get("API_HOSTNAME", "http://localhost:8000")
     SITE_HOSTNAME: AnyHttpUrl = os.environ.get("SITE_HOSTNAME", "http://localhost:3000")
     BOT_TOKEN: str = os.environ.get("BOT_TOKEN", "NO TOKEN")
     BOT_OWNER: int = os.environ.get("BOT_OWNER")
     BOT_DESCRIPTION: str = os.environ.get("BOT_DESCRIPTION", "Hellshade TTV tools discord helper")
 
+    # Number of shards across all processes, 0 to run one unsharded bot
+    SHARD_COUNT: int = os.environ.get("SHARD_COUNT", 0)
+    # Number of bot processes and index of this one, must match IPC_HOSTS of the backend
+    SHARD_PROCESSES: int = os.environ.get("SHARD_PROCESSES", 1)
+    SHARD_PROCESS: int = os.environ.get("SHARD_PROCESS", 0)
+
+    REDIS_URL: str = os.environ.get("REDIS_URL", "redis://redis:6379")
+    # Seconds between checks whether the guild directory must be published again
+    DIRECTORY_RESYNC_INTERVAL: int = os.environ.get("DIRECTORY_RESYNC_INTERVAL", 60)
+
+    # "full" caches all members at startup, "lean" chunks guilds lazily and
+    # only caches owners, admins and users linked to the site
+    MEMBER_CACHE: str = os.environ.get("MEMBER_CACHE", "full")
+    CHUNK_CONCURRENCY: int = os.environ.get("CHUNK_CONCURRENCY", 1)
+    # Seconds members that aren't cached are kept after being fetched
+    MEMBER_FETCH_TTL: int = os.environ.get("MEMBER_FETCH_TTL", 300)
+    MEMBER_FETCH_CACHE_SIZE: int = os.environ.get("MEMBER_FETCH_CACHE_SIZE", 10000)
+    LINKED_USERS_REFRESH: int = os.environ.get("LINKED_USERS_REFRESH", 300)
+
     VERSION: str = os.environ.get("VERSION", "UNKNOWN")
     BUILD: str = os.environ.get("BUILD", "UNKNOWN")
 
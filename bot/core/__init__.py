@@ -2,17 +2,71 @@ import nextcord
 from nextcord.ext import commands, ipc
 
 from config import settings, logger
+from core.admins import AdminIndex
+from core.members import (
+    MEMBER_CACHE_LEAN,
+    MemberPolicy,
+    MemberFetchCache,
+    get_member_cache_options,
+)
+from core.rpc import RpcServer
+from core.sharding import get_shard_id, get_process_shard_ids
 
 
-class CustomBot(commands.Bot):
+class CustomBotMixin:
+    """
+    Setup and events shared by the unsharded and the sharded bot.
+    """
+
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
+        self.admin_index = AdminIndex()
+        self.member_policy = MemberPolicy()
+        self.member_fetch_cache = MemberFetchCache(
+            self.member_policy,
+            ttl=int(settings.MEMBER_FETCH_TTL),
+            max_size=int(settings.MEMBER_FETCH_CACHE_SIZE),
+        )
         self.ipc = ipc.Server(self, host="0.0.0.0", port=settings.IPC_PORT, secret_key=settings.IPC_SECRET)
+        self.rpc = RpcServer(
+            self,
+            port=int(settings.RPC_PORT),
+            path=settings.RPC_PATH or None,
+            secret_key=settings.IPC_SECRET,
+            max_concurrency=int(settings.RPC_MAX_CONCURRENCY),
+        )
 
         self.load_extensions_from_module("core.cogs")
         #self.load_extension(".ipc", package="core.cogs")
 
+    def owns_guild(self, guild_id: int | str) -> bool:
+        """
+        Whether guild is served by this process.
+        """
+        return True
+
+    def members_cached(self, guild: nextcord.Guild) -> bool:
+        """
+        Whether members of guild the bot needs are cached. Lean member cache
+        caches them some time after the guild became available.
+        """
+        if settings.MEMBER_CACHE != MEMBER_CACHE_LEAN:
+            return True
+        return guild.id in self.member_policy.chunked_guild_ids
+
+    def all_members_cached(self) -> bool:
+        """
+        Whether members_cached is true for every guild of the process.
+        """
+        if settings.MEMBER_CACHE != MEMBER_CACHE_LEAN:
+            return True
+        chunked = self.member_policy.chunked_guild_ids
+        # Counted first, so chunking guild after guild stays linear
+        return len(chunked) >= len(self.guilds) and all(
+            g.id in chunked for g in self.guilds
+        )
+
     async def on_ready(self):
         logger.info(f"\nLogged in as:\n{self.user} (ID: {self.user.id})")
 
@@ -23,10 +77,40 @@ class CustomBot(commands.Bot):
         logger.info(f"{endpoint} raised {error}")
 
 
-def get_bot(intents=nextcord.Intents.default()) -> CustomBot:
-    return CustomBot(
-        command_prefix=commands.when_mentioned_or("!"),
-        description=settings.BOT_DESCRIPTION,
-        owner_id=settings.BOT_OWNER,
-        intents=intents,
+class CustomBot(CustomBotMixin, commands.Bot):
+    pass
+
+
+class CustomShardedBot(CustomBotMixin, commands.AutoShardedBot):
+    """
+    Runs the shards of this process over one event loop. Other processes
+    run the remaining shards.
+    """
+
+    def owns_guild(self, guild_id: int | str) -> bool:
+        return get_shard_id(guild_id, self.shard_count) in self.shard_ids
+
+    async def on_shard_ready(self, shard_id: int):
+        logger.info(f"Shard {shard_id} of {self.shard_count} ready")
+
+
+def get_bot(intents=nextcord.Intents.default()) -> CustomBot | CustomShardedBot:
+    kwargs = {
+        "command_prefix": commands.when_mentioned_or("!"),
+        "description": settings.BOT_DESCRIPTION,
+        "owner_id": settings.BOT_OWNER,
+        "intents": intents,
+        **get_member_cache_options(settings.MEMBER_CACHE),
+    }
+
+    if not int(settings.SHARD_COUNT):
+        return CustomBot(**kwargs)
+
+    shard_ids = get_process_shard_ids(
+        int(settings.SHARD_COUNT), int(settings.SHARD_PROCESSES), int(settings.SHARD_PROCESS)
+    )
+    logger.info(f"Running shards {shard_ids} of {settings.SHARD_COUNT}")
+
+    return CustomShardedBot(
+        shard_count=int(settings.SHARD_COUNT), shard_ids=shard_ids, **kwargs
     )
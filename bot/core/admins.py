@@ -0,0 +1,95 @@
+from typing import Callable
+
+import nextcord
+
+
+def is_admin(member: nextcord.Member) -> bool:
+    return member.top_role.permissions.administrator
+
+
+class AdminIndex:
+    """
+    Guilds each user administrates, kept up to date from gateway events so
+    looking them up doesn't walk every member of every guild. Guilds whose
+    members aren't cached yet are pending and not indexed, the index is only
+    ready once none are left.
+    """
+
+    def __init__(self):
+        self.built = False
+        # User ID to IDs of guilds and guild ID to IDs of admins
+        self.user_guilds: dict[int, set[int]] = {}
+        self.guild_admins: dict[int, set[int]] = {}
+        self.pending_guild_ids: set[int] = set()
+
+    @property
+    def ready(self) -> bool:
+        return self.built and not self.pending_guild_ids
+
+    def rebuild(
+        self,
+        guilds: list[nextcord.Guild],
+        *,
+        cached: Callable[[nextcord.Guild], bool] = lambda guild: True,
+    ) -> None:
+        """
+        :param cached: Whether members of guild are cached and may be indexed
+        """
+        self.user_guilds.clear()
+        self.guild_admins.clear()
+        self.pending_guild_ids.clear()
+
+        for guild in guilds:
+            if cached(guild):
+                self.add_guild(guild)
+            else:
+                self.add_pending(guild.id)
+
+        self.built = True
+
+    def add_guild(self, guild: nextcord.Guild) -> None:
+        """
+        Index admins of guild, replacing admins indexed before.
+        """
+        self.pending_guild_ids.discard(guild.id)
+        previous = self.guild_admins.get(guild.id, set())
+        current = {m.id for m in guild.members if is_admin(m)}
+
+        for user_id in previous - current:
+            self._discard(user_id, guild.id)
+        for user_id in current - previous:
+            self.user_guilds.setdefault(user_id, set()).add(guild.id)
+
+        self.guild_admins[guild.id] = current
+
+    def add_pending(self, guild_id: int) -> None:
+        """
+        Drop admins of guild until its members are cached and it is added.
+        """
+        self.remove_guild(guild_id)
+        self.pending_guild_ids.add(guild_id)
+
+    def remove_guild(self, guild_id: int) -> None:
+        self.pending_guild_ids.discard(guild_id)
+        for user_id in self.guild_admins.pop(guild_id, set()):
+            self._discard(user_id, guild_id)
+
+    def set_admin(self, guild_id: int, user_id: int, admin: bool) -> None:
+        if admin:
+            self.guild_admins.setdefault(guild_id, set()).add(user_id)
+            self.user_guilds.setdefault(user_id, set()).add(guild_id)
+        else:
+            self.guild_admins.get(guild_id, set()).discard(user_id)
+            self._discard(user_id, guild_id)
+
+    def get_guild_ids(self, user_id: int) -> set[int]:
+        return self.user_guilds.get(user_id, set())
+
+    def _discard(self, user_id: int, guild_id: int) -> None:
+        guilds = self.user_guilds.get(user_id)
+        if guilds is None:
+            return
+
+        guilds.discard(guild_id)
+        if not guilds:
+            del self.user_guilds[user_id]
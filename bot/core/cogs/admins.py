@@ -0,0 +1,73 @@
+import nextcord
+from nextcord.ext import commands
+
+from core import CustomBot
+from core.admins import is_admin
+
+
+class AdminIndexer(commands.Cog):
+    """
+    Keeps the admin index of the bot up to date.
+    """
+
+    def __init__(self, bot):
+        self.bot: CustomBot = bot
+
+    def index_guild(self, guild: nextcord.Guild) -> None:
+        if self.bot.members_cached(guild):
+            self.bot.admin_index.add_guild(guild)
+        elif guild.id not in self.bot.admin_index.pending_guild_ids:
+            self.bot.admin_index.add_pending(guild.id)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        self.bot.admin_index.rebuild(self.bot.guilds, cached=self.bot.members_cached)
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: nextcord.Guild):
+        self.index_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: nextcord.Guild):
+        self.index_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_members_cached(self, guild: nextcord.Guild):
+        # Lean member cache chunked guild after the index was built
+        self.bot.admin_index.add_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: nextcord.Guild):
+        self.bot.admin_index.remove_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: nextcord.Role):
+        self.index_guild(role.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: nextcord.Role, after: nextcord.Role):
+        # Permissions or position of role may change admins of guild
+        self.index_guild(after.guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: nextcord.Member):
+        if is_admin(member):
+            self.bot.admin_index.set_admin(member.guild.id, member.id, True)
+
+    @commands.Cog.listener()
+    async def on_member_cached(self, member: nextcord.Member):
+        if is_admin(member):
+            self.bot.admin_index.set_admin(member.guild.id, member.id, True)
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: nextcord.Member, after: nextcord.Member):
+        if is_admin(before) != is_admin(after):
+            self.bot.admin_index.set_admin(after.guild.id, after.id, is_admin(after))
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: nextcord.Member):
+        self.bot.admin_index.set_admin(member.guild.id, member.id, False)
+
+
+def setup(bot):
+    bot.add_cog(AdminIndexer(bot))
@@ -0,0 +1,149 @@
+import nextcord
+import redis
+import redis.asyncio
+from nextcord.ext import commands, tasks
+
+from core import CustomBot
+from core.admins import is_admin
+from core.directory import GuildDirectory
+from config import settings, logger
+
+GuildChannel = nextcord.abc.GuildChannel
+
+
+class DirectoryPublisher(commands.Cog):
+    """
+    Keeps the guild directory in Redis up to date from gateway events. A
+    failed write marks the directory stale, so the backend reads through IPC
+    until it was published again.
+    """
+
+    def __init__(self, bot):
+        self.bot: CustomBot = bot
+        self.directory = GuildDirectory(
+            redis.asyncio.Redis.from_url(settings.REDIS_URL),
+            process=int(settings.SHARD_PROCESS),
+            owns_guild=bot.owns_guild,
+        )
+        self.stale = True
+
+    def cog_unload(self):
+        self.resync.cancel()
+
+    async def publish(self, coro) -> None:
+        try:
+            await coro
+        except redis.RedisError as e:
+            logger.warning(f"Publishing guild directory failed: {e}")
+            await self.mark_stale()
+        except Exception:
+            # Also retried by resync, an error must not end its loop
+            logger.exception("Publishing guild directory failed")
+            await self.mark_stale()
+
+    async def mark_stale(self) -> None:
+        self.stale = True
+        try:
+            await self.directory.mark_stale()
+        except redis.RedisError:
+            pass
+
+    async def update_ready(self) -> None:
+        """
+        Mark directory ready once admins of all guilds were published, e.g.
+        after the lean member cache chunked the last guild.
+        """
+        if not self.stale:
+            await self.publish(self.directory.set_ready(self.bot.all_members_cached()))
+
+    @tasks.loop(seconds=int(settings.DIRECTORY_RESYNC_INTERVAL))
+    async def resync(self):
+        if not self.stale:
+            return
+
+        self.stale = False
+        await self.publish(
+            self.directory.sync(self.bot.guilds, admins=self.bot.members_cached)
+        )
+        if not self.stale:
+            logger.info(f"Published guild directory of {len(self.bot.guilds)} guilds")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Events may have been missed while disconnected
+        self.stale = True
+        if not self.resync.is_running():
+            self.resync.start()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: nextcord.Guild):
+        await self.publish(
+            self.directory.publish_guild(guild, admins=self.bot.members_cached(guild))
+        )
+        await self.update_ready()
+
+    @commands.Cog.listener()
+    async def on_guild_members_cached(self, guild: nextcord.Guild):
+        await self.publish(self.directory.publish_guild(guild))
+        await self.update_ready()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: nextcord.Guild):
+        await self.publish(self.directory.remove_guild(guild.id))
+        await self.update_ready()
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: nextcord.Guild, after: nextcord.Guild):
+        await self.publish(self.directory.publish_guild(after, admins=False))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: GuildChannel):
+        if isinstance(channel, nextcord.TextChannel):
+            await self.publish(self.directory.publish_guild(channel.guild, admins=False))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: GuildChannel):
+        if isinstance(channel, nextcord.TextChannel):
+            await self.publish(self.directory.publish_guild(channel.guild, admins=False))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: GuildChannel, after: GuildChannel):
+        if isinstance(before, nextcord.TextChannel) or isinstance(
+            after, nextcord.TextChannel
+        ):
+            await self.publish(self.directory.publish_guild(after.guild, admins=False))
+
+    @commands.Cog.listener()
+    async def on_guild_role_create(self, role: nextcord.Role):
+        # New roles have no members yet
+        await self.publish(self.directory.publish_guild(role.guild, admins=False))
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: nextcord.Role):
+        await self.publish(self.directory.publish_guild(role.guild))
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: nextcord.Role, after: nextcord.Role):
+        # Permissions or position of role may change admins of guild
+        await self.publish(self.directory.publish_guild(after.guild))
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: nextcord.Member, after: nextcord.Member):
+        if is_admin(before) != is_admin(after):
+            await self.publish(
+                self.directory.set_admin(after.guild.id, after.id, is_admin(after))
+            )
+
+    @commands.Cog.listener()
+    async def on_member_cached(self, member: nextcord.Member):
+        if is_admin(member):
+            await self.publish(self.directory.set_admin(member.guild.id, member.id, True))
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: nextcord.Member):
+        if is_admin(member):
+            await self.publish(self.directory.set_admin(member.guild.id, member.id, False))
+
+
+def setup(bot):
+    bot.add_cog(DirectoryPublisher(bot))
@@ -2,7 +2,9 @@ import nextcord
 import datetime
 
 from core import CustomBot
+from core.admins import is_admin
 from core.embeds import get_notification_embed, get_base_embed
+from core.metrics import observe_delivery
 from config import logger
 from nextcord.ext import commands, ipc
 
@@ -25,16 +27,42 @@ def serialize_channel(channel: nextcord.VoiceChannel | nextcord.TextChannel) ->
     }
 
 
-def serialize_guild(guild: nextcord.Guild) -> dict:
-    return {
-        "discord_id": str(guild.id),
-        "name": guild.name,
-        "icon_url": guild.icon.url if guild.icon else None,
-        "description": guild.description,
-        "owner": serialize_member(guild.owner),
-        "channels": serialize_channels(guild.text_channels),
-        "roles": serialize_roles(guild.roles),
-    }
+GUILD_FIELDS = {
+    "discord_id": lambda g: str(g.id),
+    "name": lambda g: g.name,
+    "icon_url": lambda g: g.icon.url if g.icon else None,
+    "description": lambda g: g.description,
+    # Not cached until the guild was chunked with the lean member cache
+    "owner": lambda g: serialize_member(g.owner) if g.owner else None,
+    "channels": lambda g: serialize_channels(g.text_channels),
+    "roles": lambda g: serialize_roles(g.roles),
+}
+
+# Fields of each serialization mode, must match models of the backend
+GUILD_MODES = {
+    "summary": ("discord_id", "name", "icon_url"),
+    "full": tuple(GUILD_FIELDS),
+}
+
+
+def get_guild_fields(mode: str = "full", fields: list[str] | None = None) -> tuple[str, ...]:
+    """
+    Fields to be serialized of guilds.
+
+    :param mode: "summary" or "full"
+    :param fields: Explicit fields, overrides mode
+    """
+    if fields is None:
+        return GUILD_MODES[mode]
+
+    unknown = set(fields) - set(GUILD_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown guild fields {', '.join(sorted(unknown))}")
+    return tuple(fields)
+
+
+def serialize_guild(guild: nextcord.Guild, fields: tuple[str, ...] = GUILD_MODES["full"]) -> dict:
+    return {f: GUILD_FIELDS[f](guild) for f in fields}
 
 
 def serialize_role(role: nextcord.Role) -> dict:
@@ -56,8 +84,26 @@ def serialize_channels(
     return [serialize_channel(c) for c in channels]
 
 
-def serialize_guilds(guilds: list[nextcord.Guild]) -> list[dict]:
-    return [serialize_guild(g) for g in guilds]
+def serialize_guilds(
+    guilds: list[nextcord.Guild], fields: tuple[str, ...] = GUILD_MODES["full"]
+) -> list[dict]:
+    return [serialize_guild(g, fields) for g in guilds]
+
+
+def serialize_guild_page(guilds: list[nextcord.Guild], data) -> list[dict]:
+    """
+    Serialize page of guilds ordered by ID as selected by IPC request.
+    """
+    fields = get_guild_fields(
+        getattr(data, "mode", "full"), getattr(data, "fields", None)
+    )
+    skip = getattr(data, "skip", 0) or 0
+    limit = getattr(data, "limit", None)
+
+    guilds = sorted(guilds, key=lambda g: g.id)
+    guilds = guilds[skip:] if limit is None else guilds[skip : skip + limit]
+
+    return serialize_guilds(guilds, fields)
 
 
 def serialize_roles(roles: list[nextcord.Role]) -> list[dict]:
@@ -92,6 +138,7 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def send_new_subscription_notification(self, data) -> dict:
@@ -115,6 +162,7 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def send_resubscription_notification(self, data) -> dict:
@@ -144,6 +192,7 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def send_gift_subscription_notification(self, data) -> dict:
@@ -173,6 +222,7 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def send_cheer_notification(self, data) -> dict:
@@ -196,6 +246,7 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def send_raid_notification(self, data) -> dict:
@@ -216,6 +267,7 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def send_hype_train_end_notification(self, data) -> dict:
@@ -242,38 +294,58 @@ class IpcRoutes(commands.Cog):
             return {}
 
         await channel.send(embed=embed, content=data.notification_content)
+        observe_delivery(data)
 
     @ipc.server.route()
     async def get_all_servers(self, data) -> list[dict]:
-        return serialize_guilds(self.bot.guilds)
+        return serialize_guild_page(self.bot.guilds, data)
 
     @ipc.server.route()
     async def get_user_servers(self, data) -> list[dict]:
-        def is_admin(member: nextcord.Member) -> bool:
-            return (
-                member.id == int(data.user_id)
-                and member.top_role.permissions.administrator
-            )
-
-        members = filter(is_admin, self.bot.get_all_members())
-        guilds = [m.guild for m in members]
+        user_id = int(data.user_id)
+        index = self.bot.admin_index
+
+        if index.built:
+            guild_ids = set(index.get_guild_ids(user_id))
+            # Members of pending guilds aren't cached yet, fetched instead
+            for guild_id in list(index.pending_guild_ids):
+                guild = self.bot.get_guild(guild_id)
+                if guild is None or guild_id in guild_ids:
+                    continue
+                member = await self.bot.member_fetch_cache.get(guild, user_id)
+                if member is not None and is_admin(member):
+                    guild_ids.add(guild_id)
+
+            guilds = [self.bot.get_guild(x) for x in guild_ids]
+            guilds = [g for g in guilds if g is not None]
+        else:
+            # Index is built once the bot is ready
+            guilds = [
+                m.guild
+                for m in self.bot.get_all_members()
+                if m.id == user_id and is_admin(m)
+            ]
 
-        return serialize_guilds(guilds)
+        return serialize_guild_page(guilds, data)
 
     @ipc.server.route()
     async def get_member(self, data) -> dict:
         guild: nextcord.Guild = self.bot.get_guild(int(data.server_id))
         if guild:
-            member: nextcord.Member = guild.get_member(int(data.user_id))
-
-            return serialize_member(member)
+            # Fetched if not cached, e.g. in lean member cache mode
+            member = await self.bot.member_fetch_cache.get(guild, int(data.user_id))
+            if member:
+                return serialize_member(member)
         return {}
 
     @ipc.server.route()
     async def get_server(self, data) -> dict:
         guild = self.bot.get_guild(int(data.server_id))
         if guild:
-            return serialize_guild(guild)
+            fields = get_guild_fields(
+                getattr(data, "mode", "full"), getattr(data, "fields", None)
+            )
+            return serialize_guild(guild, fields)
         return {}
 
 
@@ -0,0 +1,96 @@
+import time
+import asyncio
+
+import nextcord
+import redis
+import redis.asyncio
+from nextcord.ext import commands, tasks
+
+from core import CustomBot
+from core.directory import LINKED_USERS_KEY
+from core.members import MEMBER_CACHE_LEAN, install_member_policy
+from config import settings, logger
+
+
+class LeanMemberCache(commands.Cog):
+    """
+    Chunks guilds one by one after startup and only keeps members of the
+    member policy. Dispatches guild_members_cached for each chunked guild.
+    """
+
+    def __init__(self, bot):
+        self.bot: CustomBot = bot
+        self.redis = redis.asyncio.Redis.from_url(settings.REDIS_URL)
+        self.semaphore = asyncio.Semaphore(int(settings.CHUNK_CONCURRENCY))
+        self.chunking: set[int] = set()
+
+        install_member_policy(bot, bot.member_policy)
+
+    def cog_unload(self):
+        self.refresh_linked_users.cancel()
+
+    async def chunk(self, guild: nextcord.Guild) -> None:
+        if guild.id in self.chunking:
+            return
+
+        self.chunking.add(guild.id)
+        try:
+            async with self.semaphore:
+                start = time.monotonic()
+                members = await guild.chunk(cache=False) or []
+                cached = self.bot.member_policy.cache_members(guild, members)
+                self.bot.member_policy.chunked_guild_ids.add(guild.id)
+
+            logger.info(
+                f"Cached {cached} of {len(members)} members of {guild.id} "
+                f"in {time.monotonic() - start:.1f}s"
+            )
+            self.bot.dispatch("guild_members_cached", guild)
+        finally:
+            self.chunking.discard(guild.id)
+
+    async def chunk_all(self) -> None:
+        await asyncio.gather(*[self.chunk(g) for g in self.bot.guilds])
+
+    @tasks.loop(seconds=int(settings.LINKED_USERS_REFRESH))
+    async def refresh_linked_users(self):
+        try:
+            linked = await self.redis.smembers(LINKED_USERS_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Reading linked users failed: {e}")
+            return
+
+        self.bot.member_policy.linked_user_ids = {int(x) for x in linked}
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # Linked users must be known before members are kept
+        await self.refresh_linked_users()
+        if not self.refresh_linked_users.is_running():
+            self.refresh_linked_users.start()
+
+        self.bot.loop.create_task(self.chunk_all())
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: nextcord.Guild):
+        await self.chunk(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: nextcord.Guild):
+        self.bot.member_policy.chunked_guild_ids.discard(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: nextcord.Role, after: nextcord.Role):
+        # Members of role became admins without being cached
+        if after.permissions.administrator and not before.permissions.administrator:
+            await self.chunk(after.guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: nextcord.Member):
+        if self.bot.member_policy.keeps(member):
+            member.guild._add_member(member)
+
+
+def setup(bot):
+    if settings.MEMBER_CACHE == MEMBER_CACHE_LEAN:
+        bot.add_cog(LeanMemberCache(bot))
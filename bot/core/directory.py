@@ -0,0 +1,155 @@
+import json
+from typing import Callable
+
+import nextcord
+from redis.asyncio import Redis
+
+from core.admins import is_admin
+from core.cogs.ipc import GUILD_MODES, serialize_guild
+
+# Must match keys read by the backend
+DIRECTORY_VERSION_KEY = "discord:directory:version"
+DIRECTORY_GUILDS_KEY = "discord:directory:guilds"
+# Discord IDs of users linked to the site, kept by the lean member cache
+LINKED_USERS_KEY = "discord:directory:linked_users"
+
+
+def directory_ready_key(process: int) -> str:
+    return f"discord:directory:ready:{process}"
+
+
+def guild_key(guild_id: int | str) -> str:
+    return f"discord:directory:guild:{guild_id}"
+
+
+def guild_summary_key(guild_id: int | str) -> str:
+    return f"discord:directory:guild:{guild_id}:summary"
+
+
+def guild_admins_key(guild_id: int | str) -> str:
+    return f"discord:directory:guild:{guild_id}:admins"
+
+
+def user_guilds_key(user_id: int | str) -> str:
+    return f"discord:directory:user:{user_id}:guilds"
+
+
+class GuildDirectory:
+    """
+    Guilds the bot is in, published to Redis for the backend. Every change
+    increments the version, the directory is only read while ready is set
+    by every bot process.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        *,
+        process: int = 0,
+        owns_guild: Callable[[int | str], bool] = lambda guild_id: True,
+    ):
+        self.redis = redis
+        self.process = process
+        self.owns_guild = owns_guild
+
+    async def publish_guild(self, guild: nextcord.Guild, *, admins: bool = True) -> None:
+        """
+        Publish guild, its text channels and roles.
+
+        :param guild: Guild to be published
+        :param admins: Whether admins of guild may have changed
+        """
+        guild_id = str(guild.id)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.set(guild_key(guild_id), json.dumps(serialize_guild(guild)))
+            pipe.set(
+                guild_summary_key(guild_id),
+                json.dumps(serialize_guild(guild, GUILD_MODES["summary"])),
+            )
+            pipe.sadd(DIRECTORY_GUILDS_KEY, guild_id)
+
+            if admins:
+                previous = {
+                    x.decode() for x in await self.redis.smembers(guild_admins_key(guild_id))
+                }
+                current = {str(m.id) for m in guild.members if is_admin(m)}
+
+                for user_id in previous - current:
+                    pipe.srem(user_guilds_key(user_id), guild_id)
+                for user_id in current - previous:
+                    pipe.sadd(user_guilds_key(user_id), guild_id)
+
+                pipe.delete(guild_admins_key(guild_id))
+                if current:
+                    pipe.sadd(guild_admins_key(guild_id), *current)
+
+            pipe.incr(DIRECTORY_VERSION_KEY)
+            await pipe.execute()
+
+    async def remove_guild(self, guild_id: int | str) -> None:
+        guild_id = str(guild_id)
+        admins = await self.redis.smembers(guild_admins_key(guild_id))
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            for user_id in admins:
+                pipe.srem(user_guilds_key(user_id.decode()), guild_id)
+            pipe.delete(
+                guild_key(guild_id), guild_summary_key(guild_id), guild_admins_key(guild_id)
+            )
+            pipe.srem(DIRECTORY_GUILDS_KEY, guild_id)
+            pipe.incr(DIRECTORY_VERSION_KEY)
+            await pipe.execute()
+
+    async def set_admin(
+        self, guild_id: int | str, user_id: int | str, admin: bool
+    ) -> None:
+        guild_id, user_id = str(guild_id), str(user_id)
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            if admin:
+                pipe.sadd(guild_admins_key(guild_id), user_id)
+                pipe.sadd(user_guilds_key(user_id), guild_id)
+            else:
+                pipe.srem(guild_admins_key(guild_id), user_id)
+                pipe.srem(user_guilds_key(user_id), guild_id)
+            pipe.incr(DIRECTORY_VERSION_KEY)
+            await pipe.execute()
+
+    async def sync(
+        self,
+        guilds: list[nextcord.Guild],
+        *,
+        admins: Callable[[nextcord.Guild], bool] = lambda guild: True,
+    ) -> None:
+        """
+        Publish all guilds and remove guilds the bot has left since. Guilds of
+        other processes are left alone. The directory is only ready if admins
+        of every guild were published.
+
+        :param admins: Whether admins of guild are cached and may be published
+        """
+        current = {str(g.id) for g in guilds}
+        published = {
+            x.decode()
+            for x in await self.redis.smembers(DIRECTORY_GUILDS_KEY)
+            if self.owns_guild(x.decode())
+        }
+
+        for guild_id in published - current:
+            await self.remove_guild(guild_id)
+        cached = True
+        for guild in guilds:
+            cached &= admins(guild)
+            await self.publish_guild(guild, admins=admins(guild))
+
+        await self.set_ready(cached)
+
+    async def set_ready(self, ready: bool) -> None:
+        if ready:
+            await self.redis.set(directory_ready_key(self.process), 1)
+        else:
+            await self.mark_stale()
+
+    async def mark_stale(self) -> None:
+        await self.redis.delete(directory_ready_key(self.process))
@@ -0,0 +1,123 @@
+import time
+from collections import OrderedDict
+
+import nextcord
+
+from core.admins import is_admin
+
+# Member cache modes, "full" chunks all guilds at startup and caches everyone
+MEMBER_CACHE_FULL = "full"
+MEMBER_CACHE_LEAN = "lean"
+
+
+def get_member_cache_options(mode: str) -> dict:
+    """
+    Client options of member cache mode. Lean mode caches no members by
+    itself, LeanMemberCache chunks guilds after startup and keeps some.
+    """
+    if mode == MEMBER_CACHE_LEAN:
+        return {
+            "chunk_guilds_at_startup": False,
+            "member_cache_flags": nextcord.MemberCacheFlags.none(),
+        }
+    return {}
+
+
+class MemberPolicy:
+    """
+    Members kept by the lean member cache: admins, which the admin index and
+    directory need, owners, which guilds are serialized with, and users
+    linked to the site.
+    """
+
+    def __init__(self):
+        self.linked_user_ids: set[int] = set()
+        # Guilds whose kept members were cached by chunking
+        self.chunked_guild_ids: set[int] = set()
+
+    def keeps(self, member: nextcord.Member) -> bool:
+        return (
+            member.id == member.guild.owner_id
+            or member.id in self.linked_user_ids
+            or is_admin(member)
+        )
+
+    def cache_members(self, guild: nextcord.Guild, members: list[nextcord.Member]) -> int:
+        """
+        Cache members of guild that are kept.
+
+        :return: Number of members cached
+        """
+        cached = 0
+        for member in members:
+            if self.keeps(member) and guild.get_member(member.id) is None:
+                guild._add_member(member)
+                cached += 1
+        return cached
+
+
+def install_member_policy(bot, policy: MemberPolicy) -> None:
+    """
+    Cache members that were not cached when an update makes them kept, e.g.
+    when they are given an admin role. nextcord drops these updates since
+    the member is unknown to it.
+    """
+    state = bot._connection
+    parse_guild_member_update = state.parsers["GUILD_MEMBER_UPDATE"]
+
+    def parse(data) -> None:
+        guild = state._get_guild(int(data["guild_id"]))
+        if guild is None or guild.get_member(int(data["user"]["id"])) is not None:
+            parse_guild_member_update(data)
+            return
+
+        member = nextcord.Member(data=data, guild=guild, state=state)
+        if policy.keeps(member):
+            guild._add_member(member)
+            bot.dispatch("member_cached", member)
+
+    state.parsers["GUILD_MEMBER_UPDATE"] = parse
+
+
+class MemberFetchCache:
+    """
+    Members that aren't cached by nextcord, fetched on demand and kept for
+    ttl seconds. Missing members are remembered as well.
+    """
+
+    def __init__(self, policy: MemberPolicy, ttl: int = 300, max_size: int = 10000):
+        self.policy = policy
+        self.ttl = ttl
+        self.max_size = max_size
+        self._members: OrderedDict[
+            tuple[int, int], tuple[float, nextcord.Member | None]
+        ] = OrderedDict()
+
+    async def get(self, guild: nextcord.Guild, user_id: int) -> nextcord.Member | None:
+        member = guild.get_member(user_id)
+        if member is not None:
+            return member
+
+        key = (guild.id, user_id)
+        entry = self._members.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._members.move_to_end(key)
+            return entry[1]
+
+        try:
+            member = await guild.fetch_member(user_id)
+        except nextcord.NotFound:
+            member = None
+
+        if member is not None and self.policy.keeps(member):
+            # E.g. linked since guild was chunked
+            guild._add_member(member)
+            self._members.pop(key, None)
+            return member
+
+        self._members[key] = (time.monotonic() + self.ttl, member)
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+        return member
@@ -0,0 +1,54 @@
+import time
+
+from prometheus_client import Histogram
+
+# Must match stages used by the backend
+NOTIFICATION_STAGES = (
+    "twitch",
+    "received",
+    "enqueued",
+    "worker_started",
+    "helix_fetched",
+    "ipc_sent",
+    "discord_ack",
+)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0
+)
+
+NOTIFICATION_STAGE_LATENCY = Histogram(
+    "notification_stage_latency_seconds",
+    "Time spent between notification stages",
+    ["event", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+NOTIFICATION_LATENCY = Histogram(
+    "notification_latency_seconds",
+    "Time from Twitch emitting an event to Discord acknowledging the message",
+    ["event"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def observe_delivery(data) -> None:
+    """
+    Record Discord acknowledgement of a notification sent over IPC.
+    """
+    timings = getattr(data, "notification_timings", None)
+    event = getattr(data, "notification_event", None) or "unknown"
+
+    if not timings:
+        return
+
+    acked = time.time()
+
+    previous = [s for s in NOTIFICATION_STAGES[:-1] if s in timings]
+    if previous:
+        NOTIFICATION_STAGE_LATENCY.labels(event=event, stage="discord_ack").observe(
+            max(acked - timings[previous[-1]], 0)
+        )
+
+    if "twitch" in timings:
+        NOTIFICATION_LATENCY.labels(event=event).observe(max(acked - timings["twitch"], 0))
@@ -0,0 +1,158 @@
+import hmac
+import struct
+import asyncio
+
+import msgpack
+from nextcord.ext.ipc.server import IpcServerResponse
+
+from config import logger
+
+# Frames are a 4 byte big endian length followed by a msgpack array. Must
+# match backend/core/ipc/rpc.py
+FRAME_HEADER = struct.Struct("!I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+
+# [AUTH, secret], [REQUEST, id, endpoint, data], [RESPONSE, id, result], [CANCEL, id]
+AUTH = 0
+REQUEST = 1
+RESPONSE = 2
+CANCEL = 3
+
+
+class RpcError(Exception):
+    pass
+
+
+def encode_frame(message: list) -> bytes:
+    payload = msgpack.packb(message, use_bin_type=True)
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> list:
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if size > MAX_FRAME_SIZE:
+        raise RpcError(f"Frame of {size} bytes exceeds limit")
+    return msgpack.unpackb(await reader.readexactly(size), raw=False)
+
+
+class RpcServer:
+    """
+    Serves the IPC routes of the bot to the RPC client of the backend.
+    Requests of a connection are handled concurrently up to max_concurrency,
+    beyond that the connection is not read from, so clients are slowed down
+    instead of queueing unboundedly.
+    """
+
+    def __init__(
+        self,
+        bot,
+        host: str = "0.0.0.0",
+        port: int = 9998,
+        *,
+        path: str | None = None,
+        secret_key: str | None = None,
+        max_concurrency: int = 64,
+    ):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_key = secret_key or ""
+        self.max_concurrency = max_concurrency
+        self._server: asyncio.AbstractServer | None = None
+
+    async def dispatch(self, endpoint: str, data: dict):
+        # Routes registered with the IPC server of the bot
+        route = self.bot.ipc.endpoints.get(endpoint)
+        if route is None:
+            return {"error": "Invalid or no endpoint given.", "code": 400}
+
+        try:
+            return await route(IpcServerResponse({"endpoint": endpoint, "data": data}))
+        except Exception as error:
+            self.bot.dispatch("ipc_error", endpoint, error)
+            raise
+
+    async def _start(self) -> None:
+        if self.path:
+            self._server = await asyncio.start_unix_server(self.handle_connection, self.path)
+        else:
+            self._server = await asyncio.start_server(
+                self.handle_connection, self.host, self.port
+            )
+
+    def start(self) -> None:
+        """Starts the RPC server, before the bot is run like the IPC server."""
+        self.bot.loop.run_until_complete(self._start())
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        tasks: dict[int, asyncio.Task] = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        write_lock = asyncio.Lock()
+
+        async def handle(request_id: int, endpoint: str, data: dict) -> None:
+            try:
+                result = await self.dispatch(endpoint, data)
+            except Exception as e:
+                logger.error(f"RPC route {endpoint} raised {e!r}")
+                result = {
+                    "error": f"RPC route raised error of type {type(e).__name__}",
+                    "code": 500,
+                }
+
+            try:
+                frame = encode_frame([RESPONSE, request_id, result])
+            except TypeError as e:
+                frame = encode_frame(
+                    [RESPONSE, request_id, {"error": str(e), "code": 500}]
+                )
+
+            try:
+                async with write_lock:
+                    writer.write(frame)
+                    await writer.drain()
+            except ConnectionError:
+                pass
+
+        def done(request_id: int, task: asyncio.Task) -> None:
+            tasks.pop(request_id, None)
+            semaphore.release()
+
+        try:
+            message = await read_frame(reader)
+            if message[0] != AUTH or not hmac.compare_digest(
+                str(message[1]).encode(), self.secret_key.encode()
+            ):
+                logger.warning("Rejected unauthorized RPC connection")
+                return
+
+            while True:
+                message = await read_frame(reader)
+
+                if message[0] == CANCEL:
+                    task = tasks.get(message[1])
+                    if task is not None:
+                        task.cancel()
+                    continue
+
+                if message[0] != REQUEST:
+                    continue
+
+                await semaphore.acquire()
+                request_id = message[1]
+                task = asyncio.create_task(handle(request_id, message[2], message[3]))
+                tasks[request_id] = task
+                task.add_done_callback(lambda t, i=request_id: done(i, t))
+        except (asyncio.IncompleteReadError, ConnectionError, RpcError):
+            pass
+        finally:
+            for task in list(tasks.values()):
+                task.cancel()
+            writer.close()
@@ -0,0 +1,12 @@
+def get_shard_id(guild_id: int | str, shard_count: int) -> int:
+    """
+    Shard Discord sends events of guild to. Must match backend/core/ipc/sharding.py
+    """
+    return (int(guild_id) >> 22) % shard_count
+
+
+def get_process_shard_ids(shard_count: int, processes: int, process: int) -> list[int]:
+    """
+    Shards run by process, shards are dealt to processes round robin.
+    """
+    return [x for x in range(shard_count) if x % processes == process]
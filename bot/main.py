@@ -1,6 +1,7 @@
 import signal
 import nextcord
 from nextcord.ext import commands
+from prometheus_client import start_http_server
 
 from config import settings, logger
 from core import get_bot
@@ -22,7 +23,10 @@ def main():
 
     signal.signal(signal.SIGTERM, handle_sigterm)
 
+    start_http_server(int(settings.METRICS_PORT))
+
     bot.ipc.start()
+    bot.rpc.start()
     bot.run(settings.BOT_TOKEN)
 
 
@@ -1,20 +1,19 @@
 'use client'
 import {Box, Button, Grid, Paper, Skeleton, Typography} from "@mui/material";
-import {QueriesOptions, useMutation, useQueries, useQuery, useQueryClient, UseQueryResult} from "@tanstack/react-query";
+import {useMutation, useQuery, useQueryClient, UseQueryResult} from "@tanstack/react-query";
 import {DiscordChannel, DiscordServer, EventSubscription, User} from "@/src/services/types";
 import {AxiosError} from "axios";
 import {deleteEventSub, getEventSub} from "@/src/services/eventsubs";
 import ErrorMessage from "@/src/components/ErrorMessage";
 import {formatRFC7231} from "date-fns";
 import {getCurrentUser} from "@/src/services/users";
-import {getDiscordServers} from "@/src/services/discord";
+import {getDiscordServer} from "@/src/services/discord";
 import {useEffect, useState} from "react";
 import DeleteIcon from "@mui/icons-material/Delete";
 
 export default function EventsubPage({params}: { params: { uuid: string } }) {
     const queryClient = useQueryClient();
 
-    const [discordServer, setDiscordServer] = useState<DiscordServer | null>(null);
     const [discordChannel, setDiscrodChannel] = useState<DiscordChannel | null>(null);
 
     const {
@@ -23,44 +22,28 @@ export default function EventsubPage({params}: { params: { uuid: string } }) {
         retry:  false
     });
 
-    const queries: Array<QueriesOptions<any>> = [
-        {
-            queryKey: ["eventsubs", params.uuid],
-            queryFn: () => getEventSub(params.uuid),
-            options: {
-                retry: false
-            }
-        },
-        {
-            queryKey: ["discordServers"],
-            queryFn: getDiscordServers,
-            options: {
-                enabled: !!currentUser?.discord_id
-            }
-        }
-    ];
-
-    const results: Array<UseQueryResult<any, AxiosError>> = useQueries(
-        { queries }
-    ) as Array<UseQueryResult<any, AxiosError>>;
-
-    const [eventsubResult, serversResult] = results;
     const {
         data,
         error,
         isLoading
-    }: UseQueryResult<EventSubscription, AxiosError> = eventsubResult;
+    }: UseQueryResult<EventSubscription, AxiosError> = useQuery(
+        ["eventsubs", params.uuid],
+        () => getEventSub(params.uuid),
+        {
+            retry: false
+        }
+    );
 
+    // Only the server of the subscription is needed, not all of them
     const {
-        data: discordServers,
-    }: UseQueryResult<Array<DiscordServer>, AxiosError> = serversResult;
-
-    useEffect(() => {
-        if (data && discordServers) {
-            const dServer = discordServers.find(v => v.discord_id === data.server_discord_id);
-            setDiscordServer(dServer ? dServer : null);
+        data: discordServer,
+    }: UseQueryResult<DiscordServer, AxiosError> = useQuery(
+        ["discordServers", data?.server_discord_id],
+        () => getDiscordServer(data!.server_discord_id),
+        {
+            enabled: !!currentUser?.discord_id && !!data?.server_discord_id
         }
-    }, [data, discordServers]);
+    );
 
     useEffect(() => {
         if (data && discordServer) {
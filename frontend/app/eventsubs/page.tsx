@@ -8,7 +8,14 @@ import {
     useQueryClient,
     UseQueryResult
 } from "@tanstack/react-query";
-import {DiscordChannel, DiscordRole, DiscordServer, EventSubscription, User} from "@/src/services/types";
+import {
+    DiscordChannel,
+    DiscordRole,
+    DiscordServer,
+    DiscordServerSummary,
+    EventSubscription,
+    User
+} from "@/src/services/types";
 import {AxiosError} from "axios";
 import {getCurrentUser, getUsers} from "@/src/services/users";
 import {createEventSub, deleteEventSub, getEventSubs, getEventSubsByUser} from "@/src/services/eventsubs";
@@ -25,14 +32,14 @@ import {
 import DeleteIcon from '@mui/icons-material/Delete';
 import VisibilityIcon from '@mui/icons-material/Visibility';
 import {useState} from "react";
-import {getDiscordServers} from "@/src/services/discord";
+import {getAllDiscordServerSummaries, getDiscordServer} from "@/src/services/discord";
 import {Controller, RegisterOptions, useForm} from "react-hook-form";
 import Link from "next/link";
 
 interface FormValues {
     user: User | null;
     event: string;
-    server: DiscordServer | null;
+    server: DiscordServerSummary | null;
     channel: DiscordChannel | null;
     role: DiscordRole | null;
     message: string;
@@ -78,8 +85,8 @@ export default function EventsubsPage() {
             }
         },
         {
-            queryKey: ["discordServers"],
-            queryFn: getDiscordServers,
+            queryKey: ["discordServerSummaries"],
+            queryFn: getAllDiscordServerSummaries,
             options: {
                 enabled: !!discordId,
                 retry: !!discordId
@@ -102,7 +109,18 @@ export default function EventsubsPage() {
     }: UseQueryResult<Array<User>, AxiosError> = usersResult;
     const {
         data: discordServers,
-    }: UseQueryResult<Array<DiscordServer>, AxiosError> = serversResult;
+    }: UseQueryResult<Array<DiscordServerSummary>, AxiosError> = serversResult;
+
+    // Channels and roles are only loaded for the selected server
+    const {
+        data: selectedServerDetails,
+    }: UseQueryResult<DiscordServer, AxiosError> = useQuery(
+        ["discordServers", selectedDServer?.discord_id],
+        () => getDiscordServer(selectedDServer!.discord_id),
+        {
+            enabled: !!selectedDServer
+        }
+    );
 
 
     const create = useMutation({
@@ -295,7 +313,7 @@ export default function EventsubsPage() {
                                         isOptionEqualToValue={(o, v) => o && v && o.discord_id === v.discord_id}
                                         renderInput={(params) => <TextField {...params} label="Discord Channel"
                                                                             margin="normal"/>}
-                                        options={selectedDServer ? selectedDServer.channels : []}
+                                        options={selectedServerDetails ? selectedServerDetails.channels : []}
                                         onChange={(_, data) => field.onChange(data)}/>}
                                     name="channel" control={control} rules={{required: true,}}/>
                                 <Controller
@@ -305,7 +323,7 @@ export default function EventsubsPage() {
                                         isOptionEqualToValue={(o, v) => o && v && o.discord_id === v.discord_id}
                                         renderInput={(params) => <TextField {...params} label="Discord Role"
                                                                             margin="normal"/>}
-                                        options={selectedDServer ? selectedDServer.roles : []}
+                                        options={selectedServerDetails ? selectedServerDetails.roles : []}
                                         onChange={(_, data) => field.onChange(data)}/>}
                                     name="role" control={control} rules={{required: true,}}/>
                                 <Controller
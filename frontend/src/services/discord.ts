@@ -1,11 +1,14 @@
-import {DiscordServer} from "@/src/services/types";
+import {DiscordServer, DiscordServerSummary} from "@/src/services/types";
 import {AxiosError, AxiosResponse} from "axios";
 import {client} from "@/src/services/client";
 
-const getDiscordServers = () => {
-    return new Promise<Array<DiscordServer>>(async (resolve, reject) => {
+// Largest page the summary endpoint returns
+const SERVER_PAGE_SIZE = 1000;
+
+const getDiscordServerSummaries = (skip: number = 0, limit: number = 100) => {
+    return new Promise<Array<DiscordServerSummary>>(async (resolve, reject) => {
         client
-            .get("/api/discord/servers")
+            .get("/api/discord/servers/summary", {params: {skip, limit}})
             .then((res: AxiosResponse) => {
                 resolve(res.data);
             })
@@ -13,6 +16,17 @@ const getDiscordServers = () => {
     });
 }
 
+const getAllDiscordServerSummaries = async () => {
+    const servers: Array<DiscordServerSummary> = [];
+    while (true) {
+        const page = await getDiscordServerSummaries(servers.length, SERVER_PAGE_SIZE);
+        servers.push(...page);
+        if (page.length < SERVER_PAGE_SIZE) {
+            return servers;
+        }
+    }
+}
+
 const getDiscordServer = (id: string) => {
     return new Promise<DiscordServer>(async (resolve, reject) => {
         client
@@ -25,6 +39,7 @@ const getDiscordServer = (id: string) => {
 }
 
 export {
-    getDiscordServers,
+    getDiscordServerSummaries,
+    getAllDiscordServerSummaries,
     getDiscordServer
 }
\ No newline at end of file
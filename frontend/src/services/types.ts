@@ -36,12 +36,15 @@ interface DiscordUser {
     readonly is_admin: boolean;
 }
 
-interface DiscordServer {
+interface DiscordServerSummary {
     readonly discord_id: string;
     readonly name: string;
     readonly icon_url: string;
+}
+
+interface DiscordServer extends DiscordServerSummary {
     readonly description: string;
-    readonly owner: DiscordUser;
+    readonly owner: DiscordUser | null;
     readonly channels: Array<DiscordChannel>;
     readonly roles: Array<DiscordRole>;
 }
@@ -83,6 +86,7 @@ export type {
     Team,
     User,
     DiscordServer,
+    DiscordServerSummary,
     DiscordChannel,
     DiscordUser,
     DiscordRole,